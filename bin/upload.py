@@ -1,47 +1,52 @@
 import pathlib
 import ssm_client as ssm
+from ssm_client import ingest
+from ssm_client.services import DatasetService
+import threading
 import time
-from typing import List
+from typing import Callable, List
 import warnings
 
 import metadata
 
 
 def upload_file(
-    rester: ssm.SSMRester,
-    collection_title: str,
+    dataset_service: DatasetService,
     location: pathlib.Path,
     file_summary_dict: dict,
     curies: str,
     workbook: str,
-):
-    print("    reading...")
+    log: Callable = print,
+) -> str:
+    """
+    Read and upload one spectra file, returning the report to print
+
+    Reports are returned instead of printed, so uploads running on
+    several threads print one whole report each; retries are reported
+    through `log` as they happen.
+    """
     try:
         scidata_dict = metadata.get_scidata(
             location, file_summary_dict, curies, workbook
         )
     except KeyError:
-        print(f"ERROR: {location} not found in file summary dict")
+        return f"ERROR: {location} not found in file summary dict"
 
     # Upload file to dataset
-    print("    uploading..")
+    collection_title = dataset_service.collection_title
     while True:
         with warnings.catch_warnings():
             warnings.filterwarnings("error")
             try:
-                dataset = rester.dataset.create(scidata_dict)
-                print(
-                    f"    {hostname}/collections/{collection_title}/datasets/{dataset.uuid}\n"
-                )  # noqa
-                break
+                dataset = dataset_service.create(scidata_dict)
+                return (
+                    f"    {dataset_service.hostname}/collections/"
+                    f"{collection_title}/datasets/{dataset.uuid}"
+                )
             except Warning as w:
-                print(f"ERROR: {w}")
-                print("  dataset not uploaded!!!")
-                print()
-                break
+                return f"ERROR: {w}\n  dataset not uploaded!!!"
             except Exception as e:
-                print(f" ERROR: {e}")
-                print("Retrying...")
+                log(f" ERROR: {location.name}: {e}\nRetrying...")
                 time.sleep(5)
 
 
@@ -53,13 +58,22 @@ def upload_directories(
     limit_spectra: int = None,
     blacklist: List[str] = None,
     collection_title: str = None,
+    manifest: str = None,
+    workers: int = 4,
+    group_priorities: dict = None,
 ):
-    """ """
-    curies_path = pathlib.Path(curies)
+    """
+    Upload the spectra of the `groups` directories in `curies`
 
-    # Black list of files that are not in RRUFF file format
-    if not blacklist:
-        blacklist = []
+    The input trees are walked once into a manifest (path, size, mtime,
+    SHA-256) that is written to / re-used from the `manifest` file if given;
+    groups whose directory or files changed since are walked again.
+    The groups and blacklist are applied to the manifest on every run, and
+    files with the same contents are uploaded once.
+    Files of all groups are uploaded by `workers` threads with per-group
+    fairness, weighted by `group_priorities`.
+    """
+    curies_path = pathlib.Path(curies)
 
     # Create rest client
     rester = ssm.SSMRester(hostname=hostname)
@@ -73,46 +87,77 @@ def upload_directories(
     # Get file summary dict
     file_summary_dict = metadata.get_file_summary_dict(curies, workbook)
 
-    # Loop over directories
-    total_spectra = 0
-    for directory in groups:
-        print(f"***********\n{directory}\n***********")
-
-        # Create dataset in database to hold directory data
-        rester.initialize_dataset_for_collection(collection)
-
-        # Glob the spectra file paths
-        directory = pathlib.Path(curies_path, directory, "Spectra")
-        locations = directory.glob("*.txt")
-
-        # Tally up total spectra for group and overall
-        total_group_spectra = len(list(locations))
-        total_spectra += total_group_spectra
-        locations = directory.glob("*.txt")
-
-        if limit_spectra:
-            locations = list(locations)[0:limit_spectra]
-
-        print(f"  Collection URI: {hostname}/collections/{collection.title}")
-        print(f"  Number of spectra: {total_group_spectra}\n")
-
-        # Loop over spectra for the directory
-        for i, location in enumerate(locations):
-            print(f"  {location.name} {i+1} of {total_group_spectra}")
-
-            # Skip non-RRUFF files for now
-            if location.name in blacklist or str(location) in blacklist:
-                print(f"    {location.name} skipped... ***")
-                continue
-
-            upload_file(
-                rester,
-                collection.title,
-                location,
-                file_summary_dict,
-                curies,
-                workbook,
-            )
+    # Build the manifest of all spectra files, or re-walk only the groups
+    # that changed since the saved manifest was written
+    roots = {
+        directory: curies_path / directory / "Spectra" for directory in groups
+    }
+    if manifest and pathlib.Path(manifest).exists():
+        saved = ingest.read_manifest(manifest)
+        since = pathlib.Path(manifest).stat().st_mtime
+        entries = ingest.refresh_manifest(saved, roots, since)
+        if entries != saved:
+            ingest.write_manifest(manifest, entries)
+    else:
+        entries = ingest.build_manifest(roots)
+        if manifest:
+            ingest.write_manifest(manifest, entries)
+
+    # Apply the current selection, skipping non-RRUFF files for now, and
+    # upload each file contents once
+    entries = ingest.filter_manifest(entries, groups, blacklist)
+    entries = ingest.dedupe_manifest(entries)
+
+    # Schedule the files of all groups on one shared queue so the workers
+    # are never idle waiting on a single large group
+    scheduler = ingest.IngestScheduler(group_priorities=group_priorities)
+    group_totals = {directory: 0 for directory in groups}
+    for entry in entries:
+        if limit_spectra and group_totals.get(entry.group, 0) >= limit_spectra:
+            continue
+        group_totals[entry.group] = group_totals.get(entry.group, 0) + 1
+        scheduler.submit(entry, group=entry.group, collection=collection.title)
+
+    # Create dataset in database to hold directory data
+    rester.initialize_dataset_for_collection(collection)
+
+    print(f"  Collection URI: {hostname}/collections/{collection.title}")
+    for directory, total_group_spectra in group_totals.items():
+        print(f"  {directory} number of spectra: {total_group_spectra}")
+    print()
+
+    # One DatasetService per collection, so every task is uploaded to the
+    # collection it was scheduled for
+    dataset_services = {collection.title: rester.dataset}
+    services_lock = threading.Lock()
+    print_lock = threading.Lock()
+
+    def _dataset_service(collection_title: str) -> DatasetService:
+        with services_lock:
+            if collection_title not in dataset_services:
+                dataset_services[collection_title] = DatasetService(
+                    hostname=hostname,
+                    collection_title=collection_title,
+                )
+            return dataset_services[collection_title]
+
+    def _print(message: str):
+        with print_lock:
+            print(message)
+
+    def _upload_task(task: ingest.IngestTask):
+        location = pathlib.Path(task.item.path)
+        report = upload_file(
+            _dataset_service(task.collection),
+            location,
+            file_summary_dict,
+            curies,
+            workbook,
+            log=_print,
+        )
+        _print(f"  {task.group}: {location.name}\n{report}\n")
+
+    scheduler.run(_upload_task, workers=workers)
 
 
 if __name__ == "__main__":
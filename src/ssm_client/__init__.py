@@ -5,10 +5,16 @@ __email__ = "mcdonnellmt@ornl.gov"
 
 
 from .ssm_rester import SSMRester
+from .spectrum import Spectrum
+from .spectrum_batch import SpectrumBatch
 from . import io
+from . import match
 
 
 __all__ = [
     "SSMRester",
+    "Spectrum",
+    "SpectrumBatch",
     "io",
+    "match",
 ]
@@ -1,10 +1,29 @@
 import json
 
+from ssm_client.digest import content_digest
+
 
 class CollectionContainer:
+    __slots__ = ("_title", "_uri", "_digest")
+
     def __init__(self, **kwargs):
-        self.__title = kwargs.get("title", None)
-        self.__uri = kwargs.get("uri", None)
+        object.__setattr__(self, "_title", kwargs.get("title", None))
+        object.__setattr__(self, "_uri", kwargs.get("uri", None))
+        object.__setattr__(self, "_digest", None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CollectionContainer is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("CollectionContainer is immutable")
+
+    def __getstate__(self):
+        return self._title, self._uri
+
+    def __setstate__(self, state):
+        object.__setattr__(self, "_title", state[0])
+        object.__setattr__(self, "_uri", state[1])
+        object.__setattr__(self, "_digest", None)
 
     def __eq__(self, other):
         """
@@ -16,9 +35,9 @@ class CollectionContainer:
         Return:
             areCollectionsEqual (bool)
         """
-        titleEqual = self.title == other.title
-        uriEqual = self.uri == other.uri
-        return titleEqual and uriEqual
+        if not isinstance(other, CollectionContainer):
+            return NotImplemented
+        return self.digest == other.digest
 
     def __ne__(self, other):
         """
@@ -31,10 +50,13 @@ class CollectionContainer:
         Return:
             areCollectionsNotEqual (bool)
         """
+        equal = self.__eq__(other)
+        if equal is NotImplemented:
+            return NotImplemented
+        return not equal
 
-        titleNotEqual = self.title != other.title
-        uriNotEqual = self.uri != other.uri
-        return titleNotEqual or uriNotEqual
+    def __hash__(self):
+        return hash(self.digest)
 
     def __repr__(self):
         collection_dict = {
@@ -52,11 +74,21 @@ class CollectionContainer:
         """
         Title for CollectionContainer
         """
-        return self.__title
+        return self._title
 
     @property
     def uri(self):
         """
         Fuseki server URI / URL where CollectionContainer is stored
         """
-        return self.__uri
+        return self._uri
+
+    @property
+    def digest(self):
+        """
+        Content digest of the title and URI, computed once and cached
+        """
+        if self._digest is None:
+            content = {"title": self._title, "uri": self._uri}
+            object.__setattr__(self, "_digest", content_digest(content))
+        return self._digest
@@ -1,24 +1,49 @@
 import json
 
+from ssm_client.digest import content_digest
+
 
 class DatasetContainer:
+    __slots__ = ("_uuid", "_dataset")
+
     def __init__(self, **kwargs):
-        self.__uuid = kwargs.get("uuid", None)
-        self.__dataset = kwargs.get("dataset", dict())
+        object.__setattr__(self, "_uuid", kwargs.get("uuid", None))
+        object.__setattr__(self, "_dataset", kwargs.get("dataset", dict()))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("DatasetContainer is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("DatasetContainer is immutable")
+
+    def __getstate__(self):
+        return self._uuid, self._dataset
+
+    def __setstate__(self, state):
+        object.__setattr__(self, "_uuid", state[0])
+        object.__setattr__(self, "_dataset", state[1])
 
     def __eq__(self, other):
         """
         Support "==" comparison between DatasetContainers
 
+        Datasets are compared by content digest (see `digest`), so JSON
+        types matter: 1 and 1.0 differ, as do a list and a NumPy array
+        of the same values.
+
         Args:
             other (DatasetContainer): Dataset to compare for equality.
 
         Return:
             areDatasetsEqual (bool)
         """
-        uuidEqual = self.uuid == other.uuid
-        datasetEqual = self.dataset == other.dataset
-        return uuidEqual and datasetEqual
+        if not isinstance(other, DatasetContainer):
+            return NotImplemented
+        if self.uuid != other.uuid:
+            return False
+        if self._dataset is other._dataset:
+            return True
+        return self.digest == other.digest
 
     def __ne__(self, other):
         """
@@ -30,10 +55,14 @@ class DatasetContainer:
         Return:
             areDatasetsNotEqual (bool)
         """
+        equal = self.__eq__(other)
+        if equal is NotImplemented:
+            return NotImplemented
+        return not equal
 
-        uuidNotEqual = self.uuid != other.uuid
-        datasetNotEqual = self.dataset != other.dataset
-        return uuidNotEqual or datasetNotEqual
+    def __hash__(self):
+        # The dataset is a mutable dict, so only the UUID is hashed
+        return hash(self.uuid)
 
     def __repr__(self):
         dataset_dict = {
@@ -52,11 +81,19 @@ class DatasetContainer:
         """
         UUID for DatasetContainer
         """
-        return self.__uuid
+        return self._uuid
 
     @property
     def dataset(self):
         """
         JSON-LD for RDF Dataset of the data in DatasetContainer
         """
-        return self.__dataset
+        return self._dataset
+
+    @property
+    def digest(self):
+        """
+        Content digest of the dataset, computed on each call since the
+        dataset can be modified in place
+        """
+        return content_digest(self._dataset)
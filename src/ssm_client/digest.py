@@ -0,0 +1,68 @@
+import hashlib
+import json
+
+import numpy as np
+
+
+def _encode(value):
+    """
+    JSON encoding of NumPy values, arrays as dtype, shape and data digest
+    """
+    if isinstance(value, np.ndarray):
+        data = np.ascontiguousarray(value)
+        digest = hashlib.blake2b(data.tobytes(), digest_size=16).hexdigest()
+        return {"__ndarray__": [data.dtype.str, list(data.shape), digest]}
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not hashable")
+
+
+def json_default(value):
+    """
+    `default` hook of `json.dumps` writing NumPy arrays as lists and
+    NumPy scalars as Python numbers, so documents built around arrays
+    (i.e. by `Spectrum.to_scidata`) serialize in full
+    """
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(
+        f"Object of type {type(value).__name__} is not JSON serializable"
+    )
+
+
+def canonical_json(obj) -> bytes:
+    """
+    Canonical JSON encoding of an object: sorted keys, no whitespace
+
+    NumPy arrays are encoded by dtype, shape and a digest of their data,
+    so large arrays are hashed without converting them to lists.
+
+    Args:
+        obj: JSON serializable object, may contain NumPy arrays
+
+    Returns:
+        encoded (bytes): UTF-8 canonical JSON
+    """
+    encoded = json.dumps(
+        obj,
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=_encode,
+    )
+    return encoded.encode("utf-8")
+
+
+def content_digest(obj) -> str:
+    """
+    Stable digest of the content of an object, see `canonical_json`
+
+    Args:
+        obj: JSON serializable object, may contain NumPy arrays
+
+    Returns:
+        digest (str): Hex SHA-256 of the canonical JSON
+    """
+    return hashlib.sha256(canonical_json(obj)).hexdigest()
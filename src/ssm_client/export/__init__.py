@@ -0,0 +1,39 @@
+"""Bulk export of datasets for ssm-client."""
+
+from .archive import (
+    export_archive,
+    import_archive,
+    read_archive,
+    read_archive_index,
+    write_archive,
+)
+from .ndjson import (
+    UnsupportedCompressionException,
+    export_ndjson,
+    import_ndjson,
+    read_ndjson,
+    write_ndjson,
+)
+from .parquet import (
+    arrow_schema,
+    record_batches,
+    record_from_scidata,
+    write_parquet,
+)
+
+__all__ = [
+    "UnsupportedCompressionException",
+    "arrow_schema",
+    "export_archive",
+    "export_ndjson",
+    "import_archive",
+    "import_ndjson",
+    "read_archive",
+    "read_archive_index",
+    "read_ndjson",
+    "record_batches",
+    "record_from_scidata",
+    "write_archive",
+    "write_ndjson",
+    "write_parquet",
+]
@@ -0,0 +1,282 @@
+import io
+import json
+import zipfile
+from typing import Iterable, Iterator, List
+
+import numpy as np
+
+from ssm_client.containers import DatasetContainer
+from ssm_client.digest import content_digest, json_default
+from .ndjson import UnsupportedCompressionException
+
+_FORMAT_VERSION = 1
+_INDEX = "index.json"
+_DATAARRAY = "dataarray"
+
+_COMPRESSION_DEFLATE = "deflate"
+_COMPRESSION_CHOICES = [None, _COMPRESSION_DEFLATE]
+
+# How a packed array is turned back into the JSON list it replaced
+_KIND_NUMBER = "number"
+_KIND_LINES = "lines"
+_SUFFIXES = {_KIND_NUMBER: "npy", _KIND_LINES: "txt"}
+
+
+def _zip_compression(compression: str) -> int:
+    if compression not in _COMPRESSION_CHOICES:
+        msg = (
+            "compression: {compression} not supported\n"
+            "Supported compressions are {choices}"
+        )
+        msg = msg.format(compression=compression, choices=_COMPRESSION_CHOICES)
+        raise UnsupportedCompressionException(msg)
+    if compression == _COMPRESSION_DEFLATE:
+        return zipfile.ZIP_DEFLATED
+    return zipfile.ZIP_STORED
+
+
+def _find_dataarrays(value, path: list, found: list) -> list:
+    """
+    JSON paths of the non-empty "dataarray" values of a document
+    """
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if key == _DATAARRAY and isinstance(item, (list, np.ndarray)):
+                if len(item):
+                    found.append(path + [key])
+            else:
+                _find_dataarrays(item, path + [key], found)
+    elif isinstance(value, list):
+        for i, item in enumerate(value):
+            if isinstance(item, (dict, list)):
+                _find_dataarrays(item, path + [i], found)
+    return found
+
+
+def _get(document, path: list):
+    for key in path:
+        document = document[key]
+    return document
+
+
+def _replace(document, path: list, value):
+    """
+    Copy of a document with the value at `path` replaced, copying only
+    the dicts and lists along the path
+    """
+    if not path:
+        return value
+    copied = dict(document) if isinstance(document, dict) else list(document)
+    copied[path[0]] = _replace(document[path[0]], path[1:], value)
+    return copied
+
+
+def _pack_array(values) -> tuple:
+    """
+    Kind and packed form of a data array: a NumPy array for numbers,
+    newline separated UTF-8 for strings, or (None, None) when it has to
+    stay in the JSON document
+    """
+    if isinstance(values, np.ndarray):
+        if values.dtype.kind in "biuf":
+            return _KIND_NUMBER, values
+        return None, None
+    types = set(map(type, values))
+    if types in ({int}, {float}):
+        return _KIND_NUMBER, np.array(values)
+    if types == {str}:
+        # Decimal strings, as read from JCAMP/RRUFF files, are kept as
+        # text: parsing them to floats and printing them back would cost
+        # more than the JSON they replace and could change their digits
+        lines = "\n".join(values)
+        if lines.count("\n") == len(values) - 1:
+            return _KIND_LINES, lines.encode("utf-8")
+    return None, None
+
+
+def _unpack_array(packed: bytes, kind: str) -> list:
+    if kind == _KIND_LINES:
+        return packed.decode("utf-8").split("\n")
+    return np.load(io.BytesIO(packed), allow_pickle=False).tolist()
+
+
+def _member(n: int, name: str) -> str:
+    return f"datasets/{n:08d}/{name}"
+
+
+def _write_dataset(archive: zipfile.ZipFile, n: int, document) -> dict:
+    """
+    Write the members of one dataset and return its index entry
+    """
+    if isinstance(document, DatasetContainer):
+        uuid, dataset = document.uuid, document.dataset
+        digest = document.digest
+    else:
+        uuid, dataset = None, document
+        digest = content_digest(document)
+
+    arrays = []
+    for path in _find_dataarrays(dataset, [], []):
+        kind, packed = _pack_array(_get(dataset, path))
+        if kind is None:
+            continue
+        member = _member(n, f"{len(arrays)}.{_SUFFIXES[kind]}")
+        with archive.open(member, "w", force_zip64=True) as f:
+            if kind == _KIND_NUMBER:
+                np.save(f, packed, allow_pickle=False)
+            else:
+                f.write(packed)
+        dataset = _replace(dataset, path, None)
+        arrays.append({"path": path, "member": member, "kind": kind})
+
+    member = _member(n, "document.json")
+    # NumPy values outside the packed data arrays are written out as
+    # JSON lists and numbers
+    encoded = json.dumps(dataset, separators=(",", ":"), default=json_default)
+    archive.writestr(member, encoded.encode("utf-8"))
+
+    graph = dataset.get("@graph", {})
+    return {
+        "uuid": uuid,
+        "title": graph.get("title"),
+        "uid": graph.get("uid"),
+        "digest": digest,
+        "member": member,
+        "arrays": arrays,
+    }
+
+
+def write_archive(
+    filename: str,
+    documents: Iterable,
+    compression: str = None,
+    collection: str = None,
+) -> int:
+    """
+    Stream datasets to a single-file snapshot archive
+
+    The archive is a zip file with, for each dataset, its JSON document
+    with the data arrays taken out and packed in their own members
+    (numbers as `.npy`, decimal strings as one value per line), plus an
+    `index.json` listing the uuid, title, uid and content digest of
+    every dataset. Each document is written as soon as it is produced,
+    so memory does not grow with the size of the datasets.
+
+    Args:
+        filename (str): Filename for the archive
+        documents (Iterable): DatasetContainers or SciData dicts
+        compression (str): Choice of compression of the members.
+            Default: stored, fastest to restore. Choices: [None, "deflate"]
+        collection (str): Title of the collection, kept in the index
+
+    Returns:
+        n_datasets (int): Number of datasets written
+    """
+    entries = []
+    with zipfile.ZipFile(
+        filename, "w", compression=_zip_compression(compression)
+    ) as archive:
+        for document in documents:
+            entries.append(_write_dataset(archive, len(entries), document))
+        index = {
+            "version": _FORMAT_VERSION,
+            "collection": collection,
+            "datasets": entries,
+        }
+        encoded = json.dumps(index, separators=(",", ":"))
+        archive.writestr(_INDEX, encoded.encode("utf-8"))
+    return len(entries)
+
+
+def read_archive_index(filename: str) -> dict:
+    """
+    Index of a snapshot archive written by `write_archive`, with the
+    "version", "collection" and "datasets" of the snapshot
+    """
+    with zipfile.ZipFile(filename) as archive:
+        return json.loads(archive.read(_INDEX))
+
+
+def read_archive(filename: str) -> Iterator[DatasetContainer]:
+    """
+    Stream the datasets of a snapshot archive written by `write_archive`
+
+    Args:
+        filename (str): Filename of the archive
+
+    Yields:
+        dataset (DatasetContainer): Dataset of each index entry, in order
+    """
+    with zipfile.ZipFile(filename) as archive:
+        index = json.loads(archive.read(_INDEX))
+        for entry in index["datasets"]:
+            dataset = json.loads(archive.read(entry["member"]))
+            for packed in entry["arrays"]:
+                path = packed["path"]
+                values = _unpack_array(
+                    archive.read(packed["member"]), packed["kind"]
+                )
+                _get(dataset, path[:-1])[path[-1]] = values
+            yield DatasetContainer(uuid=entry["uuid"], dataset=dataset)
+
+
+def export_archive(
+    filename: str,
+    dataset_service,
+    compression: str = None,
+    max_workers: int = 4,
+    lookahead: int = None,
+) -> int:
+    """
+    Snapshot a whole collection to a single-file archive
+
+    Datasets are fetched concurrently with bounded lookahead (see
+    `DatasetService.iter_datasets`) and written in sorted UUID order.
+
+    Args:
+        filename (str): Filename for the archive
+        dataset_service (DatasetService): Service of the collection
+        compression (str): Choice of compression of the members.
+            Default: stored. Choices: [None, "deflate"]
+        max_workers (int): Number of datasets fetched concurrently
+        lookahead (int): Datasets fetched ahead of the writer
+
+    Returns:
+        n_datasets (int): Number of datasets written
+    """
+    _zip_compression(compression)
+    uuids = sorted(dataset_service.get_datasets())
+    datasets = dataset_service.iter_datasets(uuids, max_workers, lookahead)
+    return write_archive(
+        filename,
+        datasets,
+        compression=compression,
+        collection=dataset_service.collection_title,
+    )
+
+
+def import_archive(
+    filename: str,
+    dataset_service,
+    max_workers: int = 4,
+    lookahead: int = None,
+) -> List[str]:
+    """
+    Restore the datasets of a snapshot archive into a collection
+
+    The stored documents are posted as they are, without re-running any
+    file parsing or enrichment, while the archive is read lazily and the
+    datasets are created concurrently (see `DatasetService.create_many`).
+    The server assigns new UUIDs.
+
+    Args:
+        filename (str): Filename of the archive
+        dataset_service (DatasetService): Service of the collection
+        max_workers (int): Number of datasets created concurrently
+        lookahead (int): Datasets read ahead of the uploads
+
+    Returns:
+        uuids (List[str]): UUIDs of the created datasets, in index order
+    """
+    datasets = (dataset.dataset for dataset in read_archive(filename))
+    return dataset_service.create_many(datasets, max_workers, lookahead)
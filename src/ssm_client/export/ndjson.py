@@ -0,0 +1,191 @@
+import io
+import json
+import os
+from typing import Iterable, Iterator
+
+from ssm_client.containers import DatasetContainer
+from ssm_client.digest import json_default
+
+_COMPRESSION_ZSTD = "zstd"
+_COMPRESSION_CHOICES = [None, _COMPRESSION_ZSTD]
+_ZSTD_SUFFIX = ".zst"
+
+
+class UnsupportedCompressionException(Exception):
+    """Raised when unsupported NDJSON compression specified"""
+
+
+def _compression(filename: str, compression: str) -> str:
+    if compression is None and os.fspath(filename).endswith(_ZSTD_SUFFIX):
+        compression = _COMPRESSION_ZSTD
+    if compression not in _COMPRESSION_CHOICES:
+        msg = (
+            "compression: {compression} not supported\n"
+            "Supported compressions are {choices}"
+        )
+        msg = msg.format(compression=compression, choices=_COMPRESSION_CHOICES)
+        raise UnsupportedCompressionException(msg)
+    return compression
+
+
+def _zstandard():
+    """
+    Import zstandard, only needed for compressed NDJSON
+    """
+    try:
+        import zstandard
+    except ImportError as error:
+        msg = (
+            "zstandard is required for zstd compressed NDJSON, "
+            "install it with: pip install ssm-client[zstd]"
+        )
+        raise ImportError(msg) from error
+    return zstandard
+
+
+def _open(filename: str, mode: str, compression: str):
+    """
+    Binary file object for reading ("r") or writing ("w") NDJSON
+    """
+    raw = open(filename, mode + "b")
+    if compression != _COMPRESSION_ZSTD:
+        return raw
+    zstandard = _zstandard()
+    if mode == "w":
+        return zstandard.ZstdCompressor().stream_writer(raw, closefd=True)
+    reader = zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+    return io.BufferedReader(reader)
+
+
+def write_ndjson(
+    filename: str,
+    documents: Iterable,
+    compression: str = None,
+) -> int:
+    """
+    Stream datasets to NDJSON, one {"uuid", "dataset"} object per line
+
+    Each document is written as soon as it is produced, so memory does
+    not grow with the number of datasets. NumPy arrays are written as
+    lists. The file is written under a ".partial" name and only renamed
+    once complete.
+
+    Args:
+        filename (str): Filename for the NDJSON file
+        documents (Iterable): DatasetContainers or SciData dicts
+        compression (str): Choice of compression, inferred from a ".zst"
+            suffix if None. Choices: [None, "zstd"]
+
+    Returns:
+        n_lines (int): Number of datasets written
+    """
+    compression = _compression(filename, compression)
+    partial = f"{os.fspath(filename)}.partial"
+    n_lines = 0
+    try:
+        with _open(partial, "w", compression) as f:
+            for document in documents:
+                if isinstance(document, DatasetContainer):
+                    line = {
+                        "uuid": document.uuid,
+                        "dataset": document.dataset,
+                    }
+                else:
+                    line = {"uuid": None, "dataset": document}
+                encoded = json.dumps(
+                    line,
+                    separators=(",", ":"),
+                    ensure_ascii=False,
+                    default=json_default,
+                )
+                f.write(encoded.encode("utf-8") + b"\n")
+                n_lines += 1
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    os.replace(partial, filename)
+    return n_lines
+
+
+def read_ndjson(
+    filename: str,
+    compression: str = None,
+) -> Iterator[DatasetContainer]:
+    """
+    Stream the datasets of an NDJSON file written by `write_ndjson`
+
+    Args:
+        filename (str): Filename of the NDJSON file
+        compression (str): Choice of compression, inferred from a ".zst"
+            suffix if None. Choices: [None, "zstd"]
+
+    Yields:
+        dataset (DatasetContainer): Dataset of each line, in order
+    """
+    compression = _compression(filename, compression)
+    with _open(filename, "r", compression) as f:
+        for line in f:
+            if line.strip():
+                yield DatasetContainer(**json.loads(line))
+
+
+def export_ndjson(
+    filename: str,
+    dataset_service,
+    compression: str = None,
+    max_workers: int = 4,
+    lookahead: int = None,
+) -> int:
+    """
+    Stream a whole collection to NDJSON
+
+    Datasets are fetched concurrently with bounded lookahead (see
+    `DatasetService.iter_datasets`) and written in sorted UUID order, so
+    the output does not depend on the server listing order.
+
+    Args:
+        filename (str): Filename for the NDJSON file
+        dataset_service (DatasetService): Service of the collection
+        compression (str): Choice of compression, inferred from a ".zst"
+            suffix if None. Choices: [None, "zstd"]
+        max_workers (int): Number of datasets fetched concurrently
+        lookahead (int): Datasets fetched ahead of the writer
+
+    Returns:
+        n_lines (int): Number of datasets written
+    """
+    compression = _compression(filename, compression)
+    uuids = sorted(dataset_service.get_datasets())
+    datasets = dataset_service.iter_datasets(uuids, max_workers, lookahead)
+    return write_ndjson(filename, datasets, compression)
+
+
+def import_ndjson(
+    filename: str,
+    dataset_service,
+    compression: str = None,
+    max_workers: int = 4,
+    lookahead: int = None,
+) -> list:
+    """
+    Stream the datasets of an NDJSON file into a collection
+
+    The file is read lazily while the datasets are created concurrently,
+    see `DatasetService.create_many`. The server assigns new UUIDs.
+
+    Args:
+        filename (str): Filename of the NDJSON file
+        dataset_service (DatasetService): Service of the collection
+        compression (str): Choice of compression, inferred from a ".zst"
+            suffix if None. Choices: [None, "zstd"]
+        max_workers (int): Number of datasets created concurrently
+        lookahead (int): Datasets read ahead of the uploads
+
+    Returns:
+        uuids (list[str]): UUIDs of the created datasets, in file order
+    """
+    datasets = (
+        dataset.dataset for dataset in read_ndjson(filename, compression)
+    )
+    return dataset_service.create_many(datasets, max_workers, lookahead)
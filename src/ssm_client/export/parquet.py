@@ -0,0 +1,176 @@
+import json
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from ssm_client.containers import DatasetContainer
+from ssm_client.metadata import facets_from_scidata, technique_from_scidata
+from ssm_client.spectrum import MissingSpectrumException, Spectrum
+
+_STRING_COLUMNS = [
+    "uuid",
+    "uid",
+    "title",
+    "publisher",
+    "technique",
+    "formula",
+    "crystal_system",
+    "x_units",
+    "y_units",
+    "facets",
+]
+
+
+def _pyarrow():
+    """
+    Import pyarrow, only needed for the Arrow and Parquet output
+    """
+    try:
+        import pyarrow
+    except ImportError as error:
+        msg = (
+            "pyarrow is required for Arrow/Parquet export, "
+            "install it with: pip install ssm-client[parquet]"
+        )
+        raise ImportError(msg) from error
+    return pyarrow
+
+
+def arrow_schema():
+    """
+    Arrow schema of the exported records, see `record_from_scidata`
+    """
+    pa = _pyarrow()
+    fields = [pa.field(name, pa.string()) for name in _STRING_COLUMNS]
+    fields += [
+        pa.field("n_points", pa.int64()),
+        pa.field("x", pa.list_(pa.float64())),
+        pa.field("y", pa.list_(pa.float64())),
+    ]
+    return pa.schema(fields)
+
+
+def record_from_scidata(scidata_dict: dict, uuid: str = None) -> dict:
+    """
+    Flat record of a SciData dict: metadata columns plus x/y arrays
+
+    The facets (see `facets_from_scidata`) are kept as one JSON object
+    string column, as their fields differ between datasets.
+
+    Args:
+        scidata_dict (dict): SciData JSON-LD dictionary
+        uuid (str): UUID of the dataset at the SSM Catalog API
+
+    Returns:
+        record (dict): Column values, x/y as float64 arrays (empty when
+            the document has no spectrum)
+    """
+    graph = scidata_dict.get("@graph", {})
+    facets = facets_from_scidata(scidata_dict)
+    try:
+        spectrum = Spectrum.from_scidata(scidata_dict)
+        x, y = spectrum.x, spectrum.y
+        x_units, y_units = spectrum.x_units, spectrum.y_units
+    except MissingSpectrumException:
+        x = y = np.empty(0)
+        x_units = y_units = None
+    return {
+        "uuid": uuid,
+        "uid": graph.get("uid"),
+        "title": graph.get("title"),
+        "publisher": graph.get("publisher"),
+        "technique": technique_from_scidata(scidata_dict),
+        "formula": facets.get("formula", [None])[0],
+        "crystal_system": facets.get("crystal system", [None])[0],
+        "x_units": x_units,
+        "y_units": y_units,
+        "facets": json.dumps(facets, sort_keys=True),
+        "n_points": x.size,
+        "x": x,
+        "y": y,
+    }
+
+
+def _record(document) -> dict:
+    if isinstance(document, DatasetContainer):
+        return record_from_scidata(document.dataset, uuid=document.uuid)
+    return record_from_scidata(document)
+
+
+def _record_batch(records: list):
+    """
+    Arrow record batch of records, the x/y list columns built from one
+    flat buffer and offsets each
+    """
+    pa = _pyarrow()
+    columns = [
+        pa.array([record[name] for record in records], type=pa.string())
+        for name in _STRING_COLUMNS
+    ]
+    lengths = np.array([record["n_points"] for record in records])
+    columns.append(pa.array(lengths, type=pa.int64()))
+    offsets = np.zeros(len(records) + 1, dtype=np.int32)
+    np.cumsum(lengths, out=offsets[1:])
+    for axis in ("x", "y"):
+        arrays = [record[axis] for record in records]
+        values = np.concatenate(arrays) if arrays else np.empty(0)
+        columns.append(
+            pa.ListArray.from_arrays(pa.array(offsets), pa.array(values))
+        )
+    return pa.RecordBatch.from_arrays(columns, schema=arrow_schema())
+
+
+def record_batches(documents: Iterable, batch_size: int = 1024) -> Iterator:
+    """
+    Stream documents as Arrow record batches of at most `batch_size` rows
+
+    Args:
+        documents (Iterable): SciData dicts or DatasetContainers, i.e.
+            `DatasetService.iter_datasets()`
+        batch_size (int): Rows per record batch
+
+    Yields:
+        batch (pyarrow.RecordBatch): Records of the next documents
+    """
+    records = []
+    for document in documents:
+        records.append(_record(document))
+        if len(records) == batch_size:
+            yield _record_batch(records)
+            records = []
+    if records:
+        yield _record_batch(records)
+
+
+def write_parquet(
+    filename: str,
+    documents: Iterable,
+    row_group_size: int = 1024,
+    compression: str = "zstd",
+) -> int:
+    """
+    Write documents to a Parquet file, one row group at a time
+
+    Only one row group of records is held in memory, so whole
+    collections can be exported, i.e.
+    `write_parquet("collection.parquet", service.iter_datasets())`.
+
+    Args:
+        filename (str): Filename for the Parquet file
+        documents (Iterable): SciData dicts or DatasetContainers
+        row_group_size (int): Rows per row group
+        compression (str): Parquet compression codec
+
+    Returns:
+        n_rows (int): Number of rows written
+    """
+    pa = _pyarrow()
+    import pyarrow.parquet as pq
+
+    n_rows = 0
+    schema = arrow_schema()
+    with pq.ParquetWriter(filename, schema, compression=compression) as f:
+        for batch in record_batches(documents, row_group_size):
+            f.write_table(pa.Table.from_batches([batch], schema=schema))
+            n_rows += batch.num_rows
+    return n_rows
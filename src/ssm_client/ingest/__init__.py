@@ -0,0 +1,26 @@
+"""Ingest pipeline for ssm-client."""
+
+from .manifest import (
+    Blacklist,
+    ManifestEntry,
+    build_manifest,
+    dedupe_manifest,
+    filter_manifest,
+    read_manifest,
+    refresh_manifest,
+    write_manifest,
+)
+from .scheduler import IngestScheduler, IngestTask
+
+__all__ = [
+    "Blacklist",
+    "IngestScheduler",
+    "IngestTask",
+    "ManifestEntry",
+    "build_manifest",
+    "dedupe_manifest",
+    "filter_manifest",
+    "read_manifest",
+    "refresh_manifest",
+    "write_manifest",
+]
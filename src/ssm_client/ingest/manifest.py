@@ -0,0 +1,395 @@
+import fnmatch
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, NamedTuple, Union
+
+_HASH_CHUNK_SIZE = 1 << 20
+_REGEX_PREFIX = "re:"
+_GLOB_CHARACTERS = set("*?[")
+
+
+class ManifestEntry(NamedTuple):
+    """
+    File found while walking the input directories
+
+    Attributes:
+        path (str): Path to the file
+        group (str): Group (i.e. "Phosphates") the file belongs to
+        size (int): File size in bytes
+        mtime (float): Last modification time of the file
+        sha256 (str): SHA-256 hex digest of the file contents or
+            None if hashing was disabled
+    """
+
+    path: str
+    group: str
+    size: int
+    mtime: float
+    sha256: str = None
+
+
+class Blacklist:
+    def __init__(self, patterns: Iterable[str] = None):
+        """
+        Initialize a Blacklist object, compiling all patterns once
+
+        Patterns can be exact filenames or paths, glob patterns
+        (i.e. "*_IR.txt") or regular expressions prefixed by "re:"
+        (i.e. "re:.*_R_785\\.txt"). File names and full paths
+        are both checked against every pattern.
+
+        Args:
+            patterns (Iterable[str]): Patterns of files to skip
+        """
+        self._exact = set()
+        regexes = []
+        for pattern in patterns or []:
+            if pattern.startswith(_REGEX_PREFIX):
+                regexes.append(pattern[len(_REGEX_PREFIX):])
+            elif _GLOB_CHARACTERS.intersection(pattern):
+                regexes.append(fnmatch.translate(os.path.normpath(pattern)))
+            else:
+                self._exact.add(os.path.normpath(pattern))
+
+        self._regex = None
+        if regexes:
+            self._regex = re.compile("|".join(f"(?:{r})" for r in regexes))
+
+    def __contains__(self, path) -> bool:
+        """
+        Support "in" checks of a file name or path against the blacklist
+
+        Args:
+            path (str): File path to check
+
+        Return:
+            isBlacklisted (bool)
+        """
+        path = os.path.normpath(str(path))
+        name = os.path.basename(path)
+        if name in self._exact or path in self._exact:
+            return True
+        if self._regex:
+            match = self._regex.fullmatch
+            return bool(match(name) or match(path))
+        return False
+
+
+def _scan_directory(directory: str, pattern: str) -> tuple:
+    """
+    List a single directory with os.scandir, empty if it is missing
+
+    Args:
+        directory (str): Directory to scan
+        pattern (str): Glob pattern for files to keep
+
+    Returns:
+        files (list): (path, size, mtime) for files matching pattern
+        subdirectories (list): Paths of subdirectories
+    """
+    files = []
+    subdirectories = []
+    try:
+        entries = os.scandir(directory)
+    except (FileNotFoundError, NotADirectoryError):
+        # A group without a directory has no files, as with glob
+        return files, subdirectories
+    with entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subdirectories.append(entry.path)
+            elif fnmatch.fnmatch(entry.name, pattern):
+                stat = entry.stat()
+                files.append((entry.path, stat.st_size, stat.st_mtime))
+    return files, subdirectories
+
+
+def _walk(executor, roots: Dict[str, str], pattern: str, recursive: bool):
+    """
+    Walk the directory trees, scanning every directory on the executor
+
+    Args:
+        executor (ThreadPoolExecutor): Executor to scan directories on
+        roots (dict): Mapping of group name to directory
+        pattern (str): Glob pattern for files to keep
+        recursive (bool): Walk subdirectories as well
+
+    Returns:
+        files (dict): Mapping of group name to (path, size, mtime) tuples
+    """
+    files = {group: [] for group in roots}
+    pending = [
+        (group, executor.submit(_scan_directory, str(directory), pattern))
+        for group, directory in roots.items()
+    ]
+    while pending:
+        group, future = pending.pop(0)
+        directory_files, subdirectories = future.result()
+        files[group].extend(directory_files)
+        if recursive:
+            for subdirectory in subdirectories:
+                scan = executor.submit(_scan_directory, subdirectory, pattern)
+                pending.append((group, scan))
+    return files
+
+
+def hash_file(path: str) -> str:
+    """
+    Compute the SHA-256 hex digest of a file in fixed-size chunks
+
+    Args:
+        path (str): Path to the file
+
+    Returns:
+        digest (str): SHA-256 hex digest
+    """
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as fileobj:
+        for chunk in iter(lambda: fileobj.read(_HASH_CHUNK_SIZE), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def build_manifest(
+    roots: Union[Dict[str, str], Iterable[str]],
+    pattern: str = "*.txt",
+    blacklist: Union[Blacklist, Iterable[str]] = None,
+    recursive: bool = False,
+    hash_files: bool = True,
+    workers: int = 8,
+) -> List[ManifestEntry]:
+    """
+    Walk the input directories in parallel and build the file manifest
+
+    Directory listing, stat calls and hashing are all spread over a
+    thread pool since they are dominated by filesystem latency.
+
+    Args:
+        roots (dict or Iterable[str]): Mapping of group name to directory
+            or directories to walk (group name is the directory name)
+        pattern (str): Glob pattern for the file names to include
+        blacklist (Blacklist or Iterable[str]): Files to skip
+        recursive (bool): Walk subdirectories as well
+        hash_files (bool): Compute SHA-256 digests of the files, used by
+            `dedupe_manifest`
+        workers (int): Number of threads to use
+
+    Returns:
+        manifest (List[ManifestEntry]): Entries sorted by group order
+            and then path
+    """
+    if not isinstance(roots, dict):
+        roots = {os.path.basename(os.path.normpath(r)): r for r in roots}
+    if not isinstance(blacklist, Blacklist):
+        blacklist = Blacklist(blacklist)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        manifest = []
+        for group, files in _walk(executor, roots, pattern, recursive).items():
+            for path, size, mtime in sorted(files):
+                if path in blacklist:
+                    continue
+                manifest.append(ManifestEntry(path, group, size, mtime))
+
+        if hash_files:
+            digests = executor.map(hash_file, [e.path for e in manifest])
+            manifest = [
+                entry._replace(sha256=digest)
+                for entry, digest in zip(manifest, digests)
+            ]
+
+    return manifest
+
+
+def _group_changed(
+    directory: str, entries: List[ManifestEntry], since: float
+) -> bool:
+    """
+    Whether the files of a group may differ from its manifest entries,
+    see `refresh_manifest`
+    """
+    if not entries:
+        return True
+    try:
+        if os.stat(directory).st_mtime > since:
+            return True
+        for entry in entries:
+            stat = os.stat(entry.path)
+            if (stat.st_size, stat.st_mtime) != (entry.size, entry.mtime):
+                return True
+    except OSError:
+        return True
+    return False
+
+
+def refresh_manifest(
+    manifest: Iterable[ManifestEntry],
+    roots: Union[Dict[str, str], Iterable[str]],
+    since: float,
+    pattern: str = "*.txt",
+    blacklist: Union[Blacklist, Iterable[str]] = None,
+    recursive: bool = False,
+    hash_files: bool = True,
+    workers: int = 8,
+) -> List[ManifestEntry]:
+    """
+    Bring a manifest read back from disk up to date with the directories
+
+    A group is walked again only when it has no entries, when its
+    directory was modified after `since` (files added, removed or
+    renamed; usually the mtime of the manifest file) or when re-stating
+    its entries finds a file gone or with a different size or mtime.
+    Files whose path, size and mtime did not change keep their digest
+    instead of being hashed again, and entries of groups not in `roots`
+    are kept as they are. With `recursive`, files added to
+    subdirectories are only found once their group is walked again.
+
+    Args:
+        manifest (Iterable[ManifestEntry]): Manifest entries, i.e. from
+            `read_manifest`
+        roots (dict or Iterable[str]): Mapping of group name to directory
+            or directories to walk (group name is the directory name)
+        since (float): Time the manifest was built or written
+        pattern (str): Glob pattern for the file names to include
+        blacklist (Blacklist or Iterable[str]): Files to skip
+        recursive (bool): Walk subdirectories as well
+        hash_files (bool): Compute SHA-256 digests of the files
+        workers (int): Number of threads to use
+
+    Returns:
+        manifest (List[ManifestEntry]): Up to date entries, by group
+    """
+    if not isinstance(roots, dict):
+        roots = {os.path.basename(os.path.normpath(r)): r for r in roots}
+    manifest = list(manifest)
+    groups = dict()
+    for entry in manifest:
+        groups.setdefault(entry.group, []).append(entry)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        changed = executor.map(
+            _group_changed,
+            [str(directory) for directory in roots.values()],
+            [groups.get(group, []) for group in roots],
+            [since] * len(roots),
+        )
+        stale = [group for group, c in zip(list(roots), changed) if c]
+        if not stale:
+            return manifest
+
+        fresh = build_manifest(
+            {group: roots[group] for group in stale},
+            pattern=pattern,
+            blacklist=blacklist,
+            recursive=recursive,
+            hash_files=False,
+            workers=workers,
+        )
+        digests = {
+            (entry.path, entry.size, entry.mtime): entry.sha256
+            for entry in manifest
+        }
+        fresh = [
+            entry._replace(
+                sha256=digests.get((entry.path, entry.size, entry.mtime))
+            )
+            for entry in fresh
+        ]
+        if hash_files:
+            paths = [entry.path for entry in fresh if entry.sha256 is None]
+            hashed = dict(zip(paths, executor.map(hash_file, paths)))
+            fresh = [
+                entry._replace(sha256=hashed.get(entry.path, entry.sha256))
+                for entry in fresh
+            ]
+
+    for group in stale:
+        groups[group] = []
+    for entry in fresh:
+        groups.setdefault(entry.group, []).append(entry)
+    return [entry for entries in groups.values() for entry in entries]
+
+
+def filter_manifest(
+    manifest: Iterable[ManifestEntry],
+    groups: Iterable[str] = None,
+    blacklist: Union[Blacklist, Iterable[str]] = None,
+) -> List[ManifestEntry]:
+    """
+    Entries of a manifest in the selected groups and not blacklisted,
+    i.e. to apply the current selection to a re-used manifest file
+
+    Args:
+        manifest (Iterable[ManifestEntry]): Manifest entries
+        groups (Iterable[str]): Groups to keep, all groups if None
+        blacklist (Blacklist or Iterable[str]): Files to skip
+
+    Returns:
+        manifest (List[ManifestEntry]): Selected entries, in order
+    """
+    if not isinstance(blacklist, Blacklist):
+        blacklist = Blacklist(blacklist)
+    groups = None if groups is None else set(groups)
+    return [
+        entry
+        for entry in manifest
+        if (groups is None or entry.group in groups)
+        and entry.path not in blacklist
+    ]
+
+
+def dedupe_manifest(manifest: Iterable[ManifestEntry]) -> List[ManifestEntry]:
+    """
+    Entries of a manifest without files whose contents (SHA-256) match
+    an earlier entry, i.e. the same spectrum copied into two groups.
+    Entries without a digest are all kept.
+
+    Args:
+        manifest (Iterable[ManifestEntry]): Manifest entries
+
+    Returns:
+        manifest (List[ManifestEntry]): First entry of each file contents
+    """
+    seen = set()
+    unique = []
+    for entry in manifest:
+        if entry.sha256 is not None:
+            if entry.sha256 in seen:
+                continue
+            seen.add(entry.sha256)
+        unique.append(entry)
+    return unique
+
+
+def write_manifest(filename: str, manifest: Iterable[ManifestEntry]):
+    """
+    Write the manifest out as JSON lines, one entry per line
+
+    Args:
+        filename (str): Filename for the manifest
+        manifest (Iterable[ManifestEntry]): Manifest entries to write out
+    """
+    with open(filename, "w") as fileobj:
+        for entry in manifest:
+            fileobj.write(json.dumps(entry._asdict()) + "\n")
+
+
+def read_manifest(filename: str) -> List[ManifestEntry]:
+    """
+    Read a manifest written by `write_manifest`
+
+    Args:
+        filename (str): Filename to read the manifest from
+
+    Returns:
+        manifest (List[ManifestEntry]): Manifest entries
+    """
+    with open(filename, "r") as fileobj:
+        return [
+            ManifestEntry(**json.loads(line))
+            for line in fileobj
+            if line.strip()
+        ]
@@ -0,0 +1,184 @@
+import collections
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, NamedTuple
+
+
+class IngestTask(NamedTuple):
+    """
+    Unit of work handed out by the IngestScheduler
+
+    Attributes:
+        item (Any): Work item (i.e. a ManifestEntry)
+        group (str): Group (i.e. "Phosphates") the item belongs to
+        collection (str): Title of the collection the item goes to
+    """
+
+    item: Any
+    group: str
+    collection: str = None
+
+
+class _Queue:
+    def __init__(self, weight: float, virtual_time: float):
+        """
+        Queue of pending tasks plus its stride-scheduling state
+
+        Args:
+            weight (float): Priority weight, higher is served more often
+            virtual_time (float): Virtual time the queue starts at
+        """
+        self.weight = float(weight)
+        self.virtual_time = virtual_time
+        self.tasks = collections.deque()
+        self.pending = 0
+
+    def advance(self):
+        self.virtual_time += 1.0 / self.weight
+
+
+def _earliest(queues: Dict[str, _Queue]) -> str:
+    """
+    Key of the non-empty queue with the smallest virtual time
+    """
+    best = None
+    for key, queue in queues.items():
+        if not queue.pending:
+            continue
+        if best is None or queue.virtual_time < queues[best].virtual_time:
+            best = key
+    return best
+
+
+class IngestScheduler:
+    def __init__(
+        self,
+        group_priorities: Dict[str, float] = None,
+        collection_priorities: Dict[str, float] = None,
+    ):
+        """
+        Initialize an IngestScheduler object
+
+        Tasks from every group share one scheduler, so whichever worker is
+        idle takes the next task from any group instead of waiting for a
+        single group to finish. Tasks are handed out with weighted fair
+        (stride) scheduling: first across collections and then across
+        the groups of the chosen collection.
+
+        Args:
+            group_priorities (dict): Weight per group, default 1.0
+            collection_priorities (dict): Weight per collection, default 1.0
+        """
+        self.group_priorities = group_priorities or dict()
+        self.collection_priorities = collection_priorities or dict()
+        self._collections = dict()
+        self._groups = dict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _virtual_time(self, queues: Dict) -> float:
+        """
+        Current virtual time of a level, so newly active queues neither
+        jump ahead nor get starved
+        """
+        times = [q.virtual_time for q in queues.values() if q.pending]
+        return min(times) if times else 0.0
+
+    def submit(self, item: Any, group: str, collection: str = None):
+        """
+        Add a work item to the scheduler
+
+        Args:
+            item (Any): Work item
+            group (str): Group the item belongs to
+            collection (str): Title of the collection the item goes to
+        """
+        task = IngestTask(item, group, collection)
+        with self._lock:
+            if collection not in self._collections:
+                weight = self.collection_priorities.get(collection, 1.0)
+                self._collections[collection] = _Queue(weight, 0.0)
+                self._groups[collection] = dict()
+            groups = self._groups[collection]
+            if group not in groups:
+                weight = self.group_priorities.get(group, 1.0)
+                groups[group] = _Queue(weight, 0.0)
+
+            self._activate(self._collections, collection)
+            self._activate(groups, group)
+            groups[group].tasks.append(task)
+            self._size += 1
+
+    def _activate(self, queues: Dict[str, _Queue], key: str):
+        """
+        Count a new pending task on a queue, moving an idle queue up to
+        the current virtual time of its level
+        """
+        queue = queues[key]
+        if not queue.pending:
+            now = self._virtual_time(queues)
+            queue.virtual_time = max(queue.virtual_time, now)
+        queue.pending += 1
+
+    def next(self) -> IngestTask:
+        """
+        Take the next task to work on
+
+        Returns:
+            task (IngestTask): Next task or None if the scheduler is empty
+        """
+        with self._lock:
+            if not self._size:
+                return None
+
+            collection = _earliest(self._collections)
+            collection_queue = self._collections[collection]
+            collection_queue.pending -= 1
+            collection_queue.advance()
+
+            groups = self._groups[collection]
+            group_queue = groups[_earliest(groups)]
+            group_queue.pending -= 1
+            group_queue.advance()
+
+            self._size -= 1
+            return group_queue.tasks.popleft()
+
+    def run(self, func: Callable, workers: int = 4) -> List:
+        """
+        Run `func` on every task with a pool of worker threads
+
+        Workers keep pulling the next task until the scheduler is empty.
+        The first exception raised by `func` stops the workers and is
+        re-raised once they have all returned.
+
+        Args:
+            func (Callable): Function called with each IngestTask
+            workers (int): Number of worker threads
+
+        Returns:
+            results (List): (task, result) tuples in completion order
+        """
+        results = []
+        failed = threading.Event()
+
+        def _worker():
+            while not failed.is_set():
+                task = self.next()
+                if task is None:
+                    return
+                try:
+                    result = func(task)
+                except BaseException:
+                    failed.set()
+                    raise
+                results.append((task, result))
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_worker) for _ in range(workers)]
+        for future in futures:
+            future.result()
+        return results
@@ -1,5 +1,7 @@
 from importlib import import_module
 
+from ssm_client.spectrum import Spectrum
+
 
 _MODULE_BASE = "ssm_client.io."
 
@@ -32,13 +34,19 @@ def _writefunc(module, name):
     return getattr(module, "write_" + name)
 
 
-def read(filename, ioformat=None, **kwargs) -> dict:
+def read(filename, ioformat=None, as_spectrum=False, **kwargs):
     """
     Read SciData dict from file format
+
+    With `as_spectrum`, the Spectrum of the SciData dict is returned
+    instead, see `Spectrum.from_scidata`
     """
     module = _get_ioformat(ioformat)
     function = _readfunc(module, ioformats.get(ioformat))
-    return function(filename, **kwargs)
+    scidata_dict = function(filename, **kwargs)
+    if as_spectrum:
+        return Spectrum.from_scidata(scidata_dict)
+    return scidata_dict
 
 
 def write(filename, scidata_dict, ioformat=None, **kwargs) -> None:
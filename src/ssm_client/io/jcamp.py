@@ -3,6 +3,47 @@ from scidatalib.scidata import SciData
 
 _DEFAULT_UID = "scidata:jsonld"
 
+# Sections and dataset lists that `SciData.output` cleans in place
+_SCIDATA_SECTIONS = ["methodology", "system", "dataset"]
+_DATASET_LISTS = ["dataseries", "datagroups", "datapoints"]
+
+
+def to_scidata_object(scidata_dict: dict) -> SciData:
+    """
+    SciData object for writing a SciData JSON-LD dictionary
+
+    `SciData.output` cleans the document it is given in place (drops
+    empty keys, sets "generatedAt" and the "toc"), so only the dicts and
+    lists it modifies are copied. Everything else, including the data
+    arrays, is shared, and `scidata_dict` is left untouched.
+
+    Args:
+        scidata_dict (dict): SciData JSON-LD dictionary
+
+    Returns:
+        scidata (SciData): SciData object over the copy
+    """
+    meta = dict(scidata_dict)
+    graph = meta["@graph"] = dict(meta["@graph"])
+    graph["toc"] = list(graph.get("toc", list()))
+    if isinstance(graph.get("scidata"), dict):
+        scidata = graph["scidata"] = dict(graph["scidata"])
+        for section in _SCIDATA_SECTIONS:
+            if isinstance(scidata.get(section), dict):
+                scidata[section] = dict(scidata[section])
+        dataset = scidata.get("dataset", dict())
+        for name in _DATASET_LISTS:
+            if isinstance(dataset.get(name), list):
+                dataset[name] = [
+                    dict(entry) if isinstance(entry, dict) else entry
+                    for entry in dataset[name]
+                ]
+
+    uid = graph.get("uid", _DEFAULT_UID)
+    scidata_obj = SciData(uid)
+    scidata_obj.meta = meta
+    return scidata_obj
+
 
 def read_jcamp(filename: str) -> dict:
     """
@@ -29,9 +70,5 @@ def write_jcamp(filename: str, scidata_dict: dict):
         filename (str): Filename for JCAMP-DX file
         scidata_dict (dict): SciData JSON-LD dictionary to write out
     """
-    uid = scidata_dict.get("@graph").get("uid", _DEFAULT_UID)
-    scidata = SciData(uid)
-    scidata.meta = scidata_dict
-    if "toc" not in scidata.meta["@graph"]:
-        scidata.meta["@graph"]["toc"] = list()
+    scidata = to_scidata_object(scidata_dict)
     scidatalib.io.write(filename, scidata, ioformat="jcamp")
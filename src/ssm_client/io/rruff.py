@@ -1,7 +1,6 @@
 import scidatalib.io
-from scidatalib.scidata import SciData
 
-_DEFAULT_UID = "scidata:jsonld"
+from .jcamp import to_scidata_object
 
 
 def read_rruff(filename: str) -> dict:
@@ -28,9 +27,5 @@ def write_rruff(filename: str, scidata_dict: dict) -> dict:
         filename (str): Filename for RRUFF file
         scidata_dict (dict): SciData JSON-LD dictionary to write out
     """
-    uid = scidata_dict.get("@graph").get("uid", _DEFAULT_UID)
-    scidata = SciData(uid)
-    scidata.meta = scidata_dict
-    if "toc" not in scidata.meta["@graph"]:
-        scidata.meta["@graph"]["toc"] = list()
+    scidata = to_scidata_object(scidata_dict)
     scidatalib.io.write(filename, scidata, ioformat="rruff")
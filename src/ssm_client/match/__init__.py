@@ -0,0 +1,34 @@
+"""Local spectral matching for ssm-client."""
+
+from .ann import IVFIndex
+from .facets import FacetIndex
+from .incremental import IncrementalLibrary
+from .library import (
+    Match,
+    MissingSpectrumException,
+    SpectralLibrary,
+    UnsupportedMetricException,
+)
+from .peaks import PeakIndex
+from .preprocess import Pipeline
+from .pyramid import PyramidIndex
+from .quantize import QuantizedIndex
+from .sharded import ShardedSearch
+from .snapshot import open_snapshot, write_snapshot
+
+__all__ = [
+    "FacetIndex",
+    "IVFIndex",
+    "IncrementalLibrary",
+    "Match",
+    "MissingSpectrumException",
+    "PeakIndex",
+    "Pipeline",
+    "PyramidIndex",
+    "QuantizedIndex",
+    "ShardedSearch",
+    "SpectralLibrary",
+    "UnsupportedMetricException",
+    "open_snapshot",
+    "write_snapshot",
+]
@@ -0,0 +1,295 @@
+from typing import List
+
+import numpy as np
+
+from .library import SpectralLibrary, _check_metric, prepare, score, top_k
+
+_ASSIGN_CHUNK_SIZE = 16384
+_FORMAT_VERSION = 1
+
+
+class IndexMismatchException(Exception):
+    """Raised when a saved index does not belong to the given library"""
+
+
+def _nearest_centroids(
+    vectors: np.ndarray,
+    centroids: np.ndarray,
+    n: int = 1,
+) -> np.ndarray:
+    """
+    Indices of the `n` nearest centroids (euclidean) for each vector,
+    computed in chunks to bound memory
+
+    Returns:
+        nearest (np.ndarray): (n vectors, n) centroid indices, nearest first
+    """
+    centroid_norms = np.einsum("ij,ij->i", centroids, centroids)
+    nearest = np.empty((vectors.shape[0], n), dtype=np.intp)
+    for start in range(0, vectors.shape[0], _ASSIGN_CHUNK_SIZE):
+        chunk = vectors[start:start + _ASSIGN_CHUNK_SIZE]
+        distances = centroid_norms[None, :] - 2.0 * (chunk @ centroids.T)
+        if n == 1:
+            nearest[start:start + len(chunk), 0] = distances.argmin(axis=1)
+            continue
+        for row, distance in enumerate(distances):
+            nearest[start + row] = top_k(distance, n, "euclidean")
+    return nearest
+
+
+def kmeans(
+    vectors: np.ndarray,
+    n_clusters: int,
+    n_iter: int = 10,
+    seed: int = 0,
+) -> tuple:
+    """
+    Lloyd's k-means with random initialization
+
+    Args:
+        vectors (np.ndarray): (n vectors, n features) data
+        n_clusters (int): Number of clusters
+        n_iter (int): Number of iterations
+        seed (int): Seed for initialization and re-seeding empty clusters
+
+    Returns:
+        centroids (np.ndarray): (n_clusters, n features) centroids
+        assignment (np.ndarray): Cluster index of each vector
+    """
+    rng = np.random.default_rng(seed)
+    n_clusters = min(n_clusters, vectors.shape[0])
+    choice = rng.choice(vectors.shape[0], n_clusters, replace=False)
+    centroids = np.array(vectors[choice], dtype=np.float64)
+
+    for _ in range(n_iter):
+        assignment = _nearest_centroids(vectors, centroids)[:, 0]
+        counts = np.bincount(assignment, minlength=n_clusters)
+        empty = counts == 0
+
+        # Per-cluster sums as segment sums over the vectors sorted by cluster
+        order = np.argsort(assignment, kind="stable")
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        sums = np.zeros_like(centroids)
+        sums[~empty] = np.add.reduceat(
+            vectors[order], starts[~empty], axis=0, dtype=np.float64
+        )
+        centroids[~empty] = sums[~empty] / counts[~empty, None]
+        if empty.any():
+            reseed = rng.choice(vectors.shape[0], empty.sum(), replace=False)
+            centroids[empty] = vectors[reseed]
+
+    assignment = _nearest_centroids(vectors, centroids)[:, 0]
+    return centroids.astype(vectors.dtype), assignment
+
+
+class IVFIndex:
+    def __init__(
+        self,
+        library: SpectralLibrary,
+        n_lists: int = None,
+        metric: str = "cosine",
+        n_iter: int = 10,
+        seed: int = 0,
+        rebuild_growth: float = 0.5,
+    ):
+        """
+        Initialize an IVFIndex object
+
+        Inverted-file (IVF) index: the prepared library spectra are
+        clustered with k-means and each cluster keeps the list of its
+        rows. A query only visits the `n_probe` lists with the nearest
+        centroids and scores that shortlist exactly, so query cost grows
+        with the list size instead of the library size.
+
+        Entries added to the library after the build join the list of
+        their nearest centroid; the clustering is only redone once the
+        library grew by more than `rebuild_growth` since it was built.
+
+        Args:
+            library (SpectralLibrary): Library to index
+            n_lists (int): Number of clusters, defaults to sqrt(n entries)
+                at build time
+            metric (str): Choice of metric. Default: "cosine"
+                Choices: ["cosine", "pearson", "euclidean"]
+            n_iter (int): Number of k-means iterations
+            seed (int): Seed for k-means
+            rebuild_growth (float): Fraction of entries added since the
+                build above which `update` reclusters the library
+        """
+        _check_metric(metric)
+        self.library = library
+        self.metric = metric
+        self._n_lists = n_lists
+        self.n_lists = n_lists
+        self.n_iter = n_iter
+        self.seed = seed
+        self.rebuild_growth = rebuild_growth
+
+        self.centroids = None
+        self.order = None
+        self.offsets = None
+        self.n_entries = None
+        self.n_clustered = None
+
+    def build(self):
+        """
+        Cluster the library and build the inverted lists
+
+        Returns:
+            index (IVFIndex): This index, to allow chaining
+        """
+        prepared, _ = self.library._prepared_matrix(self.metric)
+        n_lists = self._n_lists or max(1, int(np.sqrt(len(self.library))))
+        self.centroids, assignment = kmeans(
+            prepared, n_lists, n_iter=self.n_iter, seed=self.seed
+        )
+        self.n_lists = self.centroids.shape[0]
+        self._set_lists(assignment)
+        self.n_entries = len(self.library)
+        self.n_clustered = len(self.library)
+        return self
+
+    def update(self):
+        """
+        Add the entries the library gained since the last build or update
+        to the lists of their nearest centroids, or rebuild the index when
+        the library grew by more than `rebuild_growth` since it was built
+
+        Returns:
+            index (IVFIndex): This index, to allow chaining
+        """
+        if self.centroids is None or len(self.library) > (
+            self.n_clustered * (1.0 + self.rebuild_growth)
+        ):
+            return self.build()
+        if not self.stale:
+            return self
+
+        prepared, _ = self.library._prepared_matrix(self.metric)
+        assignment = np.empty(self.n_entries, dtype=np.intp)
+        assignment[self.order] = np.repeat(
+            np.arange(self.n_lists), np.diff(self.offsets)
+        )
+        new = _nearest_centroids(prepared[self.n_entries:], self.centroids)
+        self._set_lists(np.concatenate([assignment, new[:, 0]]))
+        self.n_entries = len(self.library)
+        return self
+
+    @property
+    def stale(self) -> bool:
+        """
+        Whether the library gained entries since the index was built
+        or updated
+        """
+        return self.n_entries != len(self.library)
+
+    def _set_lists(self, assignment: np.ndarray):
+        """
+        Store the lists as rows sorted by cluster plus per-cluster offsets
+        """
+        self.order = np.argsort(assignment, kind="stable")
+        counts = np.bincount(assignment, minlength=self.n_lists)
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+
+    def candidates(self, query: np.ndarray, n_probe: int) -> np.ndarray:
+        """
+        Library rows in the `n_probe` lists nearest to a prepared query
+
+        Args:
+            query (np.ndarray): Query prepared for the index metric
+            n_probe (int): Number of lists to visit
+
+        Returns:
+            rows (np.ndarray): Library rows to score
+        """
+        n_probe = min(n_probe, self.n_lists)
+        lists = _nearest_centroids(query[None, :], self.centroids, n_probe)[0]
+        return np.concatenate(
+            [self.order[self.offsets[i]:self.offsets[i + 1]] for i in lists]
+        )
+
+    def search(self, spectrum, k: int = 10, n_probe: int = 8) -> List:
+        """
+        Approximate search for the `k` most similar library entries
+
+        Higher `n_probe` trades latency for recall, with `n_probe` equal
+        to `n_lists` giving the same result as an exhaustive search. The
+        index is updated first when entries were added to the library
+        since it was built (see `update`), so they are always searchable.
+
+        Args:
+            spectrum: SciData dict, DatasetContainer, Spectrum or (x, y) tuple
+            k (int): Number of hits to return
+            n_probe (int): Number of lists to visit
+
+        Returns:
+            matches (List[Match]): Best matches first
+        """
+        if self.centroids is None or self.stale:
+            self.update()
+        prepared, norms = self.library._prepared_matrix(self.metric)
+        query = self.library.prepare_query(spectrum)[None, :]
+        query = prepare(query, self.metric)
+
+        rows = self.candidates(query[0], n_probe)
+        shortlist_norms = None if norms is None else norms[rows]
+        scores = score(prepared[rows], query, self.metric, shortlist_norms)[0]
+        best = top_k(scores, k, self.metric)
+        return self.library._matches(rows[best], scores[best])
+
+    def save(self, filename: str):
+        """
+        Save the index to a NumPy .npz file
+
+        Args:
+            filename (str): Filename for the index
+        """
+        np.savez(
+            filename,
+            version=_FORMAT_VERSION,
+            metric=self.metric,
+            n_iter=self.n_iter,
+            seed=self.seed,
+            centroids=self.centroids,
+            order=self.order,
+            offsets=self.offsets,
+        )
+
+    @classmethod
+    def load(cls, filename: str, library: SpectralLibrary):
+        """
+        Load an index saved with `save` for the library it was built from
+
+        Args:
+            filename (str): Filename of the index
+            library (SpectralLibrary): Library the index was built from
+
+        Raises:
+            IndexMismatchException: Raised when the index does not match
+                the size or grid of the library
+
+        Returns:
+            index (IVFIndex): Loaded index
+        """
+        with np.load(filename) as data:
+            centroids = data["centroids"]
+            if data["order"].size != len(library):
+                msg = "Index has {n} entries but the library has {m}"
+                msg = msg.format(n=data["order"].size, m=len(library))
+                raise IndexMismatchException(msg)
+            if centroids.shape[1] != library.grid.size:
+                raise IndexMismatchException("Index and library grids differ")
+
+            index = cls(
+                library,
+                metric=str(data["metric"]),
+                n_iter=int(data["n_iter"]),
+                seed=int(data["seed"]),
+            )
+            index.n_lists = centroids.shape[0]
+            index.centroids = centroids
+            index.order = data["order"]
+            index.offsets = data["offsets"]
+        index.n_entries = len(library)
+        index.n_clustered = len(library)
+        return index
@@ -0,0 +1,411 @@
+import collections
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+from .library import (
+    _METRIC_COSINE,
+    _METRIC_EUCLIDEAN,
+    Match,
+    SpectralLibrary,
+    top_k,
+)
+
+# Above this fraction of selected rows, scoring everything and masking
+# is cheaper than gathering the selected rows
+_GATHER_FRACTION = 0.5
+
+
+def _key(value) -> str:
+    return str(value).casefold()
+
+
+class Bitmap:
+    def __init__(self, size: int, rows: np.ndarray = None, bits=None):
+        """
+        Initialize a Bitmap object
+
+        Set of library rows stored, like a roaring bitmap container, as a
+        sorted array of rows while sparse and as packed bits once dense,
+        whichever is smaller.
+
+        Args:
+            size (int): Number of rows in the universe
+            rows (np.ndarray): Sorted, unique rows in the set
+            bits (np.ndarray): Packed bits of the set, see `np.packbits`
+        """
+        self.size = size
+        self.rows = rows
+        self.bits = bits
+        if rows is None and bits is None:
+            self.rows = np.empty(0, dtype=np.int64)
+        self._compact()
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[int], size: int):
+        """
+        Bitmap of the given rows
+        """
+        rows = np.unique(np.asarray(list(rows), dtype=np.int64))
+        return cls(size, rows=rows)
+
+    @classmethod
+    def from_mask(cls, mask: np.ndarray):
+        """
+        Bitmap of the rows where a boolean mask is True
+        """
+        mask = np.asarray(mask, dtype=bool)
+        return cls(mask.size, bits=np.packbits(mask))
+
+    def _compact(self):
+        """
+        Switch to the smaller representation
+        """
+        dense_bytes = -(-self.size // 8)
+        if self.rows is not None and self.rows.nbytes > dense_bytes:
+            self.bits = np.packbits(self.to_mask())
+            self.rows = None
+        elif self.bits is not None and 8 * len(self) < dense_bytes:
+            self.rows = self.to_rows()
+            self.bits = None
+
+    def __len__(self) -> int:
+        if self.rows is not None:
+            return self.rows.size
+        return int(np.unpackbits(self.bits, count=self.size).sum())
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Bitmap) and np.array_equal(
+            self.to_rows(), other.to_rows()
+        )
+
+    def __repr__(self) -> str:
+        return f"Bitmap(size={self.size}, count={len(self)})"
+
+    def to_mask(self) -> np.ndarray:
+        """
+        Boolean mask over the universe
+        """
+        if self.bits is not None:
+            return np.unpackbits(self.bits, count=self.size).astype(bool)
+        mask = np.zeros(self.size, dtype=bool)
+        mask[self.rows] = True
+        return mask
+
+    def to_rows(self) -> np.ndarray:
+        """
+        Sorted rows in the set
+        """
+        if self.rows is not None:
+            return self.rows
+        return np.flatnonzero(self.to_mask())
+
+    def _dense(self) -> np.ndarray:
+        if self.bits is not None:
+            return self.bits
+        return np.packbits(self.to_mask())
+
+    def __and__(self, other):
+        if self.rows is not None and other.rows is not None:
+            rows = np.intersect1d(self.rows, other.rows, assume_unique=True)
+            return Bitmap(self.size, rows=rows)
+        if self.rows is not None or other.rows is not None:
+            sparse, dense = (self, other) if self.rows is not None else (
+                other, self
+            )
+            rows = sparse.rows[dense.to_mask()[sparse.rows]]
+            return Bitmap(self.size, rows=rows)
+        return Bitmap(self.size, bits=self.bits & other.bits)
+
+    def __or__(self, other):
+        if self.rows is not None and other.rows is not None:
+            rows = np.union1d(self.rows, other.rows)
+            return Bitmap(self.size, rows=rows)
+        return Bitmap(self.size, bits=self._dense() | other._dense())
+
+    def __invert__(self):
+        bits = ~self._dense()
+        # Clear the padding bits past the end of the universe
+        padding = bits.size * 8 - self.size
+        if padding:
+            bits[-1] &= np.uint8((0xFF << padding) & 0xFF)
+        return Bitmap(self.size, bits=bits)
+
+
+class Predicate:
+    """
+    Boolean condition on facet values, combined with &, | and ~
+    """
+
+    def evaluate(self, index) -> Bitmap:
+        """
+        Rows of a FacetIndex satisfying the predicate
+
+        Args:
+            index (FacetIndex): Index to evaluate against
+
+        Returns:
+            rows (Bitmap): Matching rows
+        """
+        raise NotImplementedError
+
+    def __and__(self, other):
+        return And(self, other)
+
+    def __or__(self, other):
+        return Or(self, other)
+
+    def __invert__(self):
+        return Not(self)
+
+
+class Term(Predicate):
+    def __init__(self, field: str, value: str):
+        """
+        Initialize a Term object
+
+        Entries with `value` (case insensitive) for a facet field,
+        i.e. Term("crystal system", "tetragonal").
+
+        Args:
+            field (str): Facet field
+            value (str): Facet value
+        """
+        self.field = field
+        self.value = value
+
+    def evaluate(self, index) -> Bitmap:
+        return index.bitmap(self.field, self.value)
+
+
+class AnyOf(Predicate):
+    def __init__(self, field: str, values: Iterable[str]):
+        """
+        Initialize an AnyOf object
+
+        Entries with any of `values` for a facet field.
+
+        Args:
+            field (str): Facet field
+            values (Iterable[str]): Facet values
+        """
+        self.field = field
+        self.values = list(values)
+
+    def evaluate(self, index) -> Bitmap:
+        bitmap = Bitmap(index.size)
+        for value in self.values:
+            bitmap = bitmap | index.bitmap(self.field, value)
+        return bitmap
+
+
+class Contains(Predicate):
+    def __init__(self, field: str, text: str):
+        """
+        Initialize a Contains object
+
+        Entries with a value of a facet field containing `text` (case
+        insensitive), i.e. Contains("formula", "PO4"). Only the distinct
+        values of the field are scanned.
+
+        Args:
+            field (str): Facet field
+            text (str): Substring to look for
+        """
+        self.field = field
+        self.text = text
+
+    def evaluate(self, index) -> Bitmap:
+        text = _key(self.text)
+        values = [v for v in index.values(self.field) if text in _key(v)]
+        return AnyOf(self.field, values).evaluate(index)
+
+
+class And(Predicate):
+    def __init__(self, *predicates: Predicate):
+        """
+        Initialize an And object
+
+        Entries satisfying all of the predicates, every entry when there
+        are none.
+
+        Args:
+            predicates (Predicate): Predicates to combine
+        """
+        self.predicates = predicates
+
+    def evaluate(self, index) -> Bitmap:
+        if not self.predicates:
+            return ~Bitmap(index.size)
+        bitmaps = [predicate.evaluate(index) for predicate in self.predicates]
+        # Intersect the smallest sets first
+        bitmaps.sort(key=len)
+        bitmap = bitmaps[0]
+        for other in bitmaps[1:]:
+            bitmap = bitmap & other
+        return bitmap
+
+
+class Or(Predicate):
+    def __init__(self, *predicates: Predicate):
+        """
+        Initialize an Or object
+
+        Entries satisfying any of the predicates, none when there are
+        none.
+
+        Args:
+            predicates (Predicate): Predicates to combine
+        """
+        self.predicates = predicates
+
+    def evaluate(self, index) -> Bitmap:
+        bitmap = Bitmap(index.size)
+        for predicate in self.predicates:
+            bitmap = bitmap | predicate.evaluate(index)
+        return bitmap
+
+
+class Not(Predicate):
+    def __init__(self, predicate: Predicate):
+        """
+        Initialize a Not object
+
+        Entries not satisfying a predicate.
+
+        Args:
+            predicate (Predicate): Predicate to negate
+        """
+        self.predicate = predicate
+
+    def evaluate(self, index) -> Bitmap:
+        return ~self.predicate.evaluate(index)
+
+
+class FacetIndex:
+    def __init__(self):
+        """
+        Initialize a FacetIndex object
+
+        Bitmap index from the facet values of library entries (see
+        `facets_from_scidata`) to library rows, used to restrict a
+        search with boolean predicates before any spectrum is scored.
+        """
+        self.size = 0
+        self._entries = collections.defaultdict(
+            lambda: collections.defaultdict(list)
+        )
+        self._names = collections.defaultdict(dict)
+        self._bitmaps = dict()
+
+    def __len__(self) -> int:
+        return self.size
+
+    @classmethod
+    def from_library(cls, library: SpectralLibrary):
+        """
+        Index the facets kept in the metadata of every library entry
+
+        Args:
+            library (SpectralLibrary): Library to index
+
+        Returns:
+            index (FacetIndex): Index keyed by library row
+        """
+        index = cls()
+        for row in range(len(library)):
+            metadata = library.metadata[row] or dict()
+            index.add(row, metadata.get("facets", dict()))
+        index.size = len(library)
+        return index
+
+    def add(self, row: int, facets: Dict[str, List[str]]):
+        """
+        Index the facet values of a library row
+
+        Args:
+            row (int): Library row
+            facets (Dict[str, List[str]]): Values of each facet field
+        """
+        for field, values in facets.items():
+            for value in values:
+                self._entries[field][_key(value)].append(row)
+                self._names[field].setdefault(_key(value), value)
+        self.size = max(self.size, row + 1)
+        self._bitmaps.clear()
+
+    def fields(self) -> List[str]:
+        """
+        Indexed facet fields
+        """
+        return sorted(self._entries)
+
+    def values(self, field: str) -> List[str]:
+        """
+        Distinct values of a facet field
+        """
+        return sorted(self._names.get(field, dict()).values())
+
+    def bitmap(self, field: str, value: str) -> Bitmap:
+        """
+        Rows with `value` (case insensitive) for a facet field
+        """
+        key = (field, _key(value))
+        if key not in self._bitmaps:
+            rows = self._entries.get(field, dict()).get(key[1], [])
+            self._bitmaps[key] = Bitmap.from_rows(rows, self.size)
+        return self._bitmaps[key]
+
+    def rows(self, predicate: Predicate) -> np.ndarray:
+        """
+        Library rows satisfying a predicate
+
+        Args:
+            predicate (Predicate): Condition on the facet values
+
+        Returns:
+            rows (np.ndarray): Sorted library rows
+        """
+        return predicate.evaluate(self).to_rows()
+
+    def search(
+        self,
+        library: SpectralLibrary,
+        spectrum,
+        predicate: Predicate,
+        k: int = 10,
+        metric: str = _METRIC_COSINE,
+    ) -> List[Match]:
+        """
+        Search only the library entries satisfying a predicate
+
+        Selective predicates only score the selected rows; broad ones
+        score the whole library and drop the other rows, which is
+        cheaper than gathering most of the matrix.
+
+        Args:
+            library (SpectralLibrary): Library the index was built from
+            spectrum: SciData dict, DatasetContainer, Spectrum or (x, y) tuple
+            predicate (Predicate): Condition on the facet values
+            k (int): Number of hits to return
+            metric (str): Choice of metric. Default: "cosine"
+                Choices: ["cosine", "pearson", "euclidean"]
+
+        Returns:
+            matches (List[Match]): Best matches first
+        """
+        bitmap = predicate.evaluate(self)
+        count = len(bitmap)
+        if not count:
+            return []
+        if count < _GATHER_FRACTION * len(library):
+            return library.search(
+                spectrum, k=k, metric=metric, rows=bitmap.to_rows()
+            )
+
+        scores = library.scores(spectrum, metric=metric)
+        excluded = np.ones(len(library), dtype=bool)
+        excluded[bitmap.to_rows()] = False
+        scores[excluded] = np.inf if metric == _METRIC_EUCLIDEAN else -np.inf
+        best = top_k(scores, min(k, count), metric)
+        return library._matches(best, scores[best])
@@ -0,0 +1,372 @@
+import os
+import threading
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List
+
+import numpy as np
+
+from ssm_client.services.dataset_service import EVENT_DELETE
+from .library import (
+    _METRIC_COSINE,
+    _METRIC_EUCLIDEAN,
+    Match,
+    MissingSpectrumException,
+    SpectralLibrary,
+    _check_metric,
+    prepare,
+    score,
+    top_k,
+)
+from .snapshot import open_snapshot, write_snapshot
+
+
+def _empty_like(library: SpectralLibrary) -> SpectralLibrary:
+    """
+    New, empty library with the grid and settings of `library`
+    """
+    return SpectralLibrary(
+        grid=library.resampler.grid,
+        normalize=library.normalize,
+        dtype=library.dtype,
+        interpolation=library.resampler.method,
+        preprocess=library.preprocess,
+    )
+
+
+class IncrementalLibrary:
+    def __init__(
+        self,
+        base: SpectralLibrary = None,
+        filename: str = None,
+        compact_ratio: float = None,
+        prepared_metrics=(_METRIC_COSINE,),
+    ):
+        """
+        Initialize an IncrementalLibrary object
+
+        Keeps a library current under dataset creates, replaces and
+        deletes without rebuilding it. The base library (i.e. an opened
+        snapshot) is never modified: new and replaced spectra go to a
+        small append segment and removed entries are marked in tombstone
+        bitmaps, so each change costs one resampled row. Searches score
+        the base and the segment and skip tombstoned rows. `compact`
+        folds the changes into a new base, optionally in the background.
+
+        Args:
+            base (SpectralLibrary): Library to start from, defaults to an
+                empty library
+            filename (str): Snapshot file compactions are written to,
+                defaults to the snapshot backing `base` if any
+            compact_ratio (float): Start a background compaction once the
+                changes exceed this fraction of the base size. Default:
+                only compact when `compact` is called
+            prepared_metrics (Iterable[str]): Metrics stored prepared in
+                compacted snapshots, see `write_snapshot`
+        """
+        self.base = SpectralLibrary() if base is None else base
+        self.filename = filename or self.base.filename
+        self.compact_ratio = compact_ratio
+        self.prepared_metrics = prepared_metrics
+
+        self._lock = threading.RLock()
+        self._executor = None
+        self._compaction = None
+        self._reset(self.base, _empty_like(self.base))
+
+    def _reset(self, base: SpectralLibrary, segment: SpectralLibrary):
+        self.base = base
+        self.segment = segment
+        self._dead = np.zeros(len(base), dtype=bool)
+        self._segment_keys = []
+        self._segment_dead = []
+        self._segment_positions = dict()
+
+    def __len__(self) -> int:
+        with self._lock:
+            n_dead = int(self._dead.sum())
+            return len(self.base) - n_dead + len(self._segment_positions)
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            return self._locate(key) is not None
+
+    @property
+    def changes(self) -> int:
+        """
+        Number of segment rows and tombstones not yet compacted
+        """
+        return len(self.segment) + int(self._dead.sum())
+
+    def _locate(self, key: Any) -> tuple:
+        """
+        (in segment, row) of the live entry for `key`, or None
+        """
+        if key in self._segment_positions:
+            return True, self._segment_positions[key]
+        row = self.base._positions.get(key)
+        if row is not None and not self._dead[row]:
+            return False, row
+        return None
+
+    def _remove(self, key: Any) -> bool:
+        location = self._locate(key)
+        if location is None:
+            return False
+        in_segment, row = location
+        if in_segment:
+            del self._segment_positions[key]
+            self._segment_dead[row] = True
+        else:
+            self._dead[row] = True
+        return True
+
+    def upsert(self, spectrum, key: Any = None, metadata: dict = None):
+        """
+        Add a spectrum, replacing the current entry for its key if any
+
+        Args:
+            spectrum: SciData dict, DatasetContainer, Spectrum or (x, y) tuple
+            key (Any): Key for the entry, see `SpectralLibrary.add`
+            metadata (dict): Metadata for the entry, see
+                `SpectralLibrary.add`
+
+        Raises:
+            ValueError: Raised when no key is given or found
+        """
+        x, y, default_key, default_metadata = self.base._spectrum(spectrum)
+        key = default_key if key is None else key
+        if key is None:
+            raise ValueError("A key is required for incremental updates")
+        if metadata is None:
+            metadata = default_metadata
+
+        with self._lock:
+            self._remove(key)
+            row = self.segment.add((x, y), key=len(self.segment),
+                                   metadata=metadata)
+            self._segment_keys.append(key)
+            self._segment_dead.append(False)
+            self._segment_positions[key] = row
+        self._maybe_compact()
+
+    def delete(self, key: Any):
+        """
+        Remove the entry for a key
+
+        Args:
+            key (Any): Key of the entry
+
+        Raises:
+            KeyError: Raised when there is no entry for `key`
+        """
+        with self._lock:
+            if not self._remove(key):
+                raise KeyError(key)
+        self._maybe_compact()
+
+    def handle_event(self, event: str, uuid: str, dataset=None):
+        """
+        Apply a DatasetService change, see `DatasetService.add_listener`
+
+        A dataset replaced by one without a spectrum is removed with a
+        warning.
+
+        Args:
+            event (str): "create", "replace", "update" or "delete"
+            uuid (str): UUID of the changed dataset
+            dataset (DatasetContainer): Dataset after the change
+        """
+        if event == EVENT_DELETE:
+            with self._lock:
+                self._remove(uuid)
+            return
+        try:
+            self.upsert(dataset, key=uuid)
+        except MissingSpectrumException:
+            warnings.warn(f"Dataset {uuid} has no spectrum, removing")
+            with self._lock:
+                self._remove(uuid)
+
+    def watch(self, dataset_service):
+        """
+        Follow the changes made through a DatasetService
+
+        Args:
+            dataset_service (DatasetService): Service to listen to
+
+        Returns:
+            library (IncrementalLibrary): This library, to allow chaining
+        """
+        dataset_service.add_listener(self.handle_event)
+        return self
+
+    def search(
+        self,
+        spectrum,
+        k: int = 10,
+        metric: str = _METRIC_COSINE,
+    ) -> List[Match]:
+        """
+        Find the `k` live entries most similar to a query spectrum
+
+        Match indices number the base rows first, then the segment rows.
+
+        Args:
+            spectrum: SciData dict, DatasetContainer, Spectrum or (x, y) tuple
+            k (int): Number of hits to return
+            metric (str): Choice of metric. Default: "cosine"
+                Choices: ["cosine", "pearson", "euclidean"]
+
+        Returns:
+            matches (List[Match]): Best matches first
+        """
+        _check_metric(metric)
+        query = prepare(self.base.prepare_query(spectrum)[None, :], metric)
+        worst = np.inf if metric == _METRIC_EUCLIDEAN else -np.inf
+
+        with self._lock:
+            base, segment = self.base, self.segment
+            parts, dead = [], [self._dead]
+            for library in (base, segment):
+                if not len(library):
+                    parts.append(np.empty(0, dtype=query.dtype))
+                    continue
+                prepared, norms = library._prepared_matrix(metric)
+                parts.append(score(prepared, query, metric, norms)[0])
+            dead.append(np.asarray(self._segment_dead, dtype=bool))
+            dead = np.concatenate(dead)
+            segment_keys = list(self._segment_keys)
+
+        scores = np.concatenate(parts)
+        scores[dead] = worst
+        best = top_k(scores, k, metric)
+        best = best[~dead[best]]
+
+        matches = []
+        n_base = len(base)
+        for i in best:
+            if i < n_base:
+                key, metadata = base.keys[i], base.metadata[i]
+            else:
+                key = segment_keys[i - n_base]
+                metadata = segment.metadata[i - n_base]
+            matches.append(Match(key, float(scores[i]), int(i), metadata))
+        return matches
+
+    def _maybe_compact(self):
+        if self.compact_ratio is None:
+            return
+        with self._lock:
+            running = self._compaction is not None
+            limit = self.compact_ratio * max(len(self.base), 1)
+            if running or self.changes <= limit:
+                return
+        self.compact(background=True)
+
+    def compact(self, filename: str = None, background: bool = False):
+        """
+        Fold the segment and tombstones into a new base library
+
+        The live rows are copied into a new base, written to a snapshot
+        and reopened memory-mapped when a filename is set. Changes made
+        while compacting are carried over to the new base and segment.
+
+        Args:
+            filename (str): Snapshot file to write, defaults to `filename`
+            background (bool): Compact in a background thread
+
+        Returns:
+            base (SpectralLibrary): The new base library or, when
+                `background` is True, a Future resolving to it
+        """
+        filename = filename or self.filename
+        with self._lock:
+            if self._compaction is not None:
+                future = self._compaction
+            else:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=1)
+                future = self._executor.submit(self._compact, filename)
+                self._compaction = future
+        if background:
+            return future
+        return future.result()
+
+    def _compact(self, filename: str) -> SpectralLibrary:
+        try:
+            with self._lock:
+                base, segment = self.base, self.segment
+                dead = self._dead.copy()
+                n_segment = len(segment)
+                segment_matrix = segment.matrix
+                segment_dead = np.asarray(self._segment_dead, dtype=bool)
+                segment_keys = list(self._segment_keys)
+
+            live = np.flatnonzero(~dead)
+            segment_live = np.flatnonzero(~segment_dead)
+            compacted = _empty_like(base)
+            compacted._matrix = np.concatenate(
+                [base.matrix[live], segment_matrix[segment_live]]
+            )
+            compacted.keys = [base.keys[i] for i in live]
+            compacted.keys += [segment_keys[i] for i in segment_live]
+            compacted.metadata = [base.metadata[i] for i in live]
+            compacted.metadata += [segment.metadata[i] for i in segment_live]
+            compacted._positions = {
+                key: i for i, key in enumerate(compacted.keys)
+            }
+            if filename:
+                partial = f"{filename}.partial"
+                write_snapshot(partial, compacted, self.prepared_metrics)
+                os.replace(partial, filename)
+                compacted = open_snapshot(filename)
+
+            with self._lock:
+                self._swap(compacted, dead, n_segment, segment_dead)
+            return compacted
+        finally:
+            with self._lock:
+                self._compaction = None
+
+    def _swap(
+        self,
+        compacted: SpectralLibrary,
+        dead: np.ndarray,
+        n_segment: int,
+        segment_dead: np.ndarray,
+    ):
+        """
+        Replace the base with `compacted`, keeping the changes made since
+        the compaction started
+        """
+        base, segment = self.base, self.segment
+        keys = self._segment_keys
+        removed = [base.keys[i] for i in np.flatnonzero(self._dead & ~dead)]
+        now_dead = np.asarray(self._segment_dead[:n_segment], dtype=bool)
+        removed += [keys[i] for i in np.flatnonzero(now_dead & ~segment_dead)]
+
+        tail = _empty_like(base)
+        tail._matrix = np.array(segment.matrix[n_segment:])
+        tail.keys = list(range(len(tail._matrix)))
+        tail.metadata = list(segment.metadata[n_segment:])
+        tail._positions = {key: key for key in tail.keys}
+        tail_keys = keys[n_segment:]
+        tail_dead = self._segment_dead[n_segment:]
+
+        self._reset(compacted, tail)
+        for key in removed:
+            self._dead[compacted._positions[key]] = True
+        for row, (key, is_dead) in enumerate(zip(tail_keys, tail_dead)):
+            self._segment_keys.append(key)
+            self._segment_dead.append(is_dead)
+            if not is_dead:
+                self._segment_positions[key] = row
+
+    def close(self):
+        """
+        Wait for a running compaction and stop the background thread
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
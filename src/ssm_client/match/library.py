@@ -0,0 +1,747 @@
+import itertools
+import warnings
+from typing import Any, Iterable, Iterator, List, NamedTuple
+
+import numpy as np
+
+from ssm_client.containers import DatasetContainer
+from ssm_client.metadata import facets_from_scidata
+from ssm_client.spectrum import MissingSpectrumException, Spectrum
+from .resample import Resampler
+
+_METRIC_COSINE = "cosine"
+_METRIC_PEARSON = "pearson"
+_METRIC_EUCLIDEAN = "euclidean"
+_METRIC_CHOICES = [_METRIC_COSINE, _METRIC_PEARSON, _METRIC_EUCLIDEAN]
+
+_NORMALIZE_MAX = "max"
+_NORMALIZE_L2 = "l2"
+_NORMALIZE_CHOICES = [_NORMALIZE_MAX, _NORMALIZE_L2, None]
+
+_DEFAULT_GRID_START = 100.0
+_DEFAULT_GRID_STOP = 4000.0
+_DEFAULT_GRID_STEP = 2.0
+
+_DEFAULT_MEMORY_BUDGET = 256 * 2**20
+_MIN_QUERY_CHUNK = 64
+_MAX_QUERY_CHUNK = 1024
+
+
+class UnsupportedMetricException(Exception):
+    """Raised when unsupported similarity metric specified"""
+
+
+class Match(NamedTuple):
+    """
+    Library entry matched by a query spectrum
+
+    Attributes:
+        key (str): Key of the library entry (i.e. the dataset UUID)
+        score (float): Similarity (cosine, pearson) or distance (euclidean)
+        index (int): Row of the entry in the library matrix
+        metadata (dict): Metadata of the library entry
+    """
+
+    key: str
+    score: float
+    index: int
+    metadata: dict
+
+
+def default_grid() -> np.ndarray:
+    """
+    Default shared wavenumber grid, 100 to 4000 cm^-1 in 2 cm^-1 steps
+    """
+    start, stop = _DEFAULT_GRID_START, _DEFAULT_GRID_STOP
+    return np.arange(start, stop, _DEFAULT_GRID_STEP)
+
+
+def _check_metric(metric: str):
+    if metric not in _METRIC_CHOICES:
+        msg = (
+            "metric: {metric} not supported\n"
+            "Supported similarity metrics are {choices}"
+        )
+        msg = msg.format(metric=metric, choices=_METRIC_CHOICES)
+        raise UnsupportedMetricException(msg)
+
+
+def xy_from_scidata(scidata_dict: dict) -> tuple:
+    """
+    Pull the x/y data arrays out of the first dataseries of a SciData dict
+
+    Args:
+        scidata_dict (dict): SciData JSON-LD dictionary
+
+    Raises:
+        MissingSpectrumException: Raised when no x-axis / y-axis
+            parameters with data arrays are found
+
+    Returns:
+        x (np.ndarray): x-axis values
+        y (np.ndarray): y-axis values
+    """
+    spectrum = Spectrum.from_scidata(scidata_dict)
+    return spectrum.x, spectrum.y
+
+
+def metadata_from_scidata(scidata_dict: dict) -> dict:
+    """
+    Key metadata of a SciData dict kept alongside each library entry
+    """
+    graph = scidata_dict.get("@graph", {})
+    metadata = {"title": graph.get("title"), "uid": graph.get("uid")}
+    facets = facets_from_scidata(scidata_dict)
+    if facets:
+        metadata["facets"] = facets
+    return metadata
+
+
+def normalize_rows(matrix: np.ndarray, method: str = _NORMALIZE_MAX):
+    """
+    Scale every row of a matrix in place to unit maximum or unit L2 norm
+
+    Args:
+        matrix (np.ndarray): 2D array of spectra, one per row
+        method (str): "max", "l2" or None for no normalization
+
+    Returns:
+        matrix (np.ndarray): The normalized matrix
+    """
+    if method is None:
+        return matrix
+    if method == _NORMALIZE_MAX:
+        scale = np.abs(matrix).max(axis=1, keepdims=True)
+    elif method == _NORMALIZE_L2:
+        scale = np.linalg.norm(matrix, axis=1, keepdims=True)
+    else:
+        raise ValueError(f"Unknown normalization: {method}")
+    scale[scale == 0] = 1.0
+    matrix /= scale
+    return matrix
+
+
+def prepare(matrix: np.ndarray, metric: str) -> np.ndarray:
+    """
+    Transform spectra so a metric reduces to a matrix product
+
+    For cosine rows are L2-normalized, for pearson they are mean-centered
+    first. Euclidean uses the spectra as-is.
+
+    Args:
+        matrix (np.ndarray): 2D array of spectra, one per row
+        metric (str): "cosine", "pearson" or "euclidean"
+
+    Returns:
+        prepared (np.ndarray): New array of prepared spectra
+    """
+    _check_metric(metric)
+    prepared = np.array(matrix, dtype=matrix.dtype, ndmin=2)
+    if metric == _METRIC_PEARSON:
+        prepared -= prepared.mean(axis=1, keepdims=True)
+    if metric in (_METRIC_COSINE, _METRIC_PEARSON):
+        normalize_rows(prepared, _NORMALIZE_L2)
+    return prepared
+
+
+def score(
+    prepared: np.ndarray,
+    queries: np.ndarray,
+    metric: str,
+    squared_norms: np.ndarray = None,
+) -> np.ndarray:
+    """
+    Score prepared queries against prepared library spectra
+
+    Args:
+        prepared (np.ndarray): (n_library, n_grid) prepared library
+        queries (np.ndarray): (n_queries, n_grid) prepared queries
+        metric (str): "cosine", "pearson" or "euclidean"
+        squared_norms (np.ndarray): Cached squared row norms of the
+            library, only used for euclidean
+
+    Returns:
+        scores (np.ndarray): (n_queries, n_library) similarities or,
+            for euclidean, distances
+    """
+    products = queries @ prepared.T
+    if metric != _METRIC_EUCLIDEAN:
+        return products
+    if squared_norms is None:
+        squared_norms = np.einsum("ij,ij->i", prepared, prepared)
+    query_norms = np.einsum("ij,ij->i", queries, queries)
+    distances = squared_norms[None, :] - 2.0 * products
+    distances += query_norms[:, None]
+    np.maximum(distances, 0.0, out=distances)
+    return np.sqrt(distances, out=distances)
+
+
+def top_k(scores: np.ndarray, k: int, metric: str) -> np.ndarray:
+    """
+    Indices of the best `k` scores, best first
+
+    Args:
+        scores (np.ndarray): 1D array of scores
+        k (int): Number of hits to return
+        metric (str): Metric of the scores, euclidean is best when smallest
+
+    Returns:
+        indices (np.ndarray): Indices of the best scores
+    """
+    k = min(k, scores.size)
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    keys = scores if metric == _METRIC_EUCLIDEAN else -scores
+    indices = np.argpartition(keys, k - 1)[:k]
+    return indices[np.argsort(keys[indices], kind="stable")]
+
+
+def top_k_rows(scores: np.ndarray, k: int, metric: str) -> np.ndarray:
+    """
+    Column indices of the best `k` scores of every row, best first
+
+    Args:
+        scores (np.ndarray): (n queries, n scores) array of scores
+        k (int): Number of hits to return per row
+        metric (str): Metric of the scores, euclidean is best when smallest
+
+    Returns:
+        indices (np.ndarray): (n queries, min(k, n scores)) indices
+    """
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        return np.empty((scores.shape[0], 0), dtype=np.intp)
+    keys = scores if metric == _METRIC_EUCLIDEAN else -scores
+    indices = np.argpartition(keys, k - 1, axis=1)[:, :k]
+    order = np.argsort(
+        np.take_along_axis(keys, indices, axis=1), axis=1, kind="stable"
+    )
+    return np.take_along_axis(indices, order, axis=1)
+
+
+def chunk_sizes(
+    n_entries: int,
+    itemsize: int,
+    memory_budget: int = _DEFAULT_MEMORY_BUDGET,
+) -> tuple:
+    """
+    Query and library chunk sizes keeping a score block within a budget
+
+    Queries are chunked first so each block is a large matrix product;
+    the library is only split as well when even the smallest query chunk
+    against the whole library exceeds the budget.
+
+    Args:
+        n_entries (int): Number of library entries
+        itemsize (int): Bytes per score
+        memory_budget (int): Bytes allowed for one block of scores
+
+    Returns:
+        query_chunk (int): Number of queries scored at once
+        library_chunk (int): Number of library entries scored at once
+    """
+    n_entries = max(n_entries, 1)
+    query_chunk = memory_budget // (n_entries * itemsize)
+    query_chunk = min(max(query_chunk, _MIN_QUERY_CHUNK), _MAX_QUERY_CHUNK)
+    library_chunk = max(1, memory_budget // (query_chunk * itemsize))
+    return query_chunk, min(library_chunk, n_entries)
+
+
+def top_k_blocks(
+    prepared: np.ndarray,
+    queries: np.ndarray,
+    k: int,
+    metric: str,
+    squared_norms: np.ndarray = None,
+    block_size: int = None,
+) -> tuple:
+    """
+    Best `k` library rows for each prepared query, scoring the library
+    in blocks of rows and keeping a running top-k
+
+    Args:
+        prepared (np.ndarray): (n_library, n_grid) prepared library
+        queries (np.ndarray): (n_queries, n_grid) prepared queries
+        k (int): Number of hits to return per query
+        metric (str): "cosine", "pearson" or "euclidean"
+        squared_norms (np.ndarray): Cached squared row norms of the
+            library, only used for euclidean
+        block_size (int): Library rows scored at once, default all
+
+    Returns:
+        indices (np.ndarray): (n_queries, k) library rows, best first
+        scores (np.ndarray): (n_queries, k) scores of those rows
+    """
+    n_entries = prepared.shape[0]
+    block_size = block_size or max(n_entries, 1)
+    best_scores = np.empty((queries.shape[0], 0), dtype=prepared.dtype)
+    best = np.empty((queries.shape[0], 0), dtype=np.intp)
+    for start in range(0, n_entries, block_size):
+        stop = start + block_size
+        norms = None if squared_norms is None else squared_norms[start:stop]
+        scores = score(prepared[start:stop], queries, metric, norms)
+        indices = top_k_rows(scores, k, metric)
+        scores = np.take_along_axis(scores, indices, axis=1)
+        best_scores = np.concatenate([best_scores, scores], axis=1)
+        best = np.concatenate([best, indices + start], axis=1)
+        keep = top_k_rows(best_scores, k, metric)
+        best_scores = np.take_along_axis(best_scores, keep, axis=1)
+        best = np.take_along_axis(best, keep, axis=1)
+    return best, best_scores
+
+
+def as_rows(rows) -> np.ndarray:
+    """
+    Convert row indices or a boolean row mask to an array of row indices
+
+    Args:
+        rows (np.ndarray): Row indices, boolean mask or None
+
+    Returns:
+        rows (np.ndarray): Row indices or None
+    """
+    if rows is None:
+        return None
+    rows = np.asarray(rows)
+    if rows.dtype == bool:
+        return np.flatnonzero(rows)
+    return rows.astype(np.intp, copy=False)
+
+
+class SpectralLibrary:
+    def __init__(
+        self,
+        grid: np.ndarray = None,
+        normalize: str = _NORMALIZE_MAX,
+        dtype=np.float32,
+        interpolation: str = "linear",
+        preprocess=None,
+    ):
+        """
+        Initialize a SpectralLibrary object
+
+        Reference spectra are resampled onto a shared grid and stored
+        as the rows of one matrix, so a query is scored against the whole
+        library at once with a single matrix product.
+
+        Args:
+            grid (np.ndarray): Ascending shared grid (i.e. wavenumbers)
+            normalize (str): Per-spectrum normalization,
+                Default: "max" Choices: ["max", "l2", None]
+            dtype (np.dtype): dtype of the library matrix
+            interpolation (str): Resampling onto the grid.
+                Default: "linear" Choices: ["linear", "cubic"]
+            preprocess (Pipeline): Preprocessing applied to the resampled
+                references and queries before normalization. When it
+                crops, `grid` is the cropped grid
+        """
+        if normalize not in _NORMALIZE_CHOICES:
+            raise ValueError(f"Unknown normalization: {normalize}")
+        grid = default_grid() if grid is None else np.asarray(grid)
+        self.normalize = normalize
+        self.dtype = np.dtype(dtype)
+        self.resampler = Resampler(grid, method=interpolation)
+        self.preprocess = preprocess
+        self.grid = grid
+        if preprocess is not None:
+            self.grid = preprocess.output_grid(grid)
+        # Snapshot file backing the matrix when opened with open_snapshot
+        self.filename = None
+
+        self.keys = []
+        self.metadata = []
+        self._positions = dict()
+        self._pending = []
+        self._matrix = np.empty((0, self.grid.size), dtype=self.dtype)
+        self._prepared = dict()
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, key) -> bool:
+        return key in self._positions
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """
+        (n_entries, n_grid) matrix of the library spectra on the grid
+        """
+        if self._pending:
+            rows = np.vstack(self._pending).astype(self.dtype, copy=False)
+            self._matrix = np.concatenate([self._matrix, rows])
+            self._pending = []
+        return self._matrix
+
+    def index_of(self, key: Any) -> int:
+        """
+        Row of the library matrix holding the entry for `key`
+        """
+        return self._positions[key]
+
+    def _spectrum(self, spectrum) -> tuple:
+        """
+        Normalize the supported spectrum inputs to x, y, key and metadata
+        """
+        if isinstance(spectrum, DatasetContainer):
+            x, y = xy_from_scidata(spectrum.dataset)
+            return x, y, spectrum.uuid, metadata_from_scidata(spectrum.dataset)
+        if isinstance(spectrum, dict):
+            x, y = xy_from_scidata(spectrum)
+            metadata = metadata_from_scidata(spectrum)
+            return x, y, metadata.get("uid"), metadata
+        if isinstance(spectrum, Spectrum):
+            metadata = dict(spectrum.metadata)
+            key = metadata.get("uuid", metadata.get("uid"))
+            return spectrum.x, spectrum.y, key, metadata
+        x, y = spectrum
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        return x, y, None, dict()
+
+    def to_grid(
+        self,
+        xs: Iterable,
+        ys: Iterable,
+        use_cache: bool = False,
+    ) -> np.ndarray:
+        """
+        Resample, preprocess and normalize a batch of spectra for this
+        library
+
+        Args:
+            xs (Iterable[np.ndarray]): x-axis values of each spectrum
+            ys (Iterable[np.ndarray]): y-axis values of each spectrum
+            use_cache (bool): Cache the preprocessing stage outputs of
+                the batch (see `Pipeline.run`), so a library rebuilt with
+                only a later stage changed reuses the earlier ones
+
+        Returns:
+            rows (np.ndarray): (n spectra, grid size) spectra on the grid
+        """
+        rows = self.resampler.resample_batch(xs, ys)
+        if self.preprocess is not None:
+            rows, _ = self.preprocess.run(
+                rows, self.resampler.grid, use_cache=use_cache
+            )
+            if not rows.flags.writeable:
+                # Cached stage output, normalized below in place
+                rows = np.array(rows)
+        return normalize_rows(rows, self.normalize)
+
+    def add(self, spectrum, key: Any = None, metadata: dict = None) -> int:
+        """
+        Add a reference spectrum to the library
+
+        Args:
+            spectrum: SciData dict, DatasetContainer, Spectrum or (x, y) tuple
+            key (Any): Key for the entry, defaults to the dataset UUID
+                for a DatasetContainer or the SciData "uid" for a dict
+            metadata (dict): Metadata for the entry, defaults to the
+                title and uid of the SciData document
+
+        Returns:
+            index (int): Row of the new entry in the library matrix
+        """
+        return self.add_many([spectrum], [key], [metadata])[0]
+
+    def add_many(
+        self,
+        spectra: Iterable,
+        keys: Iterable = None,
+        metadata: Iterable[dict] = None,
+    ) -> List[int]:
+        """
+        Add many reference spectra, resampling them as one batch
+
+        Args:
+            spectra (Iterable): SciData dicts, DatasetContainers or
+                (x, y) tuples
+            keys (Iterable): Keys for the entries, see `add`
+            metadata (Iterable[dict]): Metadata for the entries, see `add`
+
+        Returns:
+            indices (List[int]): Rows of the new entries
+        """
+        spectra = list(spectra)
+        keys = [None] * len(spectra) if keys is None else list(keys)
+        metadata = [None] * len(spectra) if metadata is None else metadata
+        metadata = list(metadata)
+
+        xs, ys, new_keys, new_metadata = [], [], [], []
+        seen = set()
+        for spectrum, key, entry_metadata in zip(spectra, keys, metadata):
+            x, y, default_key, default_metadata = self._spectrum(spectrum)
+            key = default_key if key is None else key
+            if key is None:
+                key = len(self.keys) + len(new_keys)
+            if key in self._positions or key in seen:
+                raise KeyError(f"Duplicate library key: {key}")
+            seen.add(key)
+            if entry_metadata is None:
+                entry_metadata = default_metadata
+            xs.append(x)
+            ys.append(y)
+            new_keys.append(key)
+            new_metadata.append(entry_metadata)
+
+        if not new_keys:
+            return []
+        # Reference batches go through the stage cache, queries do not
+        self._pending.append(self.to_grid(xs, ys, use_cache=True))
+        indices = []
+        for key, entry_metadata in zip(new_keys, new_metadata):
+            self._positions[key] = len(self.keys)
+            indices.append(len(self.keys))
+            self.keys.append(key)
+            self.metadata.append(entry_metadata)
+        self._prepared.clear()
+        return indices
+
+    @classmethod
+    def from_dataset_service(
+        cls,
+        dataset_service,
+        uuids: Iterable[str] = None,
+        workers: int = 8,
+        chunk_size: int = 1024,
+        **kwargs,
+    ):
+        """
+        Build a library from the SciData documents of a collection
+
+        Datasets are fetched concurrently with bounded lookahead (see
+        `DatasetService.iter_datasets`) and added `chunk_size` at a time,
+        so only one chunk of documents is held in memory. Datasets
+        without x/y data arrays are skipped with a warning.
+
+        Args:
+            dataset_service (DatasetService): Service for the collection
+            uuids (Iterable[str]): UUIDs of the datasets to fetch,
+                defaults to every dataset in the collection
+            workers (int): Number of concurrent requests
+            chunk_size (int): Datasets resampled and added as one batch
+            kwargs: Arguments passed on to SpectralLibrary
+
+        Returns:
+            library (SpectralLibrary): Library keyed by dataset UUID
+        """
+        library = cls(**kwargs)
+        containers = dataset_service.iter_datasets(uuids, max_workers=workers)
+        while True:
+            chunk = list(itertools.islice(containers, chunk_size))
+            if not chunk:
+                return library
+            spectra, keys, metadata = [], [], []
+            for container in chunk:
+                try:
+                    x, y, key, entry_metadata = library._spectrum(container)
+                except MissingSpectrumException:
+                    msg = f"Dataset {container.uuid} has no spectrum, skipping"
+                    warnings.warn(msg)
+                    continue
+                spectra.append((x, y))
+                keys.append(key)
+                metadata.append(entry_metadata)
+            library.add_many(spectra, keys, metadata)
+
+    def _prepared_matrix(self, metric: str) -> tuple:
+        """
+        Library prepared for `metric`, cached until the library changes
+        """
+        if metric not in self._prepared:
+            prepared = prepare(self.matrix, metric)
+            norms = None
+            if metric == _METRIC_EUCLIDEAN:
+                norms = np.einsum("ij,ij->i", prepared, prepared)
+            self._prepared[metric] = (prepared, norms)
+        return self._prepared[metric]
+
+    def prepare_query(self, spectrum) -> np.ndarray:
+        """
+        Put a query spectrum on the library grid
+
+        Args:
+            spectrum: SciData dict, DatasetContainer, Spectrum or (x, y) tuple
+
+        Returns:
+            query (np.ndarray): Query on the library grid
+        """
+        x, y, _, _ = self._spectrum(spectrum)
+        return self.to_grid([x], [y])[0].astype(self.dtype)
+
+    def prepare_queries(self, spectra: Iterable) -> np.ndarray:
+        """
+        Put a batch of query spectra on the library grid
+
+        Args:
+            spectra (Iterable): SciData dicts, DatasetContainers or (x, y)
+                tuples
+
+        Returns:
+            queries (np.ndarray): (n spectra, grid size) queries
+        """
+        xs, ys = [], []
+        for spectrum in spectra:
+            x, y, _, _ = self._spectrum(spectrum)
+            xs.append(x)
+            ys.append(y)
+        return self.to_grid(xs, ys).astype(self.dtype)
+
+    def scores(
+        self,
+        spectrum,
+        metric: str = _METRIC_COSINE,
+        rows: np.ndarray = None,
+    ) -> np.ndarray:
+        """
+        Score a query spectrum against the library entries
+
+        Args:
+            spectrum: SciData dict, DatasetContainer, Spectrum or (x, y) tuple
+            metric (str): Choice of metric. Default: "cosine"
+                Choices: ["cosine", "pearson", "euclidean"]
+            rows (np.ndarray): Only score these library rows or rows
+                where this boolean mask is True (i.e. candidates from
+                a prefilter). Default: every entry
+
+        Returns:
+            scores (np.ndarray): Similarity (or distance for euclidean)
+                to each library entry, or to each of `rows`
+        """
+        return self._scores(self.prepare_query(spectrum), metric, rows)
+
+    def _scores(
+        self,
+        query: np.ndarray,
+        metric: str,
+        rows: np.ndarray = None,
+    ) -> np.ndarray:
+        """
+        Scores of a query already on the library grid (see
+        `prepare_query`), i.e. when a prefilter had to prepare it first
+        """
+        _check_metric(metric)
+        prepared, norms = self._prepared_matrix(metric)
+        query = prepare(query[None, :], metric)
+        rows = as_rows(rows)
+        if rows is not None:
+            prepared = prepared[rows]
+            norms = None if norms is None else norms[rows]
+        return score(prepared, query, metric, squared_norms=norms)[0]
+
+    def search(
+        self,
+        spectrum,
+        k: int = 10,
+        metric: str = _METRIC_COSINE,
+        rows: np.ndarray = None,
+    ) -> List[Match]:
+        """
+        Find the `k` library entries most similar to a query spectrum
+
+        Args:
+            spectrum: SciData dict, DatasetContainer, Spectrum or (x, y) tuple
+            k (int): Number of hits to return
+            metric (str): Choice of metric. Default: "cosine"
+                Choices: ["cosine", "pearson", "euclidean"]
+            rows (np.ndarray): Only search these library rows or rows
+                where this boolean mask is True (i.e. candidates from
+                a prefilter). Default: every entry
+
+        Returns:
+            matches (List[Match]): Best matches first
+        """
+        return self._search(self.prepare_query(spectrum), k, metric, rows)
+
+    def _search(
+        self,
+        query: np.ndarray,
+        k: int,
+        metric: str,
+        rows: np.ndarray = None,
+    ) -> List[Match]:
+        """
+        Best matches of a query already on the library grid, see `search`
+        """
+        rows = as_rows(rows)
+        scores = self._scores(query, metric, rows)
+        best = top_k(scores, k, metric)
+        if rows is None:
+            return self._matches(best, scores[best])
+        return self._matches(rows[best], scores[best])
+
+    def iter_search_batch(
+        self,
+        spectra: Iterable,
+        k: int = 10,
+        metric: str = _METRIC_COSINE,
+        memory_budget: int = _DEFAULT_MEMORY_BUDGET,
+    ) -> Iterator[List[Match]]:
+        """
+        Search many query spectra, yielding the matches of each in order
+
+        Queries are resampled and prepared a chunk at a time and scored
+        against the library with one matrix product per chunk (and per
+        library block for libraries too large for the budget), keeping a
+        running top-k per query, so throughput is bound by the matrix
+        products rather than per-query Python overhead.
+
+        Args:
+            spectra (Iterable): SciData dicts, DatasetContainers or (x, y)
+                tuples, consumed lazily
+            k (int): Number of hits to return per query
+            metric (str): Choice of metric. Default: "cosine"
+                Choices: ["cosine", "pearson", "euclidean"]
+            memory_budget (int): Bytes allowed for one block of scores
+
+        Returns:
+            matches (Iterator[List[Match]]): Best matches first, for each
+                query
+        """
+        _check_metric(metric)
+        prepared, norms = self._prepared_matrix(metric)
+        n_entries = prepared.shape[0]
+        query_chunk, library_chunk = chunk_sizes(
+            n_entries, prepared.dtype.itemsize, memory_budget
+        )
+
+        spectra = iter(spectra)
+        while True:
+            chunk = list(itertools.islice(spectra, query_chunk))
+            if not chunk:
+                return
+            queries = prepare(self.prepare_queries(chunk), metric)
+
+            best, best_scores = top_k_blocks(
+                prepared, queries, k, metric, norms, library_chunk
+            )
+            for indices, scores in zip(best, best_scores):
+                yield self._matches(indices, scores)
+
+    def search_batch(
+        self,
+        spectra: Iterable,
+        k: int = 10,
+        metric: str = _METRIC_COSINE,
+        memory_budget: int = _DEFAULT_MEMORY_BUDGET,
+    ) -> List[List[Match]]:
+        """
+        Search many query spectra at once, see `iter_search_batch`
+
+        Returns:
+            matches (List[List[Match]]): Best matches first, for each query
+        """
+        return list(
+            self.iter_search_batch(
+                spectra, k=k, metric=metric, memory_budget=memory_budget
+            )
+        )
+
+    def _matches(self, indices: np.ndarray, scores: np.ndarray) -> List:
+        """
+        Match objects for library rows and their scores
+        """
+        return [
+            Match(self.keys[i], float(s), int(i), self.metadata[i])
+            for i, s in zip(indices, scores)
+        ]
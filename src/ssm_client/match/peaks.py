@@ -0,0 +1,223 @@
+import collections
+from typing import Iterable, List
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .library import SpectralLibrary
+
+
+def find_peaks(
+    y: np.ndarray,
+    x: np.ndarray,
+    prominence: float = 0.05,
+    width: float = 10.0,
+    window: float = 50.0,
+    max_peaks: int = None,
+) -> List[np.ndarray]:
+    """
+    Vectorized peak picking over one spectrum or a batch sharing an x-axis
+
+    A point is a peak when it is the maximum within `width` around it and
+    rises at least `prominence` (as a fraction of the spectrum range)
+    above the higher of the minima found within `window` on either side.
+    All spectra of the batch are processed at once with sliding windows.
+
+    Args:
+        y (np.ndarray): Intensities, 1D or (n spectra, n points)
+        x (np.ndarray): Shared x-axis (i.e. wavenumbers), ascending or
+            descending; windows use its median spacing
+        prominence (float): Minimum prominence relative to the range
+        width (float): Minimum separation between peaks in x units
+        window (float): Range each side of a peak used for its prominence
+        max_peaks (int): Only keep the strongest `max_peaks` peaks
+
+    Returns:
+        peaks (List[np.ndarray]): Peak positions (x values) of each
+            spectrum, strongest first
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.atleast_2d(np.asarray(y, dtype=np.float64))
+    if x.size > 1 and x[0] > x[-1]:
+        x = x[::-1]
+        y = y[:, ::-1]
+    n_points = x.size
+    spacing = np.median(np.diff(x)) if n_points > 1 else 1.0
+
+    half = max(1, int(round(width / 2.0 / spacing)))
+    span = max(half, int(round(window / spacing)))
+
+    # Dominance: maximum within +/- half points
+    padded = np.pad(y, ((0, 0), (half, half)), constant_values=-np.inf)
+    local_max = sliding_window_view(padded, 2 * half + 1, axis=1).max(axis=2)
+    is_peak = y >= local_max
+    # Keep only the first point of flat-topped peaks
+    is_peak[:, 1:] &= y[:, 1:] > y[:, :-1]
+
+    # Prominence: height above the higher of the left/right minima
+    padded = np.pad(y, ((0, 0), (span, span)), mode="edge")
+    minima = sliding_window_view(padded, span, axis=1).min(axis=2)
+    left = minima[:, :n_points]
+    right = minima[:, span + 1:span + 1 + n_points]
+    heights = y - np.maximum(left, right)
+    ranges = np.ptp(y, axis=1, keepdims=True)
+    is_peak &= heights >= prominence * ranges
+    is_peak &= ranges > 0
+
+    peaks = []
+    for row, mask in enumerate(is_peak):
+        columns = np.flatnonzero(mask)
+        columns = columns[np.argsort(-y[row, columns], kind="stable")]
+        if max_peaks:
+            columns = columns[:max_peaks]
+        peaks.append(x[columns])
+    return peaks
+
+
+class PeakIndex:
+    def __init__(self, tolerance: float = 5.0, **peak_kwargs):
+        """
+        Initialize a PeakIndex object
+
+        Inverted index from binned peak positions to library rows, used to
+        pull only the references sharing bands with a query before exact
+        scoring.
+
+        Args:
+            tolerance (float): Maximum peak position difference (x units,
+                i.e. cm^-1) for two peaks to be considered shared
+            peak_kwargs: Arguments for `find_peaks` used on queries
+        """
+        self.tolerance = tolerance
+        self.peak_kwargs = peak_kwargs
+        self._entries = collections.defaultdict(lambda: ([], []))
+        self._bins = None
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    @classmethod
+    def from_library(
+        cls,
+        library: SpectralLibrary,
+        tolerance: float = 5.0,
+        **peak_kwargs,
+    ):
+        """
+        Pick the peaks of every library spectrum and index them
+
+        Args:
+            library (SpectralLibrary): Library to index
+            tolerance (float): See `PeakIndex`
+            peak_kwargs: Arguments for `find_peaks`
+
+        Returns:
+            index (PeakIndex): Index keyed by library row
+        """
+        index = cls(tolerance=tolerance, **peak_kwargs)
+        peaks = find_peaks(library.matrix, library.grid, **peak_kwargs)
+        index.add_many(range(len(peaks)), peaks)
+        return index
+
+    def _bin(self, positions: np.ndarray) -> np.ndarray:
+        return np.floor(np.asarray(positions) / self.tolerance).astype(int)
+
+    def add(self, row: int, positions: np.ndarray):
+        """
+        Index the peak positions of a library row
+
+        Args:
+            row (int): Library row
+            positions (np.ndarray): Peak positions of the spectrum
+        """
+        positions = np.asarray(positions, dtype=np.float64)
+        for b, position in zip(self._bin(positions), positions):
+            rows, bin_positions = self._entries[int(b)]
+            rows.append(row)
+            bin_positions.append(position)
+        self._bins = None
+        self.size += 1
+
+    def add_many(self, rows: Iterable[int], peaks: Iterable[np.ndarray]):
+        """
+        Index the peak positions of many library rows, see `add`
+        """
+        for row, positions in zip(rows, peaks):
+            self.add(row, positions)
+
+    def _finalized(self) -> dict:
+        """
+        Bins as (rows, positions) arrays, rebuilt after additions
+        """
+        if self._bins is None:
+            self._bins = {
+                b: (np.asarray(rows, dtype=np.intp), np.asarray(positions))
+                for b, (rows, positions) in self._entries.items()
+            }
+        return self._bins
+
+    def candidates(
+        self,
+        positions: np.ndarray,
+        min_shared: int = 1,
+    ) -> np.ndarray:
+        """
+        Library rows sharing at least `min_shared` peaks with a query
+
+        Args:
+            positions (np.ndarray): Peak positions of the query
+            min_shared (int): Minimum number of shared peaks
+
+        Returns:
+            rows (np.ndarray): Candidate library rows, ascending
+        """
+        bins = self._finalized()
+        shared = []
+        for position in np.asarray(positions, dtype=np.float64):
+            low, high = self._bin([position - self.tolerance,
+                                   position + self.tolerance])
+            hits = []
+            for b in range(low, high + 1):
+                if b not in bins:
+                    continue
+                rows, bin_positions = bins[b]
+                close = np.abs(bin_positions - position) <= self.tolerance
+                hits.append(rows[close])
+            if hits:
+                shared.append(np.unique(np.concatenate(hits)))
+
+        if not shared:
+            return np.empty(0, dtype=np.intp)
+        counts = np.bincount(np.concatenate(shared))
+        return np.flatnonzero(counts >= min_shared)
+
+    def search(
+        self,
+        library: SpectralLibrary,
+        spectrum,
+        k: int = 10,
+        metric: str = "cosine",
+        min_shared: int = 1,
+    ) -> List:
+        """
+        Prefilter the library by shared peaks and score the candidates
+
+        Args:
+            library (SpectralLibrary): Library the index was built from
+            spectrum: SciData dict, DatasetContainer, Spectrum or (x, y) tuple
+            k (int): Number of hits to return
+            metric (str): Choice of metric. Default: "cosine"
+                Choices: ["cosine", "pearson", "euclidean"]
+            min_shared (int): Minimum number of shared peaks
+
+        Returns:
+            matches (List[Match]): Best matches first
+        """
+        query = library.prepare_query(spectrum)
+        positions = find_peaks(query, library.grid, **self.peak_kwargs)[0]
+        rows = self.candidates(positions, min_shared=min_shared)
+        if not rows.size:
+            return []
+        # Score the query prepared for peak picking, not resampled again
+        return library._search(query, k, metric, rows)
@@ -0,0 +1,405 @@
+import collections
+import hashlib
+import math
+import threading
+from typing import Iterable, List
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .library import _NORMALIZE_CHOICES, _NORMALIZE_MAX, normalize_rows
+
+
+_DEFAULT_CACHE_BYTES = 256 * 2**20
+
+
+class UnknownStageException(Exception):
+    """Raised when a pipeline configuration names an unknown stage"""
+
+
+def batch_signature(matrix: np.ndarray, grid: np.ndarray) -> tuple:
+    """
+    Hashable signature of a batch and its grid used as the cache key
+
+    Args:
+        matrix (np.ndarray): (n spectra, grid size) batch
+        grid (np.ndarray): Grid of the batch
+
+    Returns:
+        signature (tuple): (shape, dtype, digest) of the batch and grid
+    """
+    matrix = np.ascontiguousarray(matrix)
+    digest = hashlib.blake2b(matrix.tobytes(), digest_size=16)
+    digest.update(np.ascontiguousarray(grid, dtype=np.float64).tobytes())
+    return matrix.shape, matrix.dtype.str, digest.digest()
+
+
+class Stage:
+    """
+    Preprocessing step applied to a whole (n spectra, grid size) batch
+    """
+
+    def params(self) -> dict:
+        """
+        Parameters of the stage, part of its cache key and configuration
+        """
+        return dict(vars(self))
+
+    def key(self) -> tuple:
+        """
+        Hashable identity of the stage and its parameters
+        """
+        return (type(self).__name__,) + tuple(sorted(self.params().items()))
+
+    def config(self) -> list:
+        """
+        JSON serializable [name, params] configuration of the stage
+        """
+        return [type(self).__name__, self.params()]
+
+    def __call__(self, matrix: np.ndarray, grid: np.ndarray) -> tuple:
+        """
+        Apply the stage to a batch
+
+        Args:
+            matrix (np.ndarray): (n spectra, grid size) batch
+            grid (np.ndarray): Grid of the batch
+
+        Returns:
+            matrix (np.ndarray): New processed batch
+            grid (np.ndarray): Grid of the processed batch
+        """
+        raise NotImplementedError
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Stage) and self.key() == other.key()
+
+    def __hash__(self) -> int:
+        return hash(self.key())
+
+    def __repr__(self) -> str:
+        params = ", ".join(f"{k}={v!r}" for k, v in self.params().items())
+        return f"{type(self).__name__}({params})"
+
+
+class Crop(Stage):
+    def __init__(self, start: float = None, stop: float = None):
+        """
+        Initialize a Crop object
+
+        Keeps the grid values within [start, stop].
+
+        Args:
+            start (float): Lowest grid value kept, default no lower bound
+            stop (float): Highest grid value kept, default no upper bound
+        """
+        self.start = start
+        self.stop = stop
+
+    def __call__(self, matrix: np.ndarray, grid: np.ndarray) -> tuple:
+        keep = np.ones(grid.size, dtype=bool)
+        if self.start is not None:
+            keep &= grid >= self.start
+        if self.stop is not None:
+            keep &= grid <= self.stop
+        return matrix[:, keep], grid[keep]
+
+
+class Baseline(Stage):
+    def __init__(self, order: int = 3, n_iter: int = 20):
+        """
+        Initialize a Baseline object
+
+        Iterative polynomial baseline removal (modified polyfit): every
+        spectrum is repeatedly fit with a polynomial and clipped to the
+        fit, so bands are excluded and the fit settles on the baseline.
+        All spectra share the grid, so each iteration is one product
+        with the pseudo-inverse of the Vandermonde matrix.
+
+        Args:
+            order (int): Polynomial order of the baseline
+            n_iter (int): Number of clip and refit iterations
+        """
+        self.order = order
+        self.n_iter = n_iter
+
+    def __call__(self, matrix: np.ndarray, grid: np.ndarray) -> tuple:
+        span = np.ptp(grid) if grid.size > 1 else 1.0
+        scaled = (grid - grid.min()) / (span or 1.0) * 2.0 - 1.0
+        vander = np.vander(scaled, self.order + 1)
+        fit_matrix = vander @ np.linalg.pinv(vander)
+
+        matrix = np.asarray(matrix, dtype=np.float64)
+        work = matrix.copy()
+        baseline = work @ fit_matrix.T
+        for _ in range(self.n_iter):
+            np.minimum(work, baseline, out=work)
+            baseline = work @ fit_matrix.T
+        return matrix - baseline, grid
+
+
+class SavitzkyGolay(Stage):
+    def __init__(self, window: int = 11, polyorder: int = 3, deriv: int = 0):
+        """
+        Initialize a SavitzkyGolay object
+
+        Savitzky-Golay smoothing (or derivative) as one product of the
+        batch's sliding windows with the filter coefficients. The ends
+        are padded with the edge values.
+
+        Args:
+            window (int): Odd window length in grid points
+            polyorder (int): Order of the fitted polynomial
+            deriv (int): Order of the derivative, 0 for smoothing
+
+        Raises:
+            ValueError: Raised when the window is even or not longer
+                than the polynomial order
+        """
+        if window % 2 != 1 or window <= polyorder:
+            msg = "window must be odd and larger than polyorder"
+            raise ValueError(msg)
+        self.window = window
+        self.polyorder = polyorder
+        self.deriv = deriv
+
+    def coefficients(self, spacing: float = 1.0) -> np.ndarray:
+        """
+        Filter coefficients for a grid spacing
+
+        Args:
+            spacing (float): Grid spacing, scales derivatives
+
+        Returns:
+            coefficients (np.ndarray): Weights of the window points
+        """
+        half = self.window // 2
+        offsets = np.arange(-half, half + 1, dtype=np.float64)
+        vander = np.vander(offsets, self.polyorder + 1, increasing=True)
+        coefficients = np.linalg.pinv(vander)[self.deriv]
+        return coefficients * math.factorial(self.deriv) / spacing**self.deriv
+
+    def __call__(self, matrix: np.ndarray, grid: np.ndarray) -> tuple:
+        spacing = np.median(np.diff(grid)) if grid.size > 1 else 1.0
+        half = self.window // 2
+        padded = np.pad(
+            np.asarray(matrix, dtype=np.float64),
+            ((0, 0), (half, half)),
+            mode="edge",
+        )
+        windows = sliding_window_view(padded, self.window, axis=1)
+        return windows @ self.coefficients(spacing), grid
+
+
+class Normalize(Stage):
+    def __init__(self, method: str = _NORMALIZE_MAX):
+        """
+        Initialize a Normalize object
+
+        Args:
+            method (str): Per-spectrum normalization,
+                Default: "max" Choices: ["max", "l2", None]
+        """
+        if method not in _NORMALIZE_CHOICES:
+            raise ValueError(f"Unknown normalization: {method}")
+        self.method = method
+
+    def __call__(self, matrix: np.ndarray, grid: np.ndarray) -> tuple:
+        matrix = np.array(matrix, dtype=np.float64)
+        return normalize_rows(matrix, self.method), grid
+
+
+_STAGES = {
+    stage.__name__: stage
+    for stage in [Crop, Baseline, SavitzkyGolay, Normalize]
+}
+
+
+class StageCache:
+    def __init__(self, max_bytes: int = _DEFAULT_CACHE_BYTES):
+        """
+        Initialize a StageCache object
+
+        Least recently used cache of stage outputs, keyed by the input
+        batch signature and the stages applied so far. Pipelines sharing
+        a cache reuse each other's intermediate results.
+
+        Args:
+            max_bytes (int): Maximum memory of the cached stage outputs;
+                larger outputs are not cached. Default: 256 MiB
+        """
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: tuple):
+        """
+        Cached (matrix, grid) for a key, or None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: tuple, matrix: np.ndarray, grid: np.ndarray):
+        """
+        Cache a stage output, read-only so it cannot be modified in place
+        """
+        grid = np.array(grid)
+        matrix.setflags(write=False)
+        grid.setflags(write=False)
+        nbytes = matrix.nbytes + grid.nbytes
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.nbytes -= previous[0].nbytes + previous[1].nbytes
+            self._entries[key] = (matrix, grid)
+            self.nbytes += nbytes
+            while self.nbytes > self.max_bytes:
+                _, (old_matrix, old_grid) = self._entries.popitem(last=False)
+                self.nbytes -= old_matrix.nbytes + old_grid.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+
+class Pipeline:
+    def __init__(self, stages: Iterable[Stage], cache: StageCache = None):
+        """
+        Initialize a Pipeline object
+
+        Runs preprocessing stages over whole batches of spectra sharing a
+        grid. The output of every stage is cached by (input batch, stages
+        so far), so changing a late stage (i.e. the normalization) and
+        rerunning only recomputes from that stage on.
+
+        Args:
+            stages (Iterable[Stage]): Stages, applied in order
+            cache (StageCache): Cache for stage outputs, defaults to a new
+                cache for this pipeline
+        """
+        self.stages = list(stages)
+        self.cache = StageCache() if cache is None else cache
+
+    def __len__(self) -> int:
+        return len(self.stages)
+
+    def __repr__(self) -> str:
+        return f"Pipeline({self.stages!r})"
+
+    def replace(self, index: int, stage: Stage):
+        """
+        Copy of the pipeline with one stage replaced, sharing the cache
+
+        Args:
+            index (int): Position of the stage to replace
+            stage (Stage): New stage
+
+        Returns:
+            pipeline (Pipeline): New pipeline
+        """
+        stages = list(self.stages)
+        stages[index] = stage
+        return Pipeline(stages, cache=self.cache)
+
+    def run(
+        self,
+        matrix: np.ndarray,
+        grid: np.ndarray,
+        use_cache: bool = True,
+    ) -> tuple:
+        """
+        Apply the stages to a batch, resuming from the latest cached stage
+
+        Outputs served from or stored in the cache are read-only, copy
+        them before modifying in place.
+
+        Args:
+            matrix (np.ndarray): (n spectra, grid size) batch
+            grid (np.ndarray): Grid of the batch
+            use_cache (bool): Look up and store the stage outputs in the
+                cache; one-off batches (i.e. queries) should skip it
+
+        Returns:
+            matrix (np.ndarray): Processed batch
+            grid (np.ndarray): Grid of the processed batch
+        """
+        grid = np.asarray(grid, dtype=np.float64)
+        matrix = np.atleast_2d(matrix)
+        if not use_cache:
+            for stage in self.stages:
+                matrix, grid = stage(matrix, grid)
+            return matrix, grid
+
+        signature = batch_signature(matrix, grid)
+        keys = [
+            (signature,) + tuple(stage.key() for stage in self.stages[:i + 1])
+            for i in range(len(self.stages))
+        ]
+
+        start = 0
+        for i in reversed(range(len(self.stages))):
+            cached = self.cache.get(keys[i])
+            if cached is not None:
+                matrix, grid = cached
+                start = i + 1
+                break
+
+        for i in range(start, len(self.stages)):
+            matrix, grid = self.stages[i](matrix, grid)
+            self.cache.put(keys[i], matrix, grid)
+        return matrix, grid
+
+    def output_grid(self, grid: np.ndarray) -> np.ndarray:
+        """
+        Grid of the output for a batch on `grid`
+        """
+        grid = np.asarray(grid, dtype=np.float64)
+        empty = np.empty((0, grid.size))
+        for stage in self.stages:
+            empty, grid = stage(empty, grid)
+        return grid
+
+    def config(self) -> List[list]:
+        """
+        JSON serializable configuration, see `from_config`
+        """
+        return [stage.config() for stage in self.stages]
+
+    @classmethod
+    def from_config(cls, config: List[list], cache: StageCache = None):
+        """
+        Build a pipeline from its configuration
+
+        Args:
+            config (List[list]): [name, params] of each stage
+            cache (StageCache): Cache for stage outputs
+
+        Raises:
+            UnknownStageException: Raised when a stage name is unknown
+
+        Returns:
+            pipeline (Pipeline): New pipeline
+        """
+        stages = []
+        for name, params in config:
+            if name not in _STAGES:
+                msg = "Unknown stage: {name}\nKnown stages are {choices}"
+                msg = msg.format(name=name, choices=sorted(_STAGES))
+                raise UnknownStageException(msg)
+            stages.append(_STAGES[name](**params))
+        return cls(stages, cache=cache)
@@ -0,0 +1,216 @@
+from typing import List
+
+import numpy as np
+
+from .library import (
+    _METRIC_COSINE,
+    _METRIC_EUCLIDEAN,
+    Match,
+    SpectralLibrary,
+    _check_metric,
+    prepare,
+    score,
+    top_k,
+)
+
+_BUILD_BLOCK_SIZE = 65536
+
+
+def pool(matrix: np.ndarray, factor: int) -> np.ndarray:
+    """
+    Downsample the rows of a matrix by averaging blocks of columns
+
+    A last, partial block is averaged as if zero padded.
+
+    Args:
+        matrix (np.ndarray): (n rows, n columns) matrix
+        factor (int): Number of columns averaged into one
+
+    Returns:
+        pooled (np.ndarray): (n rows, ceil(n columns / factor)) matrix
+    """
+    matrix = np.atleast_2d(matrix)
+    n_rows, n_columns = matrix.shape
+    n_pooled = -(-n_columns // factor)
+    padded = np.zeros((n_rows, n_pooled * factor), dtype=matrix.dtype)
+    padded[:, :n_columns] = matrix
+    return padded.reshape(n_rows, n_pooled, factor).mean(axis=2)
+
+
+class PyramidIndex:
+    def __init__(
+        self,
+        library: SpectralLibrary,
+        metric: str = _METRIC_COSINE,
+        levels: int = 2,
+        factor: int = 4,
+        keep: float = 0.05,
+    ):
+        """
+        Initialize a PyramidIndex object
+
+        Coarse-to-fine matching: the library is kept downsampled at
+        `levels` coarser resolutions, each `factor` times coarser than
+        the next. A query is scored against the whole library at the
+        coarsest level only, and each finer level (ending with the full
+        resolution library) only scores the candidates that survived the
+        previous one.
+
+        For euclidean the coarse data is scaled so coarse distances are
+        lower bounds of the full resolution ones.
+
+        Args:
+            library (SpectralLibrary): Library to index
+            metric (str): Choice of metric. Default: "cosine"
+                Choices: ["cosine", "pearson", "euclidean"]
+            levels (int): Number of coarse levels
+            factor (int): Downsampling factor between levels
+            keep (float): Default fraction of candidates kept at each
+                level, see `search`
+        """
+        _check_metric(metric)
+        self.library = library
+        self.metric = metric
+        self.levels = levels
+        self.factor = factor
+        self.keep = keep
+        self.pyramid = None
+        self.n_entries = None
+
+    def _factors(self) -> List[int]:
+        """
+        Downsampling factor of each coarse level, coarsest first
+        """
+        return [self.factor**level for level in range(self.levels, 0, -1)]
+
+    def _coarse(self, matrix: np.ndarray, factor: int) -> np.ndarray:
+        pooled = pool(matrix, factor).astype(self.library.dtype)
+        if self.metric == _METRIC_EUCLIDEAN:
+            pooled *= np.sqrt(factor)
+        return prepare(pooled, self.metric)
+
+    def _level(self, matrix: np.ndarray, factor: int) -> tuple:
+        """
+        Coarse rows and euclidean norms of library rows at one level
+        """
+        blocks = [
+            self._coarse(matrix[start:start + _BUILD_BLOCK_SIZE], factor)
+            for start in range(0, len(matrix), _BUILD_BLOCK_SIZE)
+        ]
+        n_pooled = -(-self.library.grid.size // factor)
+        prepared = np.concatenate(blocks) if blocks else np.empty(
+            (0, n_pooled), dtype=self.library.dtype
+        )
+        norms = None
+        if self.metric == _METRIC_EUCLIDEAN:
+            norms = np.einsum("ij,ij->i", prepared, prepared)
+        return prepared, norms
+
+    def build(self):
+        """
+        Downsample the library at every coarse level
+
+        Returns:
+            index (PyramidIndex): This index, to allow chaining
+        """
+        matrix = self.library.matrix
+        self.pyramid = [
+            (factor,) + self._level(matrix, factor)
+            for factor in self._factors()
+        ]
+        self.n_entries = len(matrix)
+        return self
+
+    @property
+    def stale(self) -> bool:
+        """
+        Whether the library gained entries since the index was built
+        or updated
+        """
+        return self.n_entries != len(self.library)
+
+    def update(self):
+        """
+        Downsample the entries the library gained since the last build or
+        update and append them to every coarse level
+
+        Returns:
+            index (PyramidIndex): This index, to allow chaining
+        """
+        if self.pyramid is None:
+            return self.build()
+        if not self.stale:
+            return self
+        new = self.library.matrix[self.n_entries:]
+        pyramid = []
+        for factor, prepared, norms in self.pyramid:
+            new_prepared, new_norms = self._level(new, factor)
+            prepared = np.concatenate([prepared, new_prepared])
+            if norms is not None:
+                norms = np.concatenate([norms, new_norms])
+            pyramid.append((factor, prepared, norms))
+        self.pyramid = pyramid
+        self.n_entries = len(self.library)
+        return self
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Memory used by the coarse levels
+        """
+        if self.pyramid is None:
+            return 0
+        return sum(prepared.nbytes for _, prepared, _ in self.pyramid)
+
+    def search(
+        self,
+        spectrum,
+        k: int = 10,
+        keep: float = None,
+        min_candidates: int = None,
+    ) -> List[Match]:
+        """
+        Find the `k` most similar library entries, coarse to fine
+
+        Each level keeps the best `keep` fraction of its candidates but
+        at least `min_candidates`; a higher `keep` trades latency for
+        recall, and `keep` of 1 scores everything at every level. Entries
+        added to the library since the index was built are downsampled
+        first (see `update`), so they are always searchable.
+
+        Args:
+            spectrum: SciData dict, DatasetContainer, Spectrum or (x, y) tuple
+            k (int): Number of hits to return
+            keep (float): Fraction of candidates kept at each level,
+                defaults to the index `keep`
+            min_candidates (int): Minimum candidates kept at each level.
+                Default: 10 * k
+
+        Returns:
+            matches (List[Match]): Best matches first
+        """
+        if self.pyramid is None or self.stale:
+            self.update()
+        keep = self.keep if keep is None else keep
+        min_candidates = max(min_candidates or 10 * k, k)
+
+        query = prepare(self.library.prepare_query(spectrum), self.metric)
+        rows = None
+        for factor, prepared, norms in self.pyramid:
+            coarse_query = self._coarse(query, factor)
+            if rows is not None:
+                prepared = prepared[rows]
+                norms = None if norms is None else norms[rows]
+            scores = score(prepared, coarse_query, self.metric, norms)[0]
+            n_keep = max(int(np.ceil(keep * scores.size)), min_candidates)
+            best = top_k(scores, n_keep, self.metric)
+            rows = best if rows is None else rows[best]
+            rows = np.sort(rows)
+
+        prepared, norms = self.library._prepared_matrix(self.metric)
+        if rows is None:
+            rows = np.arange(len(prepared))
+        norms = None if norms is None else norms[rows]
+        scores = score(prepared[rows], query, self.metric, norms)[0]
+        best = top_k(scores, k, self.metric)
+        return self.library._matches(rows[best], scores[best])
@@ -0,0 +1,387 @@
+import itertools
+from typing import Iterable, List
+
+import numpy as np
+
+from .ann import IndexMismatchException
+from .library import (
+    _DEFAULT_MEMORY_BUDGET,
+    _METRIC_COSINE,
+    _METRIC_EUCLIDEAN,
+    Match,
+    SpectralLibrary,
+    _check_metric,
+    chunk_sizes,
+    prepare,
+    score,
+    top_k_blocks,
+    top_k_rows,
+)
+from .snapshot import open_snapshot
+
+_PRECISION_FLOAT16 = "float16"
+_PRECISION_INT8 = "int8"
+_PRECISION_CHOICES = [_PRECISION_FLOAT16, _PRECISION_INT8]
+
+_INT8_MAX = 127.0
+_FORMAT_VERSION = 1
+
+
+class UnsupportedPrecisionException(Exception):
+    """Raised when unsupported storage precision specified"""
+
+
+def _check_precision(precision: str):
+    if precision not in _PRECISION_CHOICES:
+        msg = (
+            "precision: {precision} not supported\n"
+            "Supported precisions are {choices}"
+        )
+        msg = msg.format(precision=precision, choices=_PRECISION_CHOICES)
+        raise UnsupportedPrecisionException(msg)
+
+
+def quantize(matrix: np.ndarray, precision: str = _PRECISION_INT8) -> tuple:
+    """
+    Compact copy of a matrix with per-row scale factors
+
+    For int8 every row is scaled so its largest magnitude maps to 127,
+    for float16 rows are only cast and the scales are all one.
+
+    Args:
+        matrix (np.ndarray): (n rows, n columns) matrix
+        precision (str): Storage precision.
+            Default: "int8" Choices: ["float16", "int8"]
+
+    Returns:
+        codes (np.ndarray): (n rows, n columns) int8 or float16 values
+        scales (np.ndarray): float32 factor of each row,
+            `codes * scales[:, None]` approximates `matrix`
+    """
+    _check_precision(precision)
+    matrix = np.asarray(matrix, dtype=np.float32)
+    scales = np.ones(len(matrix), dtype=np.float32)
+    if precision == _PRECISION_FLOAT16:
+        return matrix.astype(np.float16), scales
+
+    scales = np.abs(matrix).max(axis=1, initial=0.0) / _INT8_MAX
+    scales[scales == 0] = 1.0
+    codes = np.rint(matrix / scales[:, None]).astype(np.int8)
+    return codes, scales
+
+
+def _resident_nbytes(array: np.ndarray) -> int:
+    """
+    Bytes of an array held in memory, zero when it views a memory map
+    """
+    if array is None:
+        return 0
+    base = array
+    while base is not None:
+        if isinstance(base, np.memmap):
+            return 0
+        base = base.base
+    return array.nbytes
+
+
+def dequantize(codes: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    """
+    float32 approximation of a quantized matrix, see `quantize`
+    """
+    return codes.astype(np.float32) * scales[:, None]
+
+
+class QuantizedIndex:
+    def __init__(
+        self,
+        library: SpectralLibrary,
+        metric: str = _METRIC_COSINE,
+        precision: str = _PRECISION_INT8,
+    ):
+        """
+        Initialize a QuantizedIndex object
+
+        Keeps the library prepared for `metric` as int8 (a quarter of
+        float32) or float16 codes with per-row scales. Searches score
+        the compact codes in blocks, then rerank the best candidates
+        exactly against the full precision rows of the library.
+
+        The index only saves memory when the library is a snapshot
+        opened with `open_snapshot` (see `from_snapshot`): its matrix
+        is then a memory map and reranking only pages in the candidate
+        rows. An in-memory library keeps its full precision matrix
+        resident and the codes come on top of it; `resident_nbytes`
+        reports what is actually held in memory.
+
+        Args:
+            library (SpectralLibrary): Library to index
+            metric (str): Choice of metric. Default: "cosine"
+                Choices: ["cosine", "pearson", "euclidean"]
+            precision (str): Storage precision.
+                Default: "int8" Choices: ["float16", "int8"]
+        """
+        _check_metric(metric)
+        _check_precision(precision)
+        self.library = library
+        self.metric = metric
+        self.precision = precision
+
+        self.codes = None
+        self.scales = None
+        self.norms = None
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Memory used by the codes and scales
+        """
+        if self.codes is None:
+            return 0
+        return self.codes.nbytes + self.scales.nbytes
+
+    @property
+    def stale(self) -> bool:
+        """
+        Whether the library size changed since the index was built
+        """
+        if self.codes is None:
+            return False
+        return len(self.codes) != len(self.library)
+
+    @classmethod
+    def from_snapshot(
+        cls,
+        filename: str,
+        metric: str = _METRIC_COSINE,
+        precision: str = _PRECISION_INT8,
+        block_size: int = 65536,
+    ):
+        """
+        Build an index over a library snapshot, so only the codes are
+        held in memory and the full precision rows stay memory-mapped
+
+        Args:
+            filename (str): Filename of a snapshot written by
+                `write_snapshot`
+            metric (str): Choice of metric. Default: "cosine"
+                Choices: ["cosine", "pearson", "euclidean"]
+            precision (str): Storage precision.
+                Default: "int8" Choices: ["float16", "int8"]
+            block_size (int): Rows prepared and quantized at once
+
+        Returns:
+            index (QuantizedIndex): Built index
+        """
+        library = open_snapshot(filename)
+        return cls(library, metric, precision).build(block_size)
+
+    @property
+    def resident_nbytes(self) -> int:
+        """
+        Memory held by the index and the library rows it reranks against,
+        not counting memory-mapped arrays
+        """
+        nbytes = self.nbytes + _resident_nbytes(self.norms)
+        nbytes += _resident_nbytes(self.library.matrix)
+        prepared = self.library._prepared.get(self.metric)
+        if prepared is not None:
+            nbytes += sum(_resident_nbytes(array) for array in prepared)
+        return nbytes
+
+    def build(self, block_size: int = 65536):
+        """
+        Quantize the prepared library, a block of rows at a time
+
+        The library matrix is read a block at a time and left as it is:
+        reranking needs it, so the codes only replace it in memory for
+        a memory-mapped snapshot library (see `from_snapshot`).
+
+        Args:
+            block_size (int): Rows prepared and quantized at once
+
+        Returns:
+            index (QuantizedIndex): This index, to allow chaining
+        """
+        matrix = self.library.matrix
+        prepared = self.library._prepared.get(self.metric)
+        codes, scales = [], []
+        for start in range(0, len(matrix), block_size):
+            if prepared is not None:
+                block = prepared[0][start:start + block_size]
+            else:
+                block = prepare(matrix[start:start + block_size], self.metric)
+            block_codes, block_scales = quantize(block, self.precision)
+            codes.append(block_codes)
+            scales.append(block_scales)
+
+        dtype = np.int8 if self.precision == _PRECISION_INT8 else np.float16
+        width = self.library.grid.size
+        self.codes = np.concatenate(codes) if codes else np.empty(
+            (0, width), dtype=dtype
+        )
+        self.scales = np.concatenate(scales) if scales else np.empty(
+            0, dtype=np.float32
+        )
+        self._set_norms()
+        return self
+
+    def _set_norms(self):
+        self.norms = None
+        if self.metric == _METRIC_EUCLIDEAN:
+            self.norms = np.einsum(
+                "ij,ij->i", self.codes, self.codes, dtype=np.float32
+            ) * self.scales**2
+
+    def _coarse(
+        self,
+        queries: np.ndarray,
+        n_candidates: int,
+        block_size: int,
+    ) -> np.ndarray:
+        """
+        Best `n_candidates` rows of each prepared query by code scores
+        """
+        best, best_scores = None, None
+        for start in range(0, len(self.codes), block_size):
+            stop = start + block_size
+            block = dequantize(self.codes[start:stop], self.scales[start:stop])
+            norms = None if self.norms is None else self.norms[start:stop]
+            indices, scores = top_k_blocks(
+                block, queries, n_candidates, self.metric, norms
+            )
+            indices += start
+            if best is not None:
+                indices = np.concatenate([best, indices], axis=1)
+                scores = np.concatenate([best_scores, scores], axis=1)
+            keep = top_k_rows(scores, n_candidates, self.metric)
+            best = np.take_along_axis(indices, keep, axis=1)
+            best_scores = np.take_along_axis(scores, keep, axis=1)
+        if best is None:
+            return np.empty((len(queries), 0), dtype=np.intp)
+        return best
+
+    def _rerank(self, query: np.ndarray, rows: np.ndarray, k: int) -> List:
+        """
+        Exact scores of the candidate rows of one prepared query, only
+        reading (and preparing) those rows of the library
+        """
+        rows = np.sort(rows)
+        cached = self.library._prepared.get(self.metric)
+        if cached is not None:
+            prepared, norms = cached
+            prepared = prepared[rows]
+            norms = None if norms is None else norms[rows]
+        else:
+            prepared = prepare(self.library.matrix[rows], self.metric)
+            norms = None
+        scores = score(prepared, query[None, :], self.metric, norms)[0]
+        best = top_k_rows(scores[None, :], k, self.metric)[0]
+        return self.library._matches(rows[best], scores[best])
+
+    def search_batch(
+        self,
+        spectra: Iterable,
+        k: int = 10,
+        n_candidates: int = None,
+        memory_budget: int = _DEFAULT_MEMORY_BUDGET,
+    ) -> List[List[Match]]:
+        """
+        Search many query spectra with the codes, reranking exactly
+
+        The index is rebuilt first when it is stale, i.e. entries were
+        added to the library since it was built, so the codes always
+        cover the rows that are reranked.
+
+        Args:
+            spectra (Iterable): SciData dicts, DatasetContainers or (x, y)
+                tuples
+            k (int): Number of hits to return per query
+            n_candidates (int): Candidates reranked per query, more
+                candidates trade latency for recall. Default: 4 * k
+            memory_budget (int): Bytes allowed for one block of scores
+                or dequantized codes
+
+        Returns:
+            matches (List[List[Match]]): Best matches first, for each query
+        """
+        if self.codes is None or self.stale:
+            self.build()
+        n_candidates = max(n_candidates or 4 * k, k)
+        query_chunk, block_size = chunk_sizes(
+            len(self.codes), np.dtype(np.float32).itemsize, memory_budget
+        )
+        row_bytes = max(self.codes.shape[1], 1) * 4
+        block_size = max(1, min(block_size, memory_budget // row_bytes))
+
+        results = []
+        spectra = iter(spectra)
+        while True:
+            chunk = list(itertools.islice(spectra, query_chunk))
+            if not chunk:
+                return results
+            queries = prepare(self.library.prepare_queries(chunk), self.metric)
+            candidates = self._coarse(queries, n_candidates, block_size)
+            for query, rows in zip(queries, candidates):
+                results.append(self._rerank(query, rows, k))
+
+    def search(
+        self,
+        spectrum,
+        k: int = 10,
+        n_candidates: int = None,
+    ) -> List[Match]:
+        """
+        Find the `k` library entries most similar to a query spectrum,
+        see `search_batch`
+
+        Returns:
+            matches (List[Match]): Best matches first
+        """
+        return self.search_batch([spectrum], k, n_candidates)[0]
+
+    def save(self, filename: str):
+        """
+        Save the codes and scales to a NumPy .npz file
+
+        Args:
+            filename (str): Filename for the index
+        """
+        np.savez(
+            filename,
+            version=_FORMAT_VERSION,
+            metric=self.metric,
+            precision=self.precision,
+            codes=self.codes,
+            scales=self.scales,
+        )
+
+    @classmethod
+    def load(cls, filename: str, library: SpectralLibrary):
+        """
+        Load an index saved with `save` for the library it was built from
+
+        Args:
+            filename (str): Filename of the index
+            library (SpectralLibrary): Library the index was built from
+
+        Raises:
+            IndexMismatchException: Raised when the index does not match
+                the size or grid of the library
+
+        Returns:
+            index (QuantizedIndex): Loaded index
+        """
+        with np.load(filename) as data:
+            codes = data["codes"]
+            if codes.shape != (len(library), library.grid.size):
+                msg = "Index shape {shape} does not match the library"
+                raise IndexMismatchException(msg.format(shape=codes.shape))
+            index = cls(
+                library,
+                metric=str(data["metric"]),
+                precision=str(data["precision"]),
+            )
+            index.codes = codes
+            index.scales = np.array(data["scales"])
+        index._set_norms()
+        return index
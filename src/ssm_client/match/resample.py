@@ -0,0 +1,235 @@
+import collections
+import hashlib
+import threading
+from typing import Iterable
+
+import numpy as np
+
+_METHOD_LINEAR = "linear"
+_METHOD_CUBIC = "cubic"
+_METHOD_CHOICES = [_METHOD_LINEAR, _METHOD_CUBIC]
+
+
+class UnsupportedInterpolationException(Exception):
+    """Raised when unsupported interpolation method specified"""
+
+
+def axis_signature(x: np.ndarray) -> tuple:
+    """
+    Hashable signature of a source axis used as the interpolation cache key
+
+    Args:
+        x (np.ndarray): Source axis values
+
+    Returns:
+        signature (tuple): (size, digest) of the axis values
+    """
+    x = np.ascontiguousarray(x, dtype=np.float64)
+    digest = hashlib.blake2b(x.tobytes(), digest_size=16).digest()
+    return x.size, digest
+
+
+def _linear_tables(x: np.ndarray, grid: np.ndarray, lo: np.ndarray):
+    """
+    Indices (m, 2) and weights (m, 2) of the two bracketing points
+    """
+    hi = lo + 1
+    spacing = x[hi] - x[lo]
+    t = np.divide(
+        grid - x[lo], spacing, out=np.zeros_like(grid), where=spacing != 0
+    )
+    indices = np.stack([lo, hi], axis=1)
+    weights = np.stack([1.0 - t, t], axis=1)
+    return indices, weights
+
+
+def _cubic_tables(x: np.ndarray, grid: np.ndarray, lo: np.ndarray):
+    """
+    Indices (m, 4) and weights (m, 4) for cubic Lagrange interpolation
+    through the 4 points around each grid value, supporting uneven axes.
+    Intervals at the ends of the axis fall back to linear weights.
+    """
+    n = x.size
+    start = np.clip(lo - 1, 0, max(n - 4, 0))
+    indices = start[:, None] + np.arange(4)[None, :]
+    points = x[indices]
+
+    weights = np.ones_like(points)
+    for j in range(4):
+        for m in range(4):
+            if m != j:
+                weights[:, j] *= (grid - points[:, m])
+                weights[:, j] /= points[:, j] - points[:, m]
+
+    edge = (lo == 0) | (lo >= n - 2)
+    if edge.any():
+        linear = _linear_tables(x, grid[edge], lo[edge])
+        linear_indices, linear_weights = linear
+        indices[edge, :2] = linear_indices
+        indices[edge, 2:] = linear_indices[:, 1:]
+        weights[edge, :2] = linear_weights
+        weights[edge, 2:] = 0.0
+    return indices, weights
+
+
+def interpolation_tables(x: np.ndarray, grid: np.ndarray, method: str):
+    """
+    Precompute interpolation indices/weights from a source axis to a grid
+
+    Args:
+        x (np.ndarray): Source axis values, ascending or descending
+        grid (np.ndarray): Target grid values
+        method (str): "linear" or "cubic"
+
+    Returns:
+        indices (np.ndarray): (grid size, n points) indices into `x`
+        weights (np.ndarray): (grid size, n points) interpolation weights,
+            all zero for grid values outside the range of `x`; no points
+            for an empty axis
+    """
+    x = np.asarray(x, dtype=np.float64)
+    if x.size == 0:
+        # No points to interpolate: every grid value is filled with zero
+        empty = np.empty((grid.size, 0))
+        return empty.astype(np.intp), empty
+    order = np.argsort(x, kind="stable")
+    x_sorted = x[order]
+    if x.size == 1:
+        # As np.interp: the single value at its own x, zero elsewhere
+        indices = np.zeros((grid.size, 1), dtype=np.intp)
+        weights = (grid == x_sorted[0]).astype(np.float64)[:, None]
+        return indices, weights
+
+    lo = np.searchsorted(x_sorted, grid, side="right") - 1
+    lo = np.clip(lo, 0, max(x.size - 2, 0))
+    if method == _METHOD_LINEAR or x.size < 4:
+        indices, weights = _linear_tables(x_sorted, grid, lo)
+    else:
+        indices, weights = _cubic_tables(x_sorted, grid, lo)
+
+    outside = (grid < x_sorted[0]) | (grid > x_sorted[-1])
+    weights[outside] = 0.0
+    return order[indices], weights
+
+
+class Resampler:
+    def __init__(
+        self,
+        grid: np.ndarray,
+        method: str = _METHOD_LINEAR,
+        max_cache_size: int = 1024,
+    ):
+        """
+        Initialize a Resampler object
+
+        Interpolation index/weight tables are cached per source-axis
+        signature, so spectra sharing an axis (i.e. from the same
+        instrument) only pay for the table once, and a whole batch is
+        then resampled with one gather and weighted sum.
+
+        Args:
+            grid (np.ndarray): Target grid to resample onto
+            method (str): Interpolation method.
+                Default: "linear" Choices: ["linear", "cubic"]
+            max_cache_size (int): Maximum number of cached tables
+        """
+        if method not in _METHOD_CHOICES:
+            msg = (
+                "method: {method} not supported\n"
+                "Supported interpolation methods are {choices}"
+            )
+            msg = msg.format(method=method, choices=_METHOD_CHOICES)
+            raise UnsupportedInterpolationException(msg)
+        self.grid = np.asarray(grid, dtype=np.float64)
+        self.method = method
+        self.max_cache_size = max_cache_size
+        self.hits = 0
+        self.misses = 0
+        self._cache = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def tables(self, x: np.ndarray, signature: tuple = None) -> tuple:
+        """
+        Cached interpolation tables for a source axis
+
+        Args:
+            x (np.ndarray): Source axis values
+            signature (tuple): Precomputed `axis_signature` of `x`
+
+        Returns:
+            indices (np.ndarray): Indices into `x` for each grid value
+            weights (np.ndarray): Interpolation weights
+        """
+        if signature is None:
+            signature = axis_signature(x)
+        with self._lock:
+            tables = self._cache.get(signature)
+            if tables is not None:
+                self._cache.move_to_end(signature)
+                self.hits += 1
+                return tables
+            self.misses += 1
+
+        tables = interpolation_tables(x, self.grid, self.method)
+        with self._lock:
+            self._cache[signature] = tables
+            while len(self._cache) > self.max_cache_size:
+                self._cache.popitem(last=False)
+        return tables
+
+    def resample(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """
+        Resample one spectrum onto the grid
+
+        Args:
+            x (np.ndarray): Source axis values
+            y (np.ndarray): Source intensities
+
+        Returns:
+            y_grid (np.ndarray): Intensities on the grid
+        """
+        return self.resample_batch([x], [y])[0]
+
+    def resample_batch(
+        self,
+        xs: Iterable[np.ndarray],
+        ys: Iterable[np.ndarray],
+        out: np.ndarray = None,
+    ) -> np.ndarray:
+        """
+        Resample a batch of spectra onto the grid
+
+        Spectra are grouped by axis signature and every group is
+        interpolated at once as a (n spectra, n points) matrix.
+
+        Args:
+            xs (Iterable[np.ndarray]): Source axes of each spectrum
+            ys (Iterable[np.ndarray]): Source intensities of each spectrum
+            out (np.ndarray): Optional (n spectra, grid size) output array
+
+        Returns:
+            y_grid (np.ndarray): (n spectra, grid size) intensities
+        """
+        xs = [np.asarray(x, dtype=np.float64) for x in xs]
+        ys = list(ys)
+        if out is None:
+            out = np.empty((len(xs), self.grid.size), dtype=np.float64)
+
+        groups = collections.defaultdict(list)
+        signatures = dict()
+        for i, x in enumerate(xs):
+            signature = axis_signature(x)
+            groups[signature].append(i)
+            signatures[signature] = x
+
+        for signature, rows in groups.items():
+            indices, weights = self.tables(signatures[signature], signature)
+            if indices.shape[1] == 0:
+                out[rows] = 0.0
+                continue
+            block = np.asarray([ys[i] for i in rows], dtype=np.float64)
+            values = block[:, indices[:, 0]] * weights[:, 0]
+            for j in range(1, indices.shape[1]):
+                values += block[:, indices[:, j]] * weights[:, j]
+            out[rows] = values
+        return out
@@ -0,0 +1,252 @@
+import heapq
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Iterable, List
+
+import numpy as np
+
+from .library import (
+    _DEFAULT_MEMORY_BUDGET,
+    _METRIC_COSINE,
+    _METRIC_EUCLIDEAN,
+    Match,
+    SpectralLibrary,
+    _check_metric,
+    chunk_sizes,
+    prepare,
+    top_k_blocks,
+)
+from .snapshot import _MATRIX, _PREPARED, open_snapshot, read_header
+
+_SOURCE_SNAPSHOT = "snapshot"
+_SOURCE_SHARED_MEMORY = "shared_memory"
+
+# Library arrays of a worker process, set by _init_worker
+_worker = dict()
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """
+    Attach to a shared memory block owned (and unlinked) by the parent
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13: workers share the resource tracker of the parent,
+        # so registering the block again is harmless
+        return shared_memory.SharedMemory(name=name)
+
+
+def _init_worker(source: tuple):
+    """
+    Map the prepared library in a worker process, without copying it
+    """
+    kind, location, metric = source[:3]
+    if kind == _SOURCE_SNAPSHOT:
+        library = open_snapshot(location)
+        _worker["prepared"], _worker["norms"] = library._prepared[metric]
+        return
+    shape, dtype = source[3:]
+    block = _attach(location)
+    prepared = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+    norms = None
+    if metric == _METRIC_EUCLIDEAN:
+        offset = prepared.nbytes
+        norms = np.ndarray(
+            shape[:1], dtype=dtype, buffer=block.buf, offset=offset
+        )
+    _worker.update(block=block, prepared=prepared, norms=norms)
+
+
+def _search_shard(
+    start: int,
+    stop: int,
+    queries: np.ndarray,
+    k: int,
+    metric: str,
+    block_size: int,
+) -> tuple:
+    """
+    Top-k over the library rows [start, stop) of a worker
+    """
+    prepared = _worker["prepared"][start:stop]
+    norms = _worker["norms"]
+    norms = None if norms is None else norms[start:stop]
+    indices, scores = top_k_blocks(
+        prepared, queries, k, metric, norms, block_size
+    )
+    return indices + start, scores
+
+
+class ShardedSearch:
+    def __init__(
+        self,
+        library: SpectralLibrary,
+        metric: str = _METRIC_COSINE,
+        processes: int = None,
+        n_shards: int = None,
+    ):
+        """
+        Initialize a ShardedSearch object
+
+        Splits the library rows into shards scored by a pool of worker
+        processes. Workers never receive the library through pickling:
+        they memory-map the snapshot backing the library when it stores
+        the matrix prepared for `metric` (see `write_snapshot`), and
+        otherwise attach to one shared memory copy of the prepared
+        matrix. Queries are scattered to every shard and the per-shard
+        top-k lists are merged with a heap.
+
+        Args:
+            library (SpectralLibrary): Library to search
+            metric (str): Choice of metric. Default: "cosine"
+                Choices: ["cosine", "pearson", "euclidean"]
+            processes (int): Number of worker processes, defaults to the
+                number of CPUs
+            n_shards (int): Number of shards, defaults to `processes`
+        """
+        _check_metric(metric)
+        self.library = library
+        self.metric = metric
+        self.processes = processes or os.cpu_count() or 1
+        self.n_shards = max(1, min(n_shards or self.processes, len(library)))
+
+        bounds = np.linspace(0, len(library), self.n_shards + 1).astype(int)
+        self.shards = list(zip(bounds[:-1], bounds[1:]))
+
+        self._block = None
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.processes,
+            initializer=_init_worker,
+            initargs=(self._source(),),
+        )
+
+    def _source(self) -> tuple:
+        """
+        Description of where workers find the prepared library
+        """
+        filename = self.library.filename
+        if filename:
+            sections = read_header(filename)["sections"]
+            unchanged = sections[_MATRIX]["shape"][0] == len(self.library)
+            if unchanged and _PREPARED + self.metric in sections:
+                return _SOURCE_SNAPSHOT, filename, self.metric
+
+        prepared, norms = self.library._prepared_matrix(self.metric)
+        size = prepared.nbytes
+        if norms is not None:
+            size += prepared.shape[0] * prepared.dtype.itemsize
+        self._block = shared_memory.SharedMemory(create=True, size=size or 1)
+        shared = np.ndarray(
+            prepared.shape, dtype=prepared.dtype, buffer=self._block.buf
+        )
+        shared[:] = prepared
+        if norms is not None:
+            shared_norms = np.ndarray(
+                prepared.shape[:1],
+                dtype=prepared.dtype,
+                buffer=self._block.buf,
+                offset=prepared.nbytes,
+            )
+            shared_norms[:] = norms
+        return (
+            _SOURCE_SHARED_MEMORY,
+            self._block.name,
+            self.metric,
+            prepared.shape,
+            prepared.dtype.str,
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """
+        Stop the worker processes and release the shared memory
+        """
+        self._executor.shutdown(wait=True)
+        if self._block is not None:
+            self._block.close()
+            self._block.unlink()
+            self._block = None
+
+    def _merge(self, shard_results: list, k: int) -> List[List[Match]]:
+        """
+        Merge the sorted per-shard top-k lists of each query with a heap
+        """
+        sign = 1.0 if self.metric == _METRIC_EUCLIDEAN else -1.0
+        results = []
+        for query in range(shard_results[0][0].shape[0]):
+            lists = [
+                zip(scores[query], indices[query])
+                for indices, scores in shard_results
+            ]
+            merged = heapq.merge(*lists, key=lambda hit: sign * hit[0])
+            best = list(itertools.islice(merged, k))
+            scores = [hit[0] for hit in best]
+            indices = [hit[1] for hit in best]
+            results.append(self.library._matches(indices, scores))
+        return results
+
+    def search_batch(
+        self,
+        spectra: Iterable,
+        k: int = 10,
+        memory_budget: int = _DEFAULT_MEMORY_BUDGET,
+    ) -> List[List[Match]]:
+        """
+        Search many query spectra across the shards
+
+        Args:
+            spectra (Iterable): SciData dicts, DatasetContainers or (x, y)
+                tuples
+            k (int): Number of hits to return per query
+            memory_budget (int): Bytes allowed for one block of scores in
+                each worker
+
+        Returns:
+            matches (List[List[Match]]): Best matches first, for each query
+        """
+        largest = max(stop - start for start, stop in self.shards)
+        query_chunk, block_size = chunk_sizes(
+            largest, self.library.dtype.itemsize, memory_budget
+        )
+        results = []
+        spectra = iter(spectra)
+        while True:
+            chunk = list(itertools.islice(spectra, query_chunk))
+            if not chunk:
+                return results
+            queries = prepare(self.library.prepare_queries(chunk), self.metric)
+            futures = [
+                self._executor.submit(
+                    _search_shard,
+                    start,
+                    stop,
+                    queries,
+                    k,
+                    self.metric,
+                    block_size,
+                )
+                for start, stop in self.shards
+            ]
+            shard_results = [future.result() for future in futures]
+            results.extend(self._merge(shard_results, k))
+
+    def search(self, spectrum, k: int = 10) -> List[Match]:
+        """
+        Find the `k` library entries most similar to a query spectrum
+
+        Args:
+            spectrum: SciData dict, DatasetContainer, Spectrum or (x, y) tuple
+            k (int): Number of hits to return
+
+        Returns:
+            matches (List[Match]): Best matches first
+        """
+        return self.search_batch([spectrum], k=k)[0]
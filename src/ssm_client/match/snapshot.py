@@ -0,0 +1,229 @@
+import json
+import struct
+from collections.abc import Sequence
+from typing import Iterable
+
+import numpy as np
+
+from .library import SpectralLibrary
+from .preprocess import Pipeline
+
+_MAGIC = b"SSMLIB01"
+_PREAMBLE = struct.Struct("<8sQ")
+_ALIGNMENT = 4096
+_FORMAT_VERSION = 1
+
+_GRID = "grid"
+_INPUT_GRID = "input_grid"
+_MATRIX = "matrix"
+_KEYS = "keys"
+_METADATA = "metadata"
+_METADATA_OFFSETS = "metadata_offsets"
+_PREPARED = "prepared/"
+_NORMS = "norms/"
+
+
+class InvalidSnapshotException(Exception):
+    """Raised when a file is not a spectral library snapshot"""
+
+
+def _align(offset: int) -> int:
+    return -(-offset // _ALIGNMENT) * _ALIGNMENT
+
+
+class _SnapshotMetadata(Sequence):
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        """
+        Metadata table of a snapshot, decoding entries on access
+
+        Args:
+            blob (np.ndarray): uint8 memmap of the JSON encoded entries
+            offsets (np.ndarray): Start of each entry in `blob`, plus end
+        """
+        self._blob = blob
+        self._offsets = offsets
+        self._appended = []
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1 + len(self._appended)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        n_stored = len(self._offsets) - 1
+        if i >= n_stored:
+            return self._appended[i - n_stored]
+        start, stop = self._offsets[i], self._offsets[i + 1]
+        return json.loads(self._blob[start:stop].tobytes())
+
+    def append(self, metadata: dict):
+        self._appended.append(metadata)
+
+
+def write_snapshot(
+    filename: str,
+    library: SpectralLibrary,
+    prepared_metrics: Iterable[str] = ("cosine",),
+):
+    """
+    Write a library snapshot that can be memory-mapped by `open_snapshot`
+
+    Layout: magic, header length and JSON header, then page-aligned
+    sections for the grid, the contiguous (n entries, n grid) matrix,
+    optional matrices already prepared for a metric, the JSON keys and
+    the JSON metadata table with per-entry offsets.
+
+    Args:
+        filename (str): Filename for the snapshot
+        library (SpectralLibrary): Library to write out
+        prepared_metrics (Iterable[str]): Metrics to store prepared
+            matrices for, so searches with them never copy the matrix
+    """
+    sections = [(_GRID, library.grid), (_MATRIX, library.matrix)]
+    if library.preprocess is not None:
+        sections.append((_INPUT_GRID, library.resampler.grid))
+    for metric in prepared_metrics:
+        prepared, norms = library._prepared_matrix(metric)
+        sections.append((_PREPARED + metric, prepared))
+        if norms is not None:
+            sections.append((_NORMS + metric, norms))
+
+    keys = json.dumps(list(library.keys)).encode("utf-8")
+    sections.append((_KEYS, np.frombuffer(keys, dtype=np.uint8)))
+
+    entries = [
+        json.dumps(library.metadata[i]).encode("utf-8")
+        for i in range(len(library))
+    ]
+    offsets = np.zeros(len(entries) + 1, dtype=np.uint64)
+    offsets[1:] = np.cumsum([len(entry) for entry in entries])
+    blob = np.frombuffer(b"".join(entries), dtype=np.uint8)
+    sections.append((_METADATA, blob))
+    sections.append((_METADATA_OFFSETS, offsets))
+
+    header = {
+        "version": _FORMAT_VERSION,
+        "normalize": library.normalize,
+        "interpolation": library.resampler.method,
+        "dtype": library.dtype.str,
+        "sections": dict(),
+    }
+    if library.preprocess is not None:
+        header["preprocess"] = library.preprocess.config()
+
+    # Section offsets depend on the header size, which depends on the
+    # offsets; a generous fixed reserve for the header avoids iterating
+    reserve = _align(_PREAMBLE.size + 1024 + 256 * len(sections))
+    offset = reserve
+    for name, array in sections:
+        array = np.ascontiguousarray(array)
+        header["sections"][name] = {
+            "offset": offset,
+            "dtype": array.dtype.str,
+            "shape": list(array.shape),
+        }
+        offset = _align(offset + array.nbytes)
+
+    encoded = json.dumps(header).encode("utf-8")
+    if _PREAMBLE.size + len(encoded) > reserve:
+        raise ValueError("Snapshot header too large")
+
+    with open(filename, "wb") as fileobj:
+        fileobj.write(_PREAMBLE.pack(_MAGIC, len(encoded)))
+        fileobj.write(encoded)
+        for name, array in sections:
+            fileobj.seek(header["sections"][name]["offset"])
+            fileobj.write(np.ascontiguousarray(array).tobytes())
+        fileobj.truncate(offset)
+
+
+def read_header(filename: str) -> dict:
+    """
+    Read the JSON header of a snapshot
+
+    Args:
+        filename (str): Filename of the snapshot
+
+    Raises:
+        InvalidSnapshotException: Raised when the file is not a snapshot
+
+    Returns:
+        header (dict): Snapshot header
+    """
+    with open(filename, "rb") as fileobj:
+        preamble = fileobj.read(_PREAMBLE.size)
+        if len(preamble) != _PREAMBLE.size:
+            raise InvalidSnapshotException(f"{filename} is too short")
+        magic, length = _PREAMBLE.unpack(preamble)
+        if magic != _MAGIC:
+            raise InvalidSnapshotException(f"{filename} is not a snapshot")
+        return json.loads(fileobj.read(length))
+
+
+def _section(filename: str, header: dict, name: str) -> np.ndarray:
+    """
+    Read-only memory map of a snapshot section
+    """
+    section = header["sections"][name]
+    shape = tuple(section["shape"])
+    if 0 in shape:
+        return np.empty(shape, dtype=section["dtype"])
+    return np.memmap(
+        filename,
+        mode="r",
+        dtype=section["dtype"],
+        offset=section["offset"],
+        shape=shape,
+    )
+
+
+def open_snapshot(filename: str) -> SpectralLibrary:
+    """
+    Open a snapshot as a SpectralLibrary backed by memory maps
+
+    The matrix, prepared matrices and metadata are not read up front;
+    pages are loaded on access and shared by every process that opens
+    the same snapshot.
+
+    Args:
+        filename (str): Filename of the snapshot
+
+    Returns:
+        library (SpectralLibrary): Library over the snapshot
+    """
+    header = read_header(filename)
+    preprocess = None
+    grid = np.array(_section(filename, header, _GRID))
+    if "preprocess" in header:
+        preprocess = Pipeline.from_config(header["preprocess"])
+        grid = np.array(_section(filename, header, _INPUT_GRID))
+    library = SpectralLibrary(
+        grid=grid,
+        normalize=header["normalize"],
+        dtype=header["dtype"],
+        interpolation=header["interpolation"],
+        preprocess=preprocess,
+    )
+    library._matrix = _section(filename, header, _MATRIX)
+    library.filename = str(filename)
+
+    for name in header["sections"]:
+        if not name.startswith(_PREPARED):
+            continue
+        metric = name[len(_PREPARED):]
+        norms = None
+        if _NORMS + metric in header["sections"]:
+            norms = _section(filename, header, _NORMS + metric)
+        prepared = _section(filename, header, name)
+        library._prepared[metric] = (prepared, norms)
+
+    keys = json.loads(_section(filename, header, _KEYS).tobytes())
+    library.keys = keys
+    library._positions = {key: i for i, key in enumerate(keys)}
+    library.metadata = _SnapshotMetadata(
+        _section(filename, header, _METADATA),
+        _section(filename, header, _METADATA_OFFSETS),
+    )
+    return library
@@ -0,0 +1,42 @@
+from typing import Dict, List
+
+_MULTIPLICITY = "multiplicity"
+_TECHNIQUE = "technique"
+
+
+def facets_from_scidata(scidata_dict: dict) -> Dict[str, List[str]]:
+    """
+    Values of the `@graph.scidata.system.facets` entries of a SciData dict
+
+    Every non-JSON-LD field of a facet entry except "multiplicity"
+    becomes a facet field, i.e. "formula", "crystal system",
+    "structure type" or "atoms" for functional groups.
+
+    Args:
+        scidata_dict (dict): SciData JSON-LD dictionary
+
+    Returns:
+        facets (Dict[str, List[str]]): Values of each facet field
+    """
+    scidata = scidata_dict.get("@graph", {}).get("scidata", {})
+    facets = dict()
+    for facet in scidata.get("system", {}).get("facets", []):
+        for field, value in facet.items():
+            if field.startswith("@") or field == _MULTIPLICITY:
+                continue
+            values = facets.setdefault(field, [])
+            if str(value) not in values:
+                values.append(str(value))
+    return facets
+
+
+def technique_from_scidata(scidata_dict: dict) -> str:
+    """
+    Technique of the first methodology aspect naming one, i.e.
+    "Raman Spectroscopy", or None
+    """
+    scidata = scidata_dict.get("@graph", {}).get("scidata", {})
+    for aspect in scidata.get("methodology", {}).get("aspects", []):
+        if aspect.get(_TECHNIQUE):
+            return aspect[_TECHNIQUE]
+    return None
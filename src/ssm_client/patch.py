@@ -0,0 +1,96 @@
+import numpy as np
+
+
+def _equal(old, new) -> bool:
+    """
+    Deep equality of JSON values that may contain NumPy arrays, skipping
+    subtrees that are the same object without visiting them
+    """
+    if old is new:
+        return True
+    if isinstance(old, np.ndarray) or isinstance(new, np.ndarray):
+        return (
+            isinstance(old, np.ndarray)
+            and isinstance(new, np.ndarray)
+            and old.dtype == new.dtype
+            and np.array_equal(old, new)
+        )
+    if type(old) is not type(new):
+        return False
+    if isinstance(old, dict):
+        if old.keys() != new.keys():
+            return False
+        return all(_equal(old[key], new[key]) for key in old)
+    if isinstance(old, list):
+        if len(old) != len(new):
+            return False
+        try:
+            # Lists of plain values (i.e. data arrays) compare in C
+            return old == new
+        except ValueError:
+            # Ambiguous truth value: the lists hold NumPy arrays
+            return all(_equal(a, b) for a, b in zip(old, new))
+    return old == new
+
+
+def merge_patch(old: dict, new: dict) -> dict:
+    """
+    Minimal JSON merge patch (RFC 7386) turning `old` into `new`
+
+    Objects are compared key by key and only changed keys are kept;
+    unchanged subtrees, including large data arrays, are skipped (by
+    identity when shared, which is free). Removed keys are set to None
+    and lists are replaced whole, as merge patches do.
+
+    Args:
+        old (dict): Current document, i.e. the SciData dict at the server
+        new (dict): Updated document
+
+    Returns:
+        patch (dict): PATCH body, empty when nothing changed
+    """
+    patch = dict()
+    for key, value in new.items():
+        if key not in old:
+            patch[key] = value
+            continue
+        previous = old[key]
+        if previous is value:
+            continue
+        if isinstance(previous, dict) and isinstance(value, dict):
+            nested = merge_patch(previous, value)
+            if nested:
+                patch[key] = nested
+        elif not _equal(previous, value):
+            patch[key] = value
+    for key in old:
+        if key not in new:
+            patch[key] = None
+    return patch
+
+
+def apply_merge_patch(document: dict, patch: dict) -> dict:
+    """
+    Apply a JSON merge patch (RFC 7386), see `merge_patch`
+
+    Only the dicts along the patched paths are copied, the document
+    itself is left untouched.
+
+    Args:
+        document (dict): Document to patch
+        patch (dict): JSON merge patch
+
+    Returns:
+        patched (dict): New document
+    """
+    patched = dict(document)
+    for key, value in patch.items():
+        if value is None:
+            patched.pop(key, None)
+        elif isinstance(value, dict):
+            target = patched.get(key)
+            target = target if isinstance(target, dict) else dict()
+            patched[key] = apply_merge_patch(target, value)
+        else:
+            patched[key] = value
+    return patched
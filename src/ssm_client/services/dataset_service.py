@@ -1,7 +1,13 @@
+import collections
+import json
 import requests
 import warnings
+from concurrent.futures import ThreadPoolExecutor
 
 from ssm_client.containers import DatasetContainer
+from ssm_client.digest import json_default
+from ssm_client.patch import merge_patch
+from ssm_client.spectrum import Spectrum
 from .collection_service import _COLLECTION_ENDPOINT
 
 _DATASETS_ENDPOINT = "datasets"
@@ -10,6 +16,11 @@ _FORMAT_JSONLD = "jsonld"
 _FORMAT_SSM_JSON = "json"
 _DATASET_FORMAT_CHOICES = [_FORMAT_JSONLD, _FORMAT_SSM_JSON]
 
+EVENT_CREATE = "create"
+EVENT_REPLACE = "replace"
+EVENT_UPDATE = "update"
+EVENT_DELETE = "delete"
+
 
 class MismatchedCollectionException(Exception):
     """
@@ -22,6 +33,22 @@ class UnsupportedDatasetFormatException(Exception):
     """Raised when unsupported dataset format specified"""
 
 
+def _ordered_map(func, items, max_workers: int, lookahead: int = None):
+    """
+    Lazily map a function over items in a thread pool, in order, with at
+    most `lookahead` (default 2 * max_workers) calls ahead of the consumer
+    """
+    lookahead = max(lookahead or 2 * max_workers, 1)
+    pending = collections.deque()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for item in items:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= lookahead:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
 class DatasetService:
     def __init__(
         self,
@@ -60,6 +87,35 @@ class DatasetService:
         if collection:
             self.collection_title = collection.title
 
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """
+        Register a callback for changes made through this service
+
+        The callback is called as `callback(event, uuid, dataset)` after
+        each successful create, replace, update or delete, with `event`
+        one of "create", "replace", "update", "delete" and `dataset` the
+        returned DatasetContainer (None for "delete").
+
+        Args:
+            callback (Callable): Function to call on each change
+        """
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        """
+        Unregister a callback added with `add_listener`
+
+        Args:
+            callback (Callable): Function to remove
+        """
+        self._listeners.remove(callback)
+
+    def _notify(self, event, uuid, dataset=None):
+        for callback in list(self._listeners):
+            callback(event, uuid, dataset)
+
     def _endpoint(self, dataset=None):
         """
         Helper function to form the address of the `datasets` endpoint
@@ -110,9 +166,67 @@ class DatasetService:
 
         response = requests.post(self._endpoint(), json=dataset)
         response.raise_for_status()
-        return DatasetContainer(**response.json())
+        output = DatasetContainer(**response.json())
+        self._notify(EVENT_CREATE, output.uuid, output)
+        return output
+
+    def create_many(
+        self,
+        datasets,
+        max_workers: int = 4,
+        lookahead: int = None,
+    ) -> list:
+        """
+        Create many datasets concurrently for collection at SSM Catalog API
+
+        `datasets` is consumed lazily, with at most `lookahead` datasets
+        read ahead of the uploads, so it can stream from a file.
+
+        Args:
+            datasets (Iterable[dict]): JSON-LD Datasets to create
+            max_workers (int): Number of datasets created concurrently
+            lookahead (int): Datasets read ahead. Default: 2 * max_workers
+
+        Raises:
+            requests.HTTPError: Raised when we cannot find
+                the collection or Dataset
+
+        Returns:
+            uuids (list[str]): UUIDs of the created datasets, in order
+        """
+        created = _ordered_map(self.create, datasets, max_workers, lookahead)
+        return [dataset.uuid for dataset in created]
+
+    def get_datasets(self, page_number: int = None, page_size: int = None):
+        """
+        Get the UUIDs of the datasets in the collection at SSM Catalog API
+
+        Args:
+            page_number (int): Page to return, starting at 0.
+                Default: all datasets in one page
+            page_size (int): Number of UUIDs per page
+
+        Raises:
+            requests.HTTPError: Raised when we cannot find the collection
+
+        Returns:
+            uuids (list[str]): UUIDs of the datasets in the collection
+        """
+        params = dict()
+        if page_number is not None:
+            params["pageNumber"] = page_number
+        if page_size is not None:
+            params["pageSize"] = page_size
+        response = requests.get(self._endpoint(), params=params)
+        response.raise_for_status()
+        return response.json()
 
-    def get_by_uuid(self, uuid, format: str = _FORMAT_JSONLD):
+    def get_by_uuid(
+        self,
+        uuid,
+        format: str = _FORMAT_JSONLD,
+        as_spectrum: bool = False,
+    ):
         """
         Get dataset for given UUID at SSM Catalog API
 
@@ -120,13 +234,20 @@ class DatasetService:
             uuid (str): 64-character UUID for dataset
             format (str): Choice of format to return.
                 Default: "jsonld" Choices: ["json", "jsonld"]
+            as_spectrum (bool): Return the Spectrum of the dataset instead,
+                only with the "jsonld" format
 
         Raises:
+            UnsupportedDatasetFormatException: Raised for an unknown format
+                or for `as_spectrum` with the "json" format
             requests.HTTPError: Raised when we cannot find
                 the collection or dataset
+            MissingSpectrumException: Raised with `as_spectrum` when the
+                dataset has no x/y data arrays
 
         Returns:
             dataset (DatasetContainer): DatasetContainer object with given UUID
+                or its Spectrum
         """
         if format not in _DATASET_FORMAT_CHOICES:
             msg = (
@@ -138,6 +259,13 @@ class DatasetService:
                 choices=_DATASET_FORMAT_CHOICES,
             )
             raise UnsupportedDatasetFormatException(msg)
+        if as_spectrum and format != _FORMAT_JSONLD:
+            msg = (
+                "format: {format} not supported with as_spectrum\n"
+                "Spectra are read from the {jsonld} format"
+            )
+            msg = msg.format(format=format, jsonld=_FORMAT_JSONLD)
+            raise UnsupportedDatasetFormatException(msg)
         params = {"format": format}
         response = requests.get(self._endpoint(uuid), params=params)
         response.raise_for_status()
@@ -147,8 +275,73 @@ class DatasetService:
             output = DatasetContainer(**response.json())
         elif format is _FORMAT_SSM_JSON:
             output = DatasetContainer(dataset=response.json())
+        if as_spectrum:
+            return Spectrum.from_dataset(output)
         return output
 
+    def iter_datasets(
+        self,
+        uuids=None,
+        max_workers: int = 4,
+        lookahead: int = None,
+    ):
+        """
+        Fetch datasets concurrently, yielding them in order
+
+        At most `lookahead` datasets are fetched ahead of the one being
+        consumed, so memory stays bounded whatever the collection size.
+
+        Args:
+            uuids (Iterable[str]): Datasets to fetch, defaults to the
+                dataset listing of the collection
+            max_workers (int): Number of datasets fetched concurrently
+            lookahead (int): Datasets fetched ahead. Default: 2 * max_workers
+
+        Raises:
+            requests.HTTPError: Raised when a dataset cannot be fetched
+
+        Returns:
+            datasets (Iterator[DatasetContainer]): Dataset of each UUID,
+                in order
+        """
+        if uuids is None:
+            uuids = self.get_datasets()
+        return _ordered_map(self.get_by_uuid, uuids, max_workers, lookahead)
+
+    def get_by_uuid_if_modified(self, uuid, etag: str = None) -> tuple:
+        """
+        Conditional get of the dataset for given UUID at SSM Catalog API
+
+        Sends `etag` as If-None-Match, so an unchanged dataset is not
+        transferred again.
+
+        Args:
+            uuid (str): 64-character UUID for dataset
+            etag (str): ETag of the copy of the dataset already held
+
+        Raises:
+            requests.HTTPError: Raised when we cannot find
+                the collection or dataset
+
+        Returns:
+            dataset (DatasetContainer): DatasetContainer object with given
+                UUID, None when it is not modified
+            etag (str): ETag of the dataset, None when the server does not
+                send ETags
+        """
+        headers = dict()
+        if etag:
+            headers["If-None-Match"] = etag
+        params = {"format": _FORMAT_JSONLD}
+        response = requests.get(
+            self._endpoint(uuid), params=params, headers=headers
+        )
+        response.raise_for_status()
+        if response.status_code == 304:
+            return None, etag
+        output = DatasetContainer(**response.json())
+        return output, response.headers.get("ETag")
+
     def replace_dataset_for_uuid(self, uuid, dataset):
         """
         Update via replace Dataset for given UUID at SSM Catalog API
@@ -166,15 +359,24 @@ class DatasetService:
         """
         response = requests.put(self._endpoint(uuid), json=dataset)
         response.raise_for_status()
-        return DatasetContainer(**response.json())
+        output = DatasetContainer(**response.json())
+        self._notify(EVENT_REPLACE, uuid, output)
+        return output
 
-    def update_dataset_for_uuid(self, uuid, dataset):
+    def update_dataset_for_uuid(self, uuid, dataset, base=None):
         """
         Update part of Dataset for given UUID at SSM Catalog API
 
+        With `base`, `dataset` is the whole updated document and only the
+        minimal merge patch from `base` to it is sent (see
+        `ssm_client.patch.merge_patch`); nothing is sent when they match,
+        but listeners are still notified of the update.
+
         Args:
             uuid (str): 64-character UUID for dataset to replace
-            dataset (dict): JSON-LD with partial dataset to update
+            dataset (dict): JSON-LD with partial dataset to update, data
+                arrays can be NumPy arrays
+            base (dict): JSON-LD of the dataset before the update
 
         Raises:
             requests.HTTPError: Raised when we cannot find
@@ -183,9 +385,23 @@ class DatasetService:
         Returns:
             new_dataset (DatasetContainer): Updated DatasetContainer object
         """
-        response = requests.patch(self._endpoint(uuid), json=dataset)
+        if base is not None:
+            dataset = merge_patch(base, dataset)
+            if not dataset:
+                output = DatasetContainer(uuid=uuid, dataset=base)
+                self._notify(EVENT_UPDATE, uuid, output)
+                return output
+        # Patches cut from documents built around NumPy arrays (i.e. by
+        # `Spectrum.to_scidata`) can hold arrays, which `json=` rejects
+        response = requests.patch(
+            self._endpoint(uuid),
+            data=json.dumps(dataset, default=json_default),
+            headers={"Content-Type": "application/json"},
+        )
         response.raise_for_status()
-        return DatasetContainer(**response.json())
+        output = DatasetContainer(**response.json())
+        self._notify(EVENT_UPDATE, uuid, output)
+        return output
 
     def delete_by_uuid(self, uuid):
         """
@@ -200,3 +416,4 @@ class DatasetService:
         """
         response = requests.delete(self._endpoint(uuid))
         response.raise_for_status()
+        self._notify(EVENT_DELETE, uuid)
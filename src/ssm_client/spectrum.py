@@ -0,0 +1,252 @@
+from typing import List
+
+import numpy as np
+
+_AXIS_X = "x-axis"
+_AXIS_Y = "y-axis"
+
+
+class MissingSpectrumException(Exception):
+    """Raised when no x/y data arrays can be found in a SciData document"""
+
+
+def _as_array(dataarray) -> np.ndarray:
+    """
+    float64 view of a data array, only copying when it must be parsed
+    or converted (i.e. a JSON list of strings)
+    """
+    return np.asarray(dataarray, dtype=np.float64)
+
+
+def _locate(scidata_dict: dict) -> tuple:
+    """
+    Position of the x/y parameters in the dataseries of a SciData dict
+
+    Returns:
+        location (tuple): (dataseries index, x parameter index,
+            y parameter index)
+    """
+    scidata = scidata_dict.get("@graph", {}).get("scidata", {})
+    dataseries_list = scidata.get("dataset", {}).get("dataseries", [])
+    for i, dataseries in enumerate(dataseries_list):
+        positions = {
+            parameter.get("axis"): j
+            for j, parameter in enumerate(dataseries.get("parameter", []))
+            if parameter.get("dataarray") is not None
+        }
+        if _AXIS_X in positions and _AXIS_Y in positions:
+            return i, positions[_AXIS_X], positions[_AXIS_Y]
+    raise MissingSpectrumException("No x-axis / y-axis data arrays found")
+
+
+def _parameters(scidata_dict: dict, location: tuple) -> List[dict]:
+    i, j_x, j_y = location
+    graph = scidata_dict["@graph"]
+    dataseries = graph["scidata"]["dataset"]["dataseries"][i]
+    return [dataseries["parameter"][j_x], dataseries["parameter"][j_y]]
+
+
+def _parameter(axis: str, values, units: str, quantity: str) -> dict:
+    parameter = {
+        "@id": "parameter/{n}/".format(n=1 if axis == _AXIS_X else 2),
+        "@type": "sdo:parameter",
+        "quantity": quantity,
+        "property": quantity,
+        "axis": axis,
+        "units": units,
+        "datatype": "decimal",
+        "dataarray": values,
+    }
+    return {k: v for k, v in parameter.items() if v is not None}
+
+
+class Spectrum:
+    __slots__ = (
+        "x",
+        "y",
+        "x_units",
+        "y_units",
+        "x_quantity",
+        "y_quantity",
+        "metadata",
+        "scidata",
+        "_location",
+    )
+
+    def __init__(
+        self,
+        x,
+        y,
+        x_units: str = None,
+        y_units: str = None,
+        x_quantity: str = None,
+        y_quantity: str = None,
+        metadata: dict = None,
+        scidata: dict = None,
+    ):
+        """
+        Initialize a Spectrum object
+
+        x/y values of a spectrum as NumPy arrays with their units and
+        key metadata, converted to and from SciData dicts without copying
+        the data arrays when they already are NumPy arrays.
+
+        Args:
+            x (np.ndarray): x-axis values
+            y (np.ndarray): y-axis values
+            x_units (str): Units of the x-axis, i.e. "1/cm"
+            y_units (str): Units of the y-axis
+            x_quantity (str): Quantity of the x-axis, i.e. "Wave Numbers"
+            y_quantity (str): Quantity of the y-axis
+            metadata (dict): Key metadata, i.e. "title", "uid" and "uuid"
+            scidata (dict): SciData dict the spectrum was read from,
+                used as the template of `to_scidata`
+
+        Raises:
+            ValueError: Raised when x and y differ in length
+        """
+        x = _as_array(x)
+        y = _as_array(y)
+        if x.shape != y.shape:
+            msg = "x: {x} and y: {y} shapes differ"
+            raise ValueError(msg.format(x=x.shape, y=y.shape))
+        self.x = x
+        self.y = y
+        self.x_units = x_units
+        self.y_units = y_units
+        self.x_quantity = x_quantity
+        self.y_quantity = y_quantity
+        self.metadata = dict() if metadata is None else metadata
+        self.scidata = scidata
+        self._location = None
+
+    def __len__(self) -> int:
+        return self.x.size
+
+    def __repr__(self) -> str:
+        return (
+            f"Spectrum(title={self.title!r}, n_points={len(self)}, "
+            f"x_units={self.x_units!r})"
+        )
+
+    @property
+    def title(self) -> str:
+        """
+        Title of the spectrum, if known
+        """
+        return self.metadata.get("title")
+
+    @property
+    def uid(self) -> str:
+        """
+        SciData uid of the spectrum, if known
+        """
+        return self.metadata.get("uid")
+
+    @classmethod
+    def from_scidata(cls, scidata_dict: dict, uuid: str = None):
+        """
+        Spectrum of the first dataseries with x/y data arrays of a SciData
+        dict
+
+        Data arrays that already are float64 NumPy arrays (i.e. written by
+        `to_scidata`) are shared with the spectrum, JSON lists are parsed.
+
+        Args:
+            scidata_dict (dict): SciData JSON-LD dictionary
+            uuid (str): UUID of the dataset at the SSM Catalog API
+
+        Raises:
+            MissingSpectrumException: Raised when no x-axis / y-axis
+                parameters with data arrays are found
+
+        Returns:
+            spectrum (Spectrum): Spectrum referencing `scidata_dict`
+        """
+        location = _locate(scidata_dict)
+        x_parameter, y_parameter = _parameters(scidata_dict, location)
+        graph = scidata_dict.get("@graph", {})
+        metadata = {
+            key: graph[key] for key in ("title", "uid") if key in graph
+        }
+        if uuid is not None:
+            metadata["uuid"] = uuid
+        spectrum = cls(
+            x_parameter["dataarray"],
+            y_parameter["dataarray"],
+            x_units=x_parameter.get("units"),
+            y_units=y_parameter.get("units"),
+            x_quantity=x_parameter.get("quantity"),
+            y_quantity=y_parameter.get("quantity"),
+            metadata=metadata,
+            scidata=scidata_dict,
+        )
+        spectrum._location = location
+        return spectrum
+
+    @classmethod
+    def from_dataset(cls, dataset):
+        """
+        Spectrum of a DatasetContainer, see `from_scidata`
+        """
+        return cls.from_scidata(dataset.dataset, uuid=dataset.uuid)
+
+    def to_scidata(self, as_lists: bool = False) -> dict:
+        """
+        SciData dict of the spectrum
+
+        The x/y arrays are placed in the data arrays as is, without
+        copying. A spectrum read with `from_scidata` reuses its source
+        document: only the dicts and lists leading to the data arrays are
+        copied, so the rest of the document is shared and left untouched.
+
+        Args:
+            as_lists (bool): Store the data arrays as lists of floats,
+                i.e. to serialize the dict to JSON
+
+        Returns:
+            scidata_dict (dict): SciData JSON-LD dictionary
+        """
+        x, y = self.x, self.y
+        if as_lists:
+            x, y = x.tolist(), y.tolist()
+
+        if self.scidata is None or self._location is None:
+            graph = dict(self.metadata)
+            graph.pop("uuid", None)
+            graph["scidata"] = {
+                "dataset": {
+                    "dataseries": [
+                        {
+                            "@id": "dataseries/1/",
+                            "@type": "sdo:dataseries",
+                            "label": "Spectroscopy",
+                            "parameter": [
+                                _parameter(
+                                    _AXIS_X, x, self.x_units, self.x_quantity
+                                ),
+                                _parameter(
+                                    _AXIS_Y, y, self.y_units, self.y_quantity
+                                ),
+                            ],
+                        }
+                    ]
+                }
+            }
+            return {"@graph": graph}
+
+        i, j_x, j_y = self._location
+        output = dict(self.scidata)
+        graph = output["@graph"] = dict(output["@graph"])
+        scidata = graph["scidata"] = dict(graph["scidata"])
+        dataset = scidata["dataset"] = dict(scidata["dataset"])
+        dataseries = dataset["dataseries"] = list(dataset["dataseries"])
+        series = dataseries[i] = dict(dataseries[i])
+        parameters = series["parameter"] = list(series["parameter"])
+        axes = ((j_x, x, self.x_units), (j_y, y, self.y_units))
+        for j, values, units in axes:
+            parameter = parameters[j] = dict(parameters[j])
+            parameter["dataarray"] = values
+            if units is not None:
+                parameter["units"] = units
+        return output
@@ -0,0 +1,375 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator
+
+import numpy as np
+
+from ssm_client.containers import DatasetContainer
+from ssm_client.io import read
+from ssm_client.spectrum import Spectrum
+
+_COLUMNS = ["title", "uid", "uuid", "x_units", "y_units"]
+
+_NORMALIZE_MAX = "max"
+_NORMALIZE_L2 = "l2"
+_NORMALIZE_CHOICES = [_NORMALIZE_MAX, _NORMALIZE_L2]
+
+
+def _as_spectrum(spectrum) -> Spectrum:
+    """
+    Spectrum of a Spectrum, SciData dict, DatasetContainer or (x, y) tuple
+    """
+    if isinstance(spectrum, Spectrum):
+        return spectrum
+    if isinstance(spectrum, DatasetContainer):
+        return Spectrum.from_dataset(spectrum)
+    if isinstance(spectrum, dict):
+        return Spectrum.from_scidata(spectrum)
+    x, y = spectrum
+    return Spectrum(x, y)
+
+
+def _offsets(lengths: np.ndarray) -> np.ndarray:
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return offsets
+
+
+class SpectrumBatch:
+    def __init__(
+        self,
+        x: np.ndarray,
+        y: np.ndarray,
+        offsets: np.ndarray,
+        columns: Dict[str, np.ndarray] = None,
+    ):
+        """
+        Initialize a SpectrumBatch object
+
+        Columnar container for many spectra of any length: the x/y values
+        of all spectra are stored end to end in two flat buffers, and
+        spectrum `i` is `x[offsets[i]:offsets[i + 1]]`. Metadata is kept
+        as one array per field. Slicing, filtering and transforms work on
+        the buffers directly, without creating a Spectrum per spectrum.
+
+        Args:
+            x (np.ndarray): Flat x-axis values of all spectra
+            y (np.ndarray): Flat y-axis values of all spectra
+            offsets (np.ndarray): (n spectra + 1) start of each spectrum
+                in the buffers, ending with the buffer length
+            columns (Dict[str, np.ndarray]): Metadata of each spectrum by
+                field, i.e. "title", "uid", "uuid", "x_units", "y_units"
+
+        Raises:
+            ValueError: Raised when the buffers, offsets and columns do
+                not agree in length
+        """
+        self.x = np.asarray(x, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        if self.x.shape != self.y.shape or self.offsets[-1] != self.x.size:
+            raise ValueError("x, y and offsets do not agree in length")
+        self.columns = dict()
+        for name, values in (columns or dict()).items():
+            values = np.asarray(values, dtype=object)
+            if len(values) != len(self):
+                msg = "column: {name} does not match the number of spectra"
+                raise ValueError(msg.format(name=name))
+            self.columns[name] = values
+
+    @classmethod
+    def from_spectra(cls, spectra: Iterable):
+        """
+        Batch of spectra, concatenated once at the end
+
+        Args:
+            spectra (Iterable): Spectrum objects, SciData dicts,
+                DatasetContainers or (x, y) tuples
+
+        Returns:
+            batch (SpectrumBatch): New batch
+        """
+        xs, ys = [], []
+        columns = {name: [] for name in _COLUMNS}
+        for spectrum in spectra:
+            spectrum = _as_spectrum(spectrum)
+            xs.append(spectrum.x)
+            ys.append(spectrum.y)
+            for name in ("title", "uid", "uuid"):
+                columns[name].append(spectrum.metadata.get(name))
+            columns["x_units"].append(spectrum.x_units)
+            columns["y_units"].append(spectrum.y_units)
+
+        lengths = np.array([x.size for x in xs], dtype=np.int64)
+        x = np.concatenate(xs) if xs else np.empty(0)
+        y = np.concatenate(ys) if ys else np.empty(0)
+        return cls(x, y, _offsets(lengths), columns)
+
+    @classmethod
+    def from_files(
+        cls,
+        filenames: Iterable[str],
+        ioformat: str = None,
+        max_workers: int = 4,
+    ):
+        """
+        Batch of the spectra read from files, see `ssm_client.io.read`
+
+        Args:
+            filenames (Iterable[str]): Files to read
+            ioformat (str): File format of all of the files
+            max_workers (int): Number of files read concurrently
+
+        Returns:
+            batch (SpectrumBatch): New batch, in the order of `filenames`
+        """
+        def _read(filename):
+            return read(filename, ioformat=ioformat, as_spectrum=True)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return cls.from_spectra(executor.map(_read, filenames))
+
+    @classmethod
+    def from_datasets(
+        cls,
+        dataset_service,
+        uuids: Iterable[str] = None,
+        max_workers: int = 4,
+    ):
+        """
+        Batch of the spectra of datasets at SSM Catalog API
+
+        Args:
+            dataset_service (DatasetService): Service of the collection
+            uuids (Iterable[str]): Datasets to fetch, defaults to the
+                dataset listing of the collection
+            max_workers (int): Number of datasets fetched concurrently
+
+        Returns:
+            batch (SpectrumBatch): New batch, in the order of `uuids`
+        """
+        if uuids is None:
+            uuids = dataset_service.get_datasets()
+
+        def _get(uuid):
+            return dataset_service.get_by_uuid(uuid, as_spectrum=True)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return cls.from_spectra(executor.map(_get, uuids))
+
+    def __len__(self) -> int:
+        return self.offsets.size - 1
+
+    def __repr__(self) -> str:
+        return f"SpectrumBatch(n_spectra={len(self)}, n_points={self.x.size})"
+
+    @property
+    def lengths(self) -> np.ndarray:
+        """
+        Number of points of each spectrum
+        """
+        return np.diff(self.offsets)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Memory used by the value buffers and offsets
+        """
+        return self.x.nbytes + self.y.nbytes + self.offsets.nbytes
+
+    def segment_ids(self) -> np.ndarray:
+        """
+        Spectrum of every point in the buffers
+        """
+        return np.repeat(np.arange(len(self)), self.lengths)
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        Metadata field of every spectrum
+        """
+        return self.columns[name]
+
+    def with_column(self, name: str, values: Iterable):
+        """
+        Copy of the batch with a metadata column added or replaced,
+        sharing the value buffers
+
+        Args:
+            name (str): Metadata field
+            values (Iterable): Value for each spectrum
+
+        Returns:
+            batch (SpectrumBatch): New batch
+        """
+        columns = dict(self.columns)
+        columns[name] = np.asarray(list(values), dtype=object)
+        return SpectrumBatch(self.x, self.y, self.offsets, columns)
+
+    def spectrum(self, index: int) -> Spectrum:
+        """
+        Spectrum of one entry, viewing the value buffers
+        """
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("SpectrumBatch index out of range")
+        start, stop = self.offsets[index], self.offsets[index + 1]
+        values = {
+            name: values[index] for name, values in self.columns.items()
+        }
+        metadata = {
+            name: values[name]
+            for name in ("title", "uid", "uuid")
+            if values.get(name) is not None
+        }
+        return Spectrum(
+            self.x[start:stop],
+            self.y[start:stop],
+            x_units=values.get("x_units"),
+            y_units=values.get("y_units"),
+            metadata=metadata,
+        )
+
+    def __iter__(self) -> Iterator[Spectrum]:
+        for index in range(len(self)):
+            yield self.spectrum(index)
+
+    def __getitem__(self, key):
+        """
+        Spectrum for an int, batch for a slice, index array or mask
+
+        Contiguous slices share the value buffers, index arrays and masks
+        gather the selected spectra into new buffers.
+        """
+        if isinstance(key, (int, np.integer)):
+            return self.spectrum(int(key))
+        if isinstance(key, slice) and key.step in (None, 1):
+            start, stop, _ = key.indices(len(self))
+            stop = max(start, stop)
+            offsets = self.offsets[start:stop + 1]
+            first, last = offsets[0], offsets[-1]
+            columns = {
+                name: values[start:stop]
+                for name, values in self.columns.items()
+            }
+            return SpectrumBatch(
+                self.x[first:last],
+                self.y[first:last],
+                offsets - first,
+                columns,
+            )
+        return self.take(np.arange(len(self))[key])
+
+    def take(self, indices: Iterable[int]):
+        """
+        Batch of the spectra at `indices`, gathered into new buffers
+
+        Args:
+            indices (Iterable[int]): Spectra to keep, in order
+
+        Returns:
+            batch (SpectrumBatch): New batch
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        lengths = self.lengths[indices]
+        offsets = _offsets(lengths)
+        positions = np.repeat(self.offsets[indices] - offsets[:-1], lengths)
+        positions += np.arange(offsets[-1])
+        columns = {
+            name: values[indices] for name, values in self.columns.items()
+        }
+        return SpectrumBatch(
+            self.x[positions], self.y[positions], offsets, columns
+        )
+
+    def filter(self, mask: np.ndarray):
+        """
+        Batch of the spectra where a boolean mask is True
+        """
+        return self.take(np.flatnonzero(np.asarray(mask, dtype=bool)))
+
+    def reduce(self, ufunc: np.ufunc, values: np.ndarray = None, fill=0.0):
+        """
+        Per-spectrum reduction of the values with a ufunc, i.e.
+        `np.maximum` or `np.add`
+
+        Args:
+            ufunc (np.ufunc): Binary ufunc to reduce with
+            values (np.ndarray): Flat values to reduce. Default: y
+            fill: Result for empty spectra
+
+        Returns:
+            reduced (np.ndarray): One value per spectrum
+        """
+        values = self.y if values is None else values
+        lengths = self.lengths
+        nonempty = lengths > 0
+        reduced = np.full(len(self), fill, dtype=values.dtype)
+        if nonempty.any():
+            # Empty spectra are skipped, so consecutive starts still
+            # delimit exactly one spectrum each
+            starts = self.offsets[:-1][nonempty]
+            reduced[nonempty] = ufunc.reduceat(values, starts)
+        return reduced
+
+    def apply(self, func: Callable, axis: str = "y"):
+        """
+        Batch with an elementwise function applied to all values at once,
+        i.e. `np.log1p`, sharing the other buffer
+
+        Args:
+            func (Callable): Function of the flat values, keeping their
+                length
+            axis (str): Values to transform. Choices: ["x", "y"]
+
+        Returns:
+            batch (SpectrumBatch): New batch
+        """
+        x, y = self.x, self.y
+        if axis == "x":
+            x = func(x)
+        else:
+            y = func(y)
+        return SpectrumBatch(x, y, self.offsets, self.columns)
+
+    def normalize(self, method: str = _NORMALIZE_MAX):
+        """
+        Batch with every spectrum scaled to a unit maximum or L2 norm
+
+        Args:
+            method (str): Choice of normalization.
+                Default: "max" Choices: ["max", "l2"]
+
+        Returns:
+            batch (SpectrumBatch): New batch
+        """
+        if method not in _NORMALIZE_CHOICES:
+            raise ValueError(f"Unknown normalization: {method}")
+        if method == _NORMALIZE_MAX:
+            scales = self.reduce(np.maximum, np.abs(self.y))
+        else:
+            scales = np.sqrt(self.reduce(np.add, self.y * self.y))
+        scales[scales == 0] = 1.0
+        return self.apply(
+            lambda y: y / np.repeat(scales, self.lengths), axis="y"
+        )
+
+    def crop(self, start: float = None, stop: float = None):
+        """
+        Batch keeping the points of every spectrum with x in [start, stop]
+
+        Args:
+            start (float): Lowest x kept, default no lower bound
+            stop (float): Highest x kept, default no upper bound
+
+        Returns:
+            batch (SpectrumBatch): New batch
+        """
+        keep = np.ones(self.x.size, dtype=bool)
+        if start is not None:
+            keep &= self.x >= start
+        if stop is not None:
+            keep &= self.x <= stop
+        lengths = self.reduce(np.add, keep.astype(np.int64))
+        return SpectrumBatch(
+            self.x[keep], self.y[keep], _offsets(lengths), self.columns
+        )
@@ -0,0 +1,10 @@
+"""Local dataset stores for ssm-client."""
+
+from .directory import DirectoryStore
+from .sqlite import SQLiteStore, UnindexedFieldException
+
+__all__ = [
+    "DirectoryStore",
+    "SQLiteStore",
+    "UnindexedFieldException",
+]
@@ -0,0 +1,67 @@
+import json
+import os
+from typing import Iterator
+
+_SUFFIX = ".json"
+
+
+class DirectoryStore:
+    def __init__(self, path: str):
+        """
+        Initialize a DirectoryStore object
+
+        Local copy of datasets kept as one JSON file per dataset UUID in
+        a directory. Files are written to a temporary name first and
+        renamed, so an interrupted write never leaves a truncated dataset.
+
+        Args:
+            path (str): Directory of the store, created if missing
+        """
+        self.path = os.fspath(path)
+        os.makedirs(self.path, exist_ok=True)
+
+    def _filename(self, uuid: str) -> str:
+        return os.path.join(self.path, uuid + _SUFFIX)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.uuids())
+
+    def __contains__(self, uuid: str) -> bool:
+        return os.path.exists(self._filename(uuid))
+
+    def uuids(self) -> Iterator[str]:
+        """
+        UUIDs of the stored datasets
+        """
+        for name in sorted(os.listdir(self.path)):
+            if name.endswith(_SUFFIX):
+                yield name[: -len(_SUFFIX)]
+
+    def get(self, uuid: str) -> dict:
+        """
+        Stored dataset for given UUID, or None
+        """
+        try:
+            with open(self._filename(uuid), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def put(self, uuid: str, dataset: dict):
+        """
+        Store or overwrite the dataset for given UUID
+        """
+        filename = self._filename(uuid)
+        partial = f"{filename}.partial"
+        with open(partial, "w", encoding="utf-8") as f:
+            json.dump(dataset, f)
+        os.replace(partial, filename)
+
+    def delete(self, uuid: str):
+        """
+        Remove the dataset for given UUID, if stored
+        """
+        try:
+            os.remove(self._filename(uuid))
+        except FileNotFoundError:
+            pass
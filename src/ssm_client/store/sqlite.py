@@ -0,0 +1,462 @@
+import json
+import sqlite3
+import threading
+import warnings
+import zlib
+from typing import Dict, Iterable, Iterator, List
+
+import numpy as np
+
+from ssm_client.containers import DatasetContainer
+from ssm_client.digest import content_digest, json_default
+from ssm_client.io import read
+from ssm_client.metadata import facets_from_scidata, technique_from_scidata
+from ssm_client.spectrum import MissingSpectrumException, Spectrum
+
+_TECHNIQUE = "technique"
+
+# How a data array taken out of the stored document is restored from its
+# float64 blob: as floats, or as the decimal strings it was read as
+_KIND_NUMBER = "number"
+_KIND_STRING = "string"
+
+# Fast compression: documents are written far more often than re-read
+_COMPRESS_LEVEL = 1
+
+# Columns of the datasets table with a secondary index, by lookup field
+_INDEXED = {
+    "title": "title",
+    "uid": "uid",
+    "formula": "formula",
+    "technique": "technique",
+    "crystal system": "crystal_system",
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS datasets (
+    uuid TEXT PRIMARY KEY,
+    title TEXT COLLATE NOCASE,
+    uid TEXT,
+    formula TEXT,
+    technique TEXT COLLATE NOCASE,
+    crystal_system TEXT COLLATE NOCASE,
+    digest TEXT NOT NULL,
+    document BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS spectra (
+    uuid TEXT PRIMARY KEY,
+    x_units TEXT,
+    y_units TEXT,
+    x BLOB NOT NULL,
+    y BLOB NOT NULL,
+    series INTEGER NOT NULL,
+    x_parameter INTEGER NOT NULL,
+    y_parameter INTEGER NOT NULL,
+    x_kind TEXT,
+    y_kind TEXT
+);
+CREATE TABLE IF NOT EXISTS facets (
+    uuid TEXT NOT NULL,
+    field TEXT NOT NULL,
+    value TEXT NOT NULL,
+    key TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS datasets_title ON datasets (title);
+CREATE INDEX IF NOT EXISTS datasets_uid ON datasets (uid);
+CREATE INDEX IF NOT EXISTS datasets_formula ON datasets (formula);
+CREATE INDEX IF NOT EXISTS datasets_technique ON datasets (technique);
+CREATE INDEX IF NOT EXISTS datasets_crystal_system
+    ON datasets (crystal_system);
+CREATE INDEX IF NOT EXISTS facets_field_key ON facets (field, key);
+CREATE INDEX IF NOT EXISTS facets_uuid ON facets (uuid);
+"""
+
+
+class UnindexedFieldException(Exception):
+    """Raised when looking up datasets by a field without an index"""
+
+
+def _check_field(field: str):
+    if field not in _INDEXED:
+        msg = (
+            "field: {field} not supported\n"
+            "Supported lookup fields are {choices}"
+        )
+        msg = msg.format(field=field, choices=list(_INDEXED))
+        raise UnindexedFieldException(msg)
+
+
+def _key(value) -> str:
+    return str(value).casefold()
+
+
+def _array_kind(values, array: np.ndarray) -> str:
+    """
+    Kind of a data array that its float64 `array` restores exactly, or
+    None when it has to stay in the stored document
+    """
+    if isinstance(values, np.ndarray):
+        return _KIND_NUMBER if values.dtype == np.float64 else None
+    if all(type(value) is float for value in values):
+        return _KIND_NUMBER
+    if all(type(value) is str for value in values):
+        # Decimal strings, as read from JCAMP/RRUFF files, only when
+        # they are the shortest repr of their float
+        if list(map(repr, array.tolist())) == values:
+            return _KIND_STRING
+    return None
+
+
+def _restore_array(blob: bytes, kind: str) -> list:
+    values = np.frombuffer(blob, dtype=np.float64).tolist()
+    if kind == _KIND_STRING:
+        return list(map(repr, values))
+    return values
+
+
+def _parameter_list(document: dict, series: int) -> list:
+    scidata = document["@graph"]["scidata"]
+    return scidata["dataset"]["dataseries"][series]["parameter"]
+
+
+def _strip_arrays(dataset: dict, series: int, stripped: dict) -> dict:
+    """
+    Copy of a dataset with the data arrays of the `stripped` parameter
+    positions set to None, copying only the dicts and lists on the way
+    """
+    document = dict(dataset)
+    graph = document["@graph"] = dict(document["@graph"])
+    scidata = graph["scidata"] = dict(graph["scidata"])
+    data = scidata["dataset"] = dict(scidata["dataset"])
+    dataseries = data["dataseries"] = list(data["dataseries"])
+    entry = dataseries[series] = dict(dataseries[series])
+    parameters = entry["parameter"] = list(entry["parameter"])
+    for j in stripped:
+        parameters[j] = dict(parameters[j], dataarray=None)
+    return document
+
+
+class SQLiteStore:
+    def __init__(self, path: str = ":memory:"):
+        """
+        Initialize a SQLiteStore object
+
+        Embedded store of datasets backed by SQLite, answering lookups
+        and facet queries locally. Each dataset is kept as compressed
+        JSON next to indexed metadata columns (title, uid, formula,
+        technique, crystal system) and one row per facet value (see
+        `facets_from_scidata`). The x/y data arrays are kept as float64
+        blobs instead, so spectra load without parsing any JSON; they
+        are put back in the document by `get` (arrays that floats do not
+        restore exactly stay in the JSON).
+
+        The store has the `uuids`, `get`, `put` and `delete` methods of
+        a DirectoryStore, so it can back a SyncEngine mirror.
+
+        Args:
+            path (str): Database filename. Default: in memory
+        """
+        self.path = str(path)
+        self._connection = sqlite3.connect(
+            self.path, check_same_thread=False
+        )
+        self._lock = threading.RLock()
+        with self._lock, self._connection:
+            self._connection.executescript(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def _query(self, sql: str, parameters: Iterable = ()) -> List[tuple]:
+        with self._lock:
+            return self._connection.execute(sql, tuple(parameters)).fetchall()
+
+    def __len__(self) -> int:
+        return self._query("SELECT COUNT(*) FROM datasets")[0][0]
+
+    def __contains__(self, uuid: str) -> bool:
+        sql = "SELECT 1 FROM datasets WHERE uuid = ?"
+        return bool(self._query(sql, [uuid]))
+
+    def uuids(self) -> Iterator[str]:
+        """
+        UUIDs of the stored datasets
+        """
+        for (uuid,) in self._query("SELECT uuid FROM datasets ORDER BY uuid"):
+            yield uuid
+
+    def get(self, uuid: str) -> dict:
+        """
+        Stored dataset for given UUID, or None
+        """
+        sql = (
+            "SELECT d.document, s.series, s.x_parameter, s.y_parameter, "
+            "s.x_kind, s.y_kind, s.x, s.y "
+            "FROM datasets d LEFT JOIN spectra s USING (uuid) WHERE uuid = ?"
+        )
+        rows = self._query(sql, [uuid])
+        if not rows:
+            return None
+        document, series, j_x, j_y, x_kind, y_kind, x, y = rows[0]
+        document = json.loads(zlib.decompress(document))
+        if series is None:
+            return document
+        parameters = _parameter_list(document, series)
+        for j, kind, blob in ((j_x, x_kind, x), (j_y, y_kind, y)):
+            if kind is not None:
+                parameters[j]["dataarray"] = _restore_array(blob, kind)
+        return document
+
+    def _put(self, cursor: sqlite3.Cursor, uuid: str, dataset: dict):
+        facets = facets_from_scidata(dataset)
+        technique = technique_from_scidata(dataset)
+        if technique is not None:
+            facets.setdefault(_TECHNIQUE, []).append(technique)
+        graph = dataset.get("@graph", {})
+
+        def _first(field):
+            return facets.get(field, [None])[0]
+
+        try:
+            spectrum = Spectrum.from_scidata(dataset)
+        except (MissingSpectrumException, ValueError):
+            spectrum = None
+
+        # The x/y arrays live in the spectra blobs, not in the document
+        document = dataset
+        kinds = (None, None)
+        if spectrum is not None:
+            series, j_x, j_y = spectrum._location
+            parameters = _parameter_list(dataset, series)
+            kinds = (
+                _array_kind(parameters[j_x]["dataarray"], spectrum.x),
+                _array_kind(parameters[j_y]["dataarray"], spectrum.y),
+            )
+            stripped = [j for j, kind in zip((j_x, j_y), kinds) if kind]
+            if stripped:
+                document = _strip_arrays(dataset, series, stripped)
+
+        # Remaining NumPy arrays are written out as lists
+        encoded = json.dumps(
+            document,
+            sort_keys=True,
+            separators=(",", ":"),
+            ensure_ascii=False,
+            default=json_default,
+        ).encode("utf-8")
+        document = zlib.compress(encoded, _COMPRESS_LEVEL)
+        cursor.execute(
+            "INSERT OR REPLACE INTO datasets VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                uuid,
+                graph.get("title"),
+                graph.get("uid"),
+                _first("formula"),
+                technique,
+                _first("crystal system"),
+                content_digest(dataset),
+                document,
+            ),
+        )
+
+        cursor.execute("DELETE FROM facets WHERE uuid = ?", (uuid,))
+        cursor.executemany(
+            "INSERT INTO facets VALUES (?, ?, ?, ?)",
+            [
+                (uuid, field, value, _key(value))
+                for field, values in facets.items()
+                for value in values
+            ],
+        )
+
+        cursor.execute("DELETE FROM spectra WHERE uuid = ?", (uuid,))
+        if spectrum is None:
+            return
+        cursor.execute(
+            "INSERT INTO spectra VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                uuid,
+                spectrum.x_units,
+                spectrum.y_units,
+                spectrum.x.tobytes(),
+                spectrum.y.tobytes(),
+            )
+            + spectrum._location
+            + kinds,
+        )
+
+    def put(self, uuid: str, dataset: dict):
+        """
+        Store or overwrite the dataset for given UUID
+        """
+        self.put_many([(uuid, dataset)])
+
+    def put_many(self, items: Iterable[tuple]):
+        """
+        Store or overwrite many datasets in one transaction
+
+        Args:
+            items (Iterable[tuple]): (UUID, SciData dict) of each dataset
+        """
+        with self._lock, self._connection:
+            cursor = self._connection.cursor()
+            for uuid, dataset in items:
+                self._put(cursor, uuid, dataset)
+
+    def delete(self, uuid: str):
+        """
+        Remove the dataset for given UUID, if stored
+        """
+        with self._lock, self._connection:
+            for table in ("datasets", "spectra", "facets"):
+                self._connection.execute(
+                    f"DELETE FROM {table} WHERE uuid = ?", (uuid,)
+                )
+
+    def ingest(self, datasets: Iterable):
+        """
+        Store DatasetContainers, keyed by UUID, or SciData dicts, keyed by
+        their uid; datasets without a UUID or uid are skipped with a
+        warning
+
+        Args:
+            datasets (Iterable): DatasetContainers or SciData dicts
+        """
+        def _items():
+            for dataset in datasets:
+                if isinstance(dataset, DatasetContainer):
+                    key, dataset = dataset.uuid, dataset.dataset
+                else:
+                    key = dataset.get("@graph", {}).get("uid")
+                if key is None:
+                    msg = "Skipping dataset without a UUID or uid"
+                    warnings.warn(msg)
+                    continue
+                yield key, dataset
+
+        self.put_many(_items())
+
+    def ingest_files(self, filenames: Iterable[str], ioformat: str = None):
+        """
+        Store the SciData dicts read from files, see `ssm_client.io.read`
+        """
+        self.ingest(read(name, ioformat=ioformat) for name in filenames)
+
+    def ingest_service(self, dataset_service, uuids: Iterable[str] = None):
+        """
+        Store datasets fetched from SSM Catalog API
+
+        Args:
+            dataset_service (DatasetService): Service of the collection
+            uuids (Iterable[str]): Datasets to fetch, defaults to the
+                dataset listing of the collection
+        """
+        if uuids is None:
+            uuids = dataset_service.get_datasets()
+        self.ingest(dataset_service.get_by_uuid(uuid) for uuid in uuids)
+
+    def lookup(self, field: str, value: str) -> List[str]:
+        """
+        UUIDs of the datasets with `value` for an indexed field,
+        case insensitive except for uid and formula
+
+        Args:
+            field (str): Choice of field. Choices: ["title", "uid",
+                "formula", "technique", "crystal system"]
+            value (str): Value of the field
+
+        Raises:
+            UnindexedFieldException: Raised when the field has no index
+
+        Returns:
+            uuids (List[str]): Matching datasets
+        """
+        _check_field(field)
+        column = _INDEXED[field]
+        sql = f"SELECT uuid FROM datasets WHERE {column} = ? ORDER BY uuid"
+        return [uuid for (uuid,) in self._query(sql, [value])]
+
+    def metadata(self, uuid: str) -> dict:
+        """
+        Indexed metadata and digest of the dataset for given UUID, or None
+        """
+        columns = ["uuid"] + list(_INDEXED.values()) + ["digest"]
+        sql = "SELECT {columns} FROM datasets WHERE uuid = ?".format(
+            columns=", ".join(columns)
+        )
+        rows = self._query(sql, [uuid])
+        if not rows:
+            return None
+        fields = ["uuid"] + list(_INDEXED) + ["digest"]
+        return dict(zip(fields, rows[0]))
+
+    def facets(self, uuid: str) -> Dict[str, List[str]]:
+        """
+        Facet values of the dataset for given UUID
+        """
+        facets = dict()
+        sql = "SELECT field, value FROM facets WHERE uuid = ? ORDER BY rowid"
+        for field, value in self._query(sql, [uuid]):
+            facets.setdefault(field, []).append(value)
+        return facets
+
+    def facet_counts(self, field: str) -> Dict[str, int]:
+        """
+        Number of datasets with each value of a facet field
+        """
+        sql = (
+            "SELECT MIN(value), COUNT(DISTINCT uuid) FROM facets "
+            "WHERE field = ? GROUP BY key ORDER BY key"
+        )
+        return dict(self._query(sql, [field]))
+
+    def find(self, **facets: str) -> List[str]:
+        """
+        UUIDs of the datasets with all of the given facet values (case
+        insensitive), i.e. `find(formula="UO2", atoms="H2O")`; facet
+        fields with spaces are passed as a dict, i.e.
+        `find(**{"crystal system": "tetragonal"})`
+
+        Returns:
+            uuids (List[str]): Matching datasets
+        """
+        if not facets:
+            return list(self.uuids())
+        clauses = " INTERSECT ".join(
+            ["SELECT uuid FROM facets WHERE field = ? AND key = ?"]
+            * len(facets)
+        )
+        parameters = []
+        for field, value in facets.items():
+            parameters += [field, _key(value)]
+        sql = f"SELECT uuid FROM ({clauses}) ORDER BY uuid"
+        return [uuid for (uuid,) in self._query(sql, parameters)]
+
+    def get_spectrum(self, uuid: str) -> Spectrum:
+        """
+        Spectrum of the dataset for given UUID from the stored blobs, or
+        None when the dataset has no x/y data arrays
+        """
+        sql = (
+            "SELECT s.x, s.y, s.x_units, s.y_units, d.title, d.uid "
+            "FROM spectra s JOIN datasets d USING (uuid) WHERE uuid = ?"
+        )
+        rows = self._query(sql, [uuid])
+        if not rows:
+            return None
+        x, y, x_units, y_units, title, uid = rows[0]
+        metadata = {"title": title, "uid": uid, "uuid": uuid}
+        return Spectrum(
+            np.frombuffer(x, dtype=np.float64),
+            np.frombuffer(y, dtype=np.float64),
+            x_units=x_units,
+            y_units=y_units,
+            metadata=metadata,
+        )
@@ -0,0 +1,190 @@
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import List, NamedTuple
+
+import requests
+
+_FORMAT_VERSION = 1
+
+# Fetch result of a dataset deleted after the listing was read
+_GONE = object()
+
+
+class SyncResult(NamedTuple):
+    """
+    UUIDs of the datasets transferred by one `SyncEngine.sync`
+
+    Attributes:
+        created (List[str]): Datasets new to the mirror
+        updated (List[str]): Datasets modified since the last sync
+        deleted (List[str]): Datasets removed from the collection
+        unchanged (List[str]): Datasets already up to date
+    """
+
+    created: List[str]
+    updated: List[str]
+    deleted: List[str]
+    unchanged: List[str]
+
+
+class SyncEngine:
+    def __init__(
+        self,
+        dataset_service,
+        store,
+        checkpoint: str = None,
+        max_workers: int = 8,
+        checkpoint_every: int = 100,
+    ):
+        """
+        Initialize a SyncEngine object
+
+        Keeps a local mirror of the datasets of a collection up to date,
+        transferring only the datasets created, modified or deleted since
+        the last sync. Creations and deletions come from the dataset
+        listing; modifications from conditional GETs with the ETag of the
+        mirrored copy, so unchanged datasets are answered with an empty
+        304. Without server ETags, fetched datasets are compared by
+        content digest and only changed ones are written. Only datasets
+        the engine mirrored itself are ever deleted from the store.
+
+        The ETag and digest of every mirrored dataset are saved to the
+        `checkpoint` file as the sync progresses, so an interrupted sync
+        resumes without transferring the finished datasets again.
+
+        Args:
+            dataset_service (DatasetService): Service of the collection
+            store: Local store with `__contains__`, `put` and `delete`
+                methods, i.e. a DirectoryStore
+            checkpoint (str): Filename of the checkpoint, kept in memory
+                only if None
+            max_workers (int): Number of datasets fetched concurrently
+            checkpoint_every (int): Datasets between checkpoint saves
+        """
+        self.dataset_service = dataset_service
+        self.store = store
+        self.checkpoint = checkpoint
+        self.max_workers = max_workers
+        self.checkpoint_every = checkpoint_every
+        self.entries = self._load_checkpoint()
+
+    def _load_checkpoint(self) -> dict:
+        if not self.checkpoint or not os.path.exists(self.checkpoint):
+            return dict()
+        with open(self.checkpoint, encoding="utf-8") as f:
+            return json.load(f)["entries"]
+
+    def save_checkpoint(self):
+        """
+        Atomically write the ETag and digest of every mirrored dataset
+        """
+        if not self.checkpoint:
+            return
+        partial = f"{self.checkpoint}.partial"
+        with open(partial, "w", encoding="utf-8") as f:
+            json.dump({"version": _FORMAT_VERSION, "entries": self.entries}, f)
+        os.replace(partial, self.checkpoint)
+
+    def _fetch(self, uuid: str, etag: str, held: bool) -> tuple:
+        try:
+            dataset, etag = self.dataset_service.get_by_uuid_if_modified(
+                uuid, etag
+            )
+        except requests.HTTPError as error:
+            # Deleted between the listing and the fetch
+            if getattr(error.response, "status_code", None) != 404:
+                raise
+            dataset, etag = _GONE, None
+        return uuid, dataset, etag, held
+
+    def _remove(self, uuid: str, result: SyncResult):
+        """
+        Delete a mirrored dataset that left the collection
+        """
+        if uuid not in self.entries:
+            return
+        self.store.delete(uuid)
+        del self.entries[uuid]
+        result.deleted.append(uuid)
+
+    def _apply(self, fetched: tuple, result: SyncResult):
+        """
+        Write a fetched dataset to the store if it changed
+        """
+        uuid, dataset, etag, held = fetched
+        if dataset is _GONE:
+            self._remove(uuid, result)
+            return
+        entry = self.entries.get(uuid)
+        if dataset is None:
+            result.unchanged.append(uuid)
+            return
+        digest = dataset.digest
+        if held and entry is not None and entry["digest"] == digest:
+            result.unchanged.append(uuid)
+        else:
+            self.store.put(uuid, dataset.dataset)
+            changes = result.created if entry is None else result.updated
+            changes.append(uuid)
+        self.entries[uuid] = {"etag": etag, "digest": digest}
+
+    def _drain(self, futures, result: SyncResult, completed: int) -> int:
+        """
+        Apply every successful fetch, then raise the first failure, so
+        finished datasets are checkpointed even when one fails
+        """
+        error = None
+        for future in futures:
+            if future.exception() is not None:
+                error = error or future.exception()
+                continue
+            self._apply(future.result(), result)
+            completed += 1
+            if completed % self.checkpoint_every == 0:
+                self.save_checkpoint()
+        if error is not None:
+            raise error
+        return completed
+
+    def sync(self) -> SyncResult:
+        """
+        Bring the store up to date with the collection
+
+        Raises:
+            requests.HTTPError: Raised when the listing or a dataset
+                cannot be fetched; finished datasets are checkpointed
+
+        Returns:
+            result (SyncResult): Datasets transferred, by kind of change
+        """
+        result = SyncResult([], [], [], [])
+        listing = self.dataset_service.get_datasets()
+        listed = set(listing)
+
+        for uuid in sorted(set(self.entries) - listed):
+            self._remove(uuid, result)
+
+        in_flight = 2 * self.max_workers
+        completed = 0
+        pending = set()
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                for uuid in listing:
+                    if len(pending) >= in_flight:
+                        done, pending = wait(
+                            pending, return_when=FIRST_COMPLETED
+                        )
+                        completed = self._drain(done, result, completed)
+
+                    entry = self.entries.get(uuid)
+                    held = entry is not None and uuid in self.store
+                    etag = entry["etag"] if held else None
+                    pending.add(
+                        executor.submit(self._fetch, uuid, etag, held)
+                    )
+
+                self._drain(wait(pending).done, result, completed)
+        finally:
+            self.save_checkpoint()
+        return result
@@ -4,6 +4,7 @@ import pytest
 
 
 from . import TEST_DATA_DIR
+from .mock_server import MockSSMServer
 
 
 @pytest.fixture
@@ -143,3 +144,31 @@ def metazeunerite_ssm_json():
     """
     p = pathlib.Path(TEST_DATA_DIR, "ssm_json", "metazeunerite.json")
     return json.loads(p.read_text())
+
+
+@pytest.fixture
+def mock_server():
+    """
+    In-process mock SSM Catalog API server listening on a free local port
+    """
+    with MockSSMServer() as server:
+        yield server
+
+
+@pytest.fixture
+def mock_server_factory():
+    """
+    Factory for mock SSM Catalog API servers with custom latency,
+    error injection and throughput limits
+    """
+    servers = []
+
+    def _factory(**kwargs):
+        server = MockSSMServer(**kwargs)
+        server.start()
+        servers.append(server)
+        return server
+
+    yield _factory
+    for server in servers:
+        server.stop()
@@ -0,0 +1,374 @@
+"""
+In-process stand-in for the SSM Catalog API used for offline testing and
+benchmarking.
+
+Implements the routes used by the ssm-client services:
+
+    /collections
+    /collections/{title}
+    /collections/{title}/datasets
+    /collections/{title}/datasets/{uuid}
+
+Successful GET responses carry an ETag and honour If-None-Match with
+304 Not Modified, like a caching proxy in front of the API.
+
+Unlike `requests-mock`, requests go through the real network stack
+(sockets, HTTP parsing, threads), so connection pooling, retries,
+concurrency and caching can be measured realistically on a laptop.
+"""
+
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid as uuid_lib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+_COLLECTIONS = "collections"
+_DATASETS = "datasets"
+
+
+def _new_uuid() -> str:
+    """
+    Create a 64-character UUID like the ones the SSM Catalog API returns
+    """
+    return hashlib.sha256(uuid_lib.uuid4().bytes).hexdigest().upper()
+
+
+def _merge(target: dict, patch: dict) -> dict:
+    """
+    Recursively merge a partial dataset into an existing one (PATCH),
+    null values remove keys
+    """
+    for key, value in patch.items():
+        if value is None:
+            target.pop(key, None)
+        elif isinstance(value, dict) and isinstance(target.get(key), dict):
+            _merge(target[key], value)
+        else:
+            target[key] = value
+    return target
+
+
+def _etag(payload) -> str:
+    """
+    Strong ETag of a response payload
+    """
+    data = json.dumps(payload, sort_keys=True).encode("utf-8")
+    return '"{digest}"'.format(digest=hashlib.sha256(data).hexdigest())
+
+
+class _TokenBucket:
+    def __init__(self, rate: float):
+        """
+        Simple token bucket used to limit the server throughput
+
+        Args:
+            rate (float): Maximum number of requests per second
+        """
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Block until a token is available
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                elapsed = now - self.updated
+                self.tokens = min(self.rate, self.tokens + elapsed * self.rate)
+                self.updated = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                wait = (1.0 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        """
+        Silence the default request logging to stderr
+        """
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def do_PATCH(self):
+        self._dispatch("PATCH")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def _dispatch(self, method: str):
+        mock = self.server.mock
+        url = urlparse(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        parts = [unquote(p) for p in url.path.split("/") if p]
+        prefix = mock.path_prefix
+        if parts[: len(prefix)] != prefix:
+            return self._send(404, {"error": "Not Found"})
+        parts = parts[len(prefix):]
+
+        body = None
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            try:
+                body = json.loads(self.rfile.read(length))
+            except ValueError:
+                return self._send(400, {"error": "Invalid JSON body"})
+
+        status, payload = mock._handle(method, parts, params, body)
+        etag = None
+        if method == "GET" and status == 200:
+            etag = _etag(payload)
+            if self.headers.get("If-None-Match") == etag:
+                status, payload = 304, None
+        self._send(status, payload, etag)
+
+    def _send(self, status: int, payload=None, etag: str = None):
+        data = b""
+        if payload is not None:
+            data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        if etag:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class MockSSMServer:
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        path_prefix: str = "",
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        max_requests_per_second: float = None,
+        seed: int = None,
+    ):
+        """
+        Initialize a MockSSMServer object
+
+        Args:
+            host (str): Interface to bind the server to
+            port (int): Port to bind, 0 picks a free port
+            path_prefix (str): Path the API is mounted under (i.e. "api")
+            latency (float): Seconds to wait before answering each request
+            jitter (float): Extra uniformly-distributed random seconds of
+                latency added to each request
+            error_rate (float): Fraction [0, 1] of requests that fail
+                with `error_status`
+            error_status (int): HTTP status code used for injected errors
+            max_requests_per_second (float): Throughput limit for the
+                server, unlimited if None
+            seed (int): Seed for the latency jitter and error injection
+        """
+        self.host = host
+        self.port = port
+        self.path_prefix = [p for p in path_prefix.split("/") if p]
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.max_requests_per_second = max_requests_per_second
+
+        self.collections = dict()
+        self.request_count = 0
+        self.error_count = 0
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._fail_next = []
+        self._bucket = None
+        if max_requests_per_second:
+            self._bucket = _TokenBucket(max_requests_per_second)
+        self._httpd = None
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    @property
+    def base_url(self) -> str:
+        """
+        Base URL to pass as the `hostname` of the ssm-client services
+        """
+        url = f"http://{self.host}:{self.port}"
+        if self.path_prefix:
+            url += "/" + "/".join(self.path_prefix)
+        return url
+
+    def start(self):
+        """
+        Start serving requests from a background thread
+        """
+        self._httpd = ThreadingHTTPServer((self.host, self.port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.mock = self
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever,
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop the server and wait for the background thread to exit
+        """
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._thread.join()
+        self._httpd = None
+        self._thread = None
+
+    def fail_next(self, count: int = 1, status: int = None):
+        """
+        Deterministically fail the next `count` requests
+
+        Args:
+            count (int): Number of requests to fail
+            status (int): HTTP status code to fail with,
+                defaults to `error_status`
+        """
+        status = status or self.error_status
+        with self._lock:
+            self._fail_next.extend([status] * count)
+
+    def reset(self):
+        """
+        Remove all stored collections and reset the request counters
+        """
+        with self._lock:
+            self.collections.clear()
+            self.request_count = 0
+            self.error_count = 0
+            self._fail_next.clear()
+
+    def _injected_error(self):
+        with self._lock:
+            self.request_count += 1
+            if self._fail_next:
+                self.error_count += 1
+                return self._fail_next.pop(0)
+            if self.error_rate and self._random.random() < self.error_rate:
+                self.error_count += 1
+                return self.error_status
+            delay = self.latency
+            if self.jitter:
+                delay += self._random.uniform(0.0, self.jitter)
+        if delay:
+            time.sleep(delay)
+        return None
+
+    def _handle(self, method, parts, params, body):
+        if self._bucket:
+            self._bucket.acquire()
+
+        status = self._injected_error()
+        if status:
+            return status, {"error": "Injected error"}
+
+        if not parts or parts[0] != _COLLECTIONS:
+            return 404, {"error": "Not Found"}
+
+        with self._lock:
+            if len(parts) == 1:
+                return self._collections(method, body)
+            if len(parts) == 2:
+                return self._collection(method, parts[1])
+            if len(parts) in (3, 4) and parts[2] == _DATASETS:
+                collection = self.collections.get(parts[1])
+                if collection is None:
+                    return 404, {"error": "Collection not found"}
+                if len(parts) == 3:
+                    return self._datasets(method, collection, params, body)
+                uuid = parts[3]
+                return self._dataset(method, collection, uuid, params, body)
+        return 404, {"error": "Not Found"}
+
+    def _collections(self, method, body):
+        if method == "GET":
+            return 200, list(self.collections)
+        if method == "POST":
+            body = {} if body is None else body
+            title = body.get("title") if isinstance(body, dict) else None
+            if not isinstance(title, str) or not title:
+                return 400, {"error": "Collection title required"}
+            title = title.lower()
+            if title in self.collections:
+                return 409, {"error": "Collection already exists"}
+            self.collections[title] = {
+                "uri": f"{self.base_url}/{_COLLECTIONS}/{title}",
+                "datasets": dict(),
+            }
+            return 201, {"title": title, "uri": self.collections[title]["uri"]}
+        return 405, {"error": "Method Not Allowed"}
+
+    def _collection(self, method, title):
+        collection = self.collections.get(title)
+        if collection is None:
+            return 404, {"error": "Collection not found"}
+        if method == "GET":
+            return 200, {"title": title, "uri": collection["uri"]}
+        if method == "DELETE":
+            self.collections.pop(title)
+            return 204, None
+        return 405, {"error": "Method Not Allowed"}
+
+    def _datasets(self, method, collection, params, body):
+        if method == "GET":
+            uuids = list(collection["datasets"])
+            if "pageSize" in params:
+                size = int(params["pageSize"])
+                start = int(params.get("pageNumber", 0)) * size
+                uuids = uuids[start:start + size]
+            return 200, uuids
+        if method == "POST":
+            uuid = _new_uuid()
+            collection["datasets"][uuid] = body
+            return 201, {"uuid": uuid, "dataset": body}
+        return 405, {"error": "Method Not Allowed"}
+
+    def _dataset(self, method, collection, uuid, params, body):
+        datasets = collection["datasets"]
+        if uuid not in datasets:
+            return 404, {"error": "Dataset not found"}
+        if method == "GET":
+            if params.get("format") == "json":
+                return 200, datasets[uuid]
+            return 200, {"uuid": uuid, "dataset": datasets[uuid]}
+        if method == "PUT":
+            datasets[uuid] = body
+            return 200, {"uuid": uuid, "dataset": body}
+        if method == "PATCH":
+            datasets[uuid] = _merge(datasets[uuid], body)
+            return 200, {"uuid": uuid, "dataset": datasets[uuid]}
+        if method == "DELETE":
+            datasets.pop(uuid)
+            return 204, None
+        return 405, {"error": "Method Not Allowed"}
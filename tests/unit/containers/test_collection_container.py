@@ -4,6 +4,8 @@
 
 import json
 
+import pytest
+
 from ssm_client.containers import CollectionContainer
 
 
@@ -70,3 +72,14 @@ def test_collections_not_equal():
     a = CollectionContainer()
     b = CollectionContainer(title="title", uri="uri")
     assert a != b
+
+
+def test_collections_hashable():
+    """Test collections are usable as set members and dict keys"""
+    a = CollectionContainer(title="title", uri="uri")
+    b = CollectionContainer(title="title", uri="uri")
+    c = CollectionContainer(title="other", uri="uri")
+    assert len({a, b, c}) == 2
+    assert {a: 1}[b] == 1
+    with pytest.raises(AttributeError):
+        a.title = "foo"
@@ -2,7 +2,10 @@
 
 """Tests for DatasetContainer."""
 
+import copy
 import json
+import pickle
+
 import pytest
 
 from ssm_client.containers import DatasetContainer
@@ -87,3 +90,54 @@ def test_datasets_not_equal(dataset):
     a = DatasetContainer()
     b = DatasetContainer(uuid="uuid", dataset=dataset)
     assert a != b
+
+
+def test_datasets_hashable(dataset):
+    """Test datasets with the same content are one set member / dict key"""
+    reordered = dict(reversed(list(dataset.items())))
+    a = DatasetContainer(uuid="uuid", dataset=dataset)
+    b = DatasetContainer(uuid="uuid", dataset=reordered)
+    c = DatasetContainer(uuid="other", dataset=dataset)
+    assert a.digest == b.digest == c.digest
+    assert len({a, b, c}) == 2
+    assert {a: 1}[b] == 1
+
+    changed = dict(dataset, name="Yoko Ono")
+    assert a != DatasetContainer(uuid="uuid", dataset=changed)
+    assert a != "uuid"
+
+
+def test_dataset_modified_in_place(dataset):
+    """Test equality follows a dataset modified after comparison"""
+    a = DatasetContainer(uuid="uuid", dataset=dataset)
+    b = DatasetContainer(uuid="uuid", dataset=copy.deepcopy(dataset))
+    members = {a}
+    assert a == b
+    digest = a.digest
+
+    dataset["name"] = "Yoko Ono"
+    assert a.digest != digest
+    assert a != b
+    assert a in members
+
+    # JSON types are part of the content
+    assert DatasetContainer(dataset={"x": 1}) != DatasetContainer(
+        dataset={"x": 1.0}
+    )
+
+
+def test_dataset_immutable(dataset):
+    """Test containers are slotted and cannot be modified"""
+    a = DatasetContainer(uuid="uuid", dataset=dataset)
+    assert not hasattr(a, "__dict__")
+    with pytest.raises(AttributeError):
+        a.uuid = "foo"
+    with pytest.raises(AttributeError):
+        a.foo = "foo"
+
+
+def test_dataset_copy(dataset):
+    """Test containers survive pickling and copying"""
+    a = DatasetContainer(uuid="uuid", dataset=dataset)
+    assert pickle.loads(pickle.dumps(a)) == a
+    assert copy.deepcopy(a) == a
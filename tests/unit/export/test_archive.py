@@ -0,0 +1,121 @@
+"""Tests for export.archive"""
+
+import copy
+import zipfile
+
+import numpy as np
+import pytest
+
+from ssm_client import SSMRester
+from ssm_client.containers import DatasetContainer
+from ssm_client.export import (
+    UnsupportedCompressionException,
+    export_archive,
+    import_archive,
+    read_archive,
+    read_archive_index,
+    write_archive,
+)
+
+
+@pytest.fixture
+def ssm_rester(mock_server):
+    rester = SSMRester(hostname=mock_server.base_url)
+    collection = rester.collection.create("archive")
+    rester.initialize_dataset_for_collection(collection)
+    return rester
+
+
+def test_write_read_archive(tmp_path, metazeunerite_jsonld):
+    filename = tmp_path / "snapshot.zip"
+    original = copy.deepcopy(metazeunerite_jsonld)
+    numbers = {
+        "@graph": {
+            "title": "numbers",
+            "scidata": {"dataarray": [1, 2, 3], "other": [{"dataarray": []}]},
+        }
+    }
+    documents = [
+        DatasetContainer(uuid="A", dataset=metazeunerite_jsonld),
+        numbers,
+    ]
+    assert write_archive(filename, iter(documents), collection="c") == 2
+    assert metazeunerite_jsonld == original
+
+    with zipfile.ZipFile(filename) as archive:
+        names = archive.namelist()
+    assert "datasets/00000000/0.txt" in names
+    assert "datasets/00000001/0.npy" in names
+
+    index = read_archive_index(filename)
+    assert index["collection"] == "c"
+    entry = index["datasets"][0]
+    assert entry["uuid"] == "A"
+    assert entry["uid"] == "rruff:R050524"
+    assert entry["digest"] == documents[0].digest
+    assert len(entry["arrays"]) == 2
+
+    datasets = list(read_archive(filename))
+    assert datasets[0] == documents[0]
+    assert datasets[1].uuid is None
+    assert datasets[1].dataset == numbers
+
+
+def test_numpy_arrays(tmp_path):
+    document = {"@graph": {"dataarray": np.linspace(0.0, 1.0, 5)}}
+    write_archive(tmp_path / "snapshot.zip", [document])
+    (dataset,) = read_archive(tmp_path / "snapshot.zip")
+    assert dataset.dataset["@graph"]["dataarray"] == [
+        0.0, 0.25, 0.5, 0.75, 1.0
+    ]
+
+
+def test_arrays_left_in_document(tmp_path):
+    """Test arrays that are not packed are written out as lists"""
+    document = {
+        "@graph": {
+            "dataarray": np.array([True, False]),
+            "values": np.arange(3),
+            "peak": np.float32(1.5),
+        }
+    }
+    write_archive(tmp_path / "snapshot.zip", [document])
+    (dataset,) = read_archive(tmp_path / "snapshot.zip")
+    assert dataset.dataset["@graph"] == {
+        "dataarray": [True, False], "values": [0, 1, 2], "peak": 1.5
+    }
+
+
+def test_compression(tmp_path, metazeunerite_jsonld):
+    with pytest.raises(UnsupportedCompressionException):
+        write_archive(tmp_path / "snapshot.zip", [], compression="zstd")
+
+    stored = tmp_path / "stored.zip"
+    deflated = tmp_path / "deflated.zip"
+    write_archive(stored, [metazeunerite_jsonld])
+    write_archive(deflated, [metazeunerite_jsonld], compression="deflate")
+    assert deflated.stat().st_size < stored.stat().st_size
+    (dataset,) = read_archive(deflated)
+    assert dataset.dataset == metazeunerite_jsonld
+
+
+def test_export_import_archive(tmp_path, ssm_rester, metazeunerite_jsonld):
+    for i in range(5):
+        dataset = dict(metazeunerite_jsonld)
+        dataset["@graph"] = dict(dataset["@graph"], title=f"dataset {i}")
+        ssm_rester.dataset.create(dataset)
+
+    filename = tmp_path / "snapshot.zip"
+    assert export_archive(filename, ssm_rester.dataset, lookahead=2) == 5
+    index = read_archive_index(filename)
+    assert index["collection"] == "archive"
+    uuids = [entry["uuid"] for entry in index["datasets"]]
+    assert uuids == sorted(ssm_rester.dataset.get_datasets())
+
+    collection = ssm_rester.collection.create("restored")
+    ssm_rester.initialize_dataset_for_collection(collection)
+    created = import_archive(filename, ssm_rester.dataset, max_workers=2)
+    assert sorted(created) == sorted(ssm_rester.dataset.get_datasets())
+    restored = [ssm_rester.dataset.get_by_uuid(uuid) for uuid in created]
+    digests = [dataset.digest for dataset in restored]
+    assert digests == [entry["digest"] for entry in index["datasets"]]
@@ -0,0 +1,90 @@
+"""Tests for export.ndjson"""
+
+import numpy as np
+import pytest
+
+from ssm_client import SSMRester, Spectrum
+from ssm_client.containers import DatasetContainer
+from ssm_client.export import (
+    UnsupportedCompressionException,
+    export_ndjson,
+    import_ndjson,
+    read_ndjson,
+    write_ndjson,
+)
+
+
+@pytest.fixture
+def ssm_rester(mock_server):
+    rester = SSMRester(hostname=mock_server.base_url)
+    collection = rester.collection.create("ndjson")
+    rester.initialize_dataset_for_collection(collection)
+    return rester
+
+
+def test_write_read_ndjson(tmp_path, metazeunerite_jsonld):
+    filename = tmp_path / "datasets.ndjson"
+    documents = [
+        DatasetContainer(uuid="A", dataset=metazeunerite_jsonld),
+        {"@graph": {"title": "Soddyite · UO2"}},
+    ]
+    assert write_ndjson(filename, iter(documents)) == 2
+    assert len(filename.read_text(encoding="utf-8").splitlines()) == 2
+
+    datasets = list(read_ndjson(filename))
+    assert datasets[0] == documents[0]
+    assert datasets[1].uuid is None
+    assert datasets[1].dataset == documents[1]
+
+
+def test_write_spectrum_document(tmp_path, metazeunerite_jsonld):
+    spectrum = Spectrum.from_scidata(metazeunerite_jsonld)
+    filename = tmp_path / "datasets.ndjson"
+    assert write_ndjson(filename, [spectrum.to_scidata()]) == 1
+    (dataset,) = read_ndjson(filename)
+    restored = Spectrum.from_scidata(dataset.dataset)
+    np.testing.assert_array_equal(restored.x, spectrum.x)
+    np.testing.assert_array_equal(restored.y, spectrum.y)
+
+    # A failed write leaves no file behind
+    with pytest.raises(TypeError):
+        write_ndjson(tmp_path / "failed.ndjson", [{"set": {1}}])
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["datasets.ndjson"]
+
+
+def test_compression(tmp_path, metazeunerite_jsonld):
+    with pytest.raises(UnsupportedCompressionException):
+        write_ndjson(tmp_path / "datasets.ndjson", [], compression="gzip")
+
+    pytest.importorskip("zstandard")
+    filename = tmp_path / "datasets.ndjson.zst"
+    write_ndjson(filename, [metazeunerite_jsonld] * 3)
+    assert filename.read_bytes()[:4] == b"\x28\xb5\x2f\xfd"
+    datasets = list(read_ndjson(filename))
+    assert [d.dataset for d in datasets] == [metazeunerite_jsonld] * 3
+
+
+def test_export_import_ndjson(tmp_path, ssm_rester, metazeunerite_jsonld):
+    for i in range(5):
+        dataset = dict(metazeunerite_jsonld)
+        dataset["@graph"] = dict(dataset["@graph"], title=f"dataset {i}")
+        ssm_rester.dataset.create(dataset)
+
+    first = tmp_path / "first.ndjson"
+    second = tmp_path / "second.ndjson"
+    assert export_ndjson(first, ssm_rester.dataset, lookahead=2) == 5
+    export_ndjson(second, ssm_rester.dataset, max_workers=1)
+    assert first.read_bytes() == second.read_bytes()
+    uuids = [dataset.uuid for dataset in read_ndjson(first)]
+    assert uuids == sorted(ssm_rester.dataset.get_datasets())
+
+    collection = ssm_rester.collection.create("restored")
+    ssm_rester.initialize_dataset_for_collection(collection)
+    created = import_ndjson(first, ssm_rester.dataset, max_workers=2)
+    assert sorted(created) == sorted(ssm_rester.dataset.get_datasets())
+    titles = [
+        ssm_rester.dataset.get_by_uuid(uuid).dataset["@graph"]["title"]
+        for uuid in created
+    ]
+    expected = [d.dataset["@graph"]["title"] for d in read_ndjson(first)]
+    assert titles == expected
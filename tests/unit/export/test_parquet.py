@@ -0,0 +1,67 @@
+"""Tests for export.parquet"""
+
+import json
+
+import numpy as np
+import pytest
+
+from ssm_client import SSMRester
+from ssm_client.containers import DatasetContainer
+from ssm_client.export import record_from_scidata, write_parquet
+
+
+def test_record_from_scidata(metazeunerite_jsonld):
+    record = record_from_scidata(metazeunerite_jsonld, uuid="A")
+    assert record["uuid"] == "A"
+    assert record["uid"] == "rruff:R050524"
+    assert record["technique"] == "Raman Spectroscopy"
+    assert record["crystal_system"] == "tetragonal"
+    assert record["x_units"] == "1/cm"
+    assert record["n_points"] == record["x"].size == record["y"].size
+    assert json.loads(record["facets"])["atoms"] == ["U", "H2O", "AsO4", "Cu"]
+
+
+def test_record_from_scidata_without_spectrum():
+    record = record_from_scidata({"@graph": {"title": "empty"}})
+    assert record["title"] == "empty"
+    assert record["n_points"] == 0
+    assert record["facets"] == "{}"
+
+
+def test_write_parquet(tmp_path, metazeunerite_jsonld):
+    pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    documents = [
+        DatasetContainer(uuid=str(i), dataset=metazeunerite_jsonld)
+        for i in range(5)
+    ] + [{"@graph": {"title": "empty"}}]
+    filename = tmp_path / "collection.parquet"
+    assert write_parquet(filename, documents, row_group_size=2) == 6
+
+    parquet = pq.ParquetFile(filename)
+    assert parquet.metadata.num_row_groups == 3
+    table = parquet.read()
+    assert table.column("uuid").to_pylist() == [
+        "0", "1", "2", "3", "4", None
+    ]
+    expected = record_from_scidata(metazeunerite_jsonld)
+    np.testing.assert_array_equal(table.column("y")[0].as_py(), expected["y"])
+    assert table.column("y")[5].as_py() == []
+
+
+def test_write_parquet_from_service(
+    tmp_path, mock_server, metazeunerite_jsonld
+):
+    pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    rester = SSMRester(hostname=mock_server.base_url)
+    collection = rester.collection.create("parquet")
+    rester.initialize_dataset_for_collection(collection)
+    uuids = [rester.dataset.create(metazeunerite_jsonld).uuid for _ in "ab"]
+
+    filename = tmp_path / "collection.parquet"
+    write_parquet(filename, rester.dataset.iter_datasets())
+    table = pq.read_table(filename)
+    assert table.column("uuid").to_pylist() == uuids
@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+
+"""Tests for the ingest manifest builder."""
+
+import hashlib
+import os
+
+import pytest
+
+from ssm_client.ingest import (
+    Blacklist,
+    build_manifest,
+    dedupe_manifest,
+    filter_manifest,
+    read_manifest,
+    refresh_manifest,
+    write_manifest,
+)
+from ssm_client.ingest import manifest as manifest_module
+
+
+@pytest.fixture
+def curies(tmp_path):
+    """
+    Small CURIES-like tree: <group>/Spectra/*.txt
+    """
+    layout = {
+        "Phosphates": ["a_R_532.txt", "b_R_785.txt", "c_IR.txt", "notes.md"],
+        "Carbonates": ["d_R_532.txt", "e_R_532.txt"],
+    }
+    for group, names in layout.items():
+        spectra = tmp_path / group / "Spectra"
+        spectra.mkdir(parents=True)
+        for name in names:
+            (spectra / name).write_text(name)
+    (tmp_path / "Carbonates" / "Spectra" / "old").mkdir()
+    (tmp_path / "Carbonates" / "Spectra" / "old" / "f.txt").write_text("f")
+    return tmp_path
+
+
+def _roots(curies):
+    return {
+        group: curies / group / "Spectra"
+        for group in ["Phosphates", "Carbonates"]
+    }
+
+
+def test_blacklist():
+    """Test exact, glob and regex blacklist patterns"""
+    blacklist = Blacklist(
+        ["nat_ir_new.txt", "CURIES/Carbonates/x.txt", "*_IR.txt", "re:.*785.*"]
+    )
+    assert "nat_ir_new.txt" in blacklist
+    assert "CURIES/Phosphates/nat_ir_new.txt" in blacklist
+    assert "CURIES/Carbonates/x.txt" in blacklist
+    assert "CURIES/Phosphates/x.txt" not in blacklist
+    assert "curienite_IR.txt" in blacklist
+    assert "b_R_785.txt" in blacklist
+    assert "b_R_532.txt" not in blacklist
+    assert "anything.txt" not in Blacklist()
+
+
+def test_build_manifest(curies):
+    """Test walking, filtering and hashing files"""
+    manifest = build_manifest(_roots(curies), blacklist=["*_IR.txt"])
+    names = [entry.path.split("/")[-1] for entry in manifest]
+    assert names == ["a_R_532.txt", "b_R_785.txt", "d_R_532.txt", "e_R_532.txt"]  # noqa: E501
+    groups = [entry.group for entry in manifest]
+    assert groups == 2 * ["Phosphates"] + 2 * ["Carbonates"]
+    entry = manifest[0]
+    assert entry.size == len("a_R_532.txt")
+    assert entry.sha256 == hashlib.sha256(b"a_R_532.txt").hexdigest()
+
+
+def test_build_manifest_recursive_no_hash(curies):
+    """Test recursive walks and skipping the hashing"""
+    roots = [curies / "Carbonates" / "Spectra"]
+    manifest = build_manifest(roots, recursive=True, hash_files=False)
+    assert len(manifest) == 3
+    assert {entry.group for entry in manifest} == {"Spectra"}
+    assert all(entry.sha256 is None for entry in manifest)
+
+
+def test_manifest_round_trip(curies, tmp_path):
+    """Test writing and reading back a manifest file"""
+    manifest = build_manifest(_roots(curies))
+    filename = tmp_path / "manifest.jsonl"
+    write_manifest(filename, manifest)
+    assert read_manifest(filename) == manifest
+
+    # Blank lines are skipped
+    with open(filename, "a") as fileobj:
+        fileobj.write("\n  \n")
+    assert read_manifest(filename) == manifest
+
+
+def test_missing_directory(curies):
+    """Test a group without a directory has no files"""
+    roots = dict(_roots(curies), Vanadates=curies / "Vanadates" / "Spectra")
+    manifest = build_manifest(roots, hash_files=False)
+    assert len(manifest) == 5
+    assert "Vanadates" not in {entry.group for entry in manifest}
+
+
+def test_filter_manifest(curies):
+    """Test applying a new group selection and blacklist to a manifest"""
+    manifest = build_manifest(_roots(curies), hash_files=False)
+    filtered = filter_manifest(manifest, ["Phosphates"], ["*_IR.txt"])
+    names = [entry.path.split("/")[-1] for entry in filtered]
+    assert names == ["a_R_532.txt", "b_R_785.txt"]
+    assert filter_manifest(manifest) == manifest
+
+
+def test_dedupe_manifest(curies):
+    """Test files with the same contents are kept once"""
+    copy = curies / "Carbonates" / "Spectra" / "a_R_532.txt"
+    copy.write_text("a_R_532.txt")
+    manifest = build_manifest(_roots(curies))
+    unique = dedupe_manifest(manifest)
+    assert len(unique) == len(manifest) - 1
+    assert str(copy) not in {entry.path for entry in unique}
+    unhashed = build_manifest(_roots(curies), hash_files=False)
+    assert dedupe_manifest(unhashed) == unhashed
+
+
+def test_refresh_manifest(curies, tmp_path, monkeypatch):
+    """Test only changed groups are walked and only new files hashed"""
+    roots = _roots(curies)
+    manifest = build_manifest(roots)
+    filename = tmp_path / "manifest.jsonl"
+    write_manifest(filename, manifest)
+    since = os.path.getmtime(filename)
+    for directory in roots.values():
+        os.utime(directory, (since - 10, since - 10))
+
+    hashed = []
+    hash_file = manifest_module.hash_file
+
+    def _hash_file(path):
+        hashed.append(os.path.basename(path))
+        return hash_file(path)
+
+    monkeypatch.setattr(manifest_module, "hash_file", _hash_file)
+    assert refresh_manifest(manifest, roots, since) == manifest
+    assert hashed == []
+
+    # A file added to a group: its directory is newer than the manifest
+    spectra = roots["Carbonates"]
+    (spectra / "g_R_532.txt").write_text("g")
+    os.utime(spectra, (since + 10, since + 10))
+    refreshed = refresh_manifest(manifest, roots, since)
+    assert hashed == ["g_R_532.txt"]
+    assert refreshed[:3] == manifest[:3]
+    assert refreshed[-1].path == str(spectra / "g_R_532.txt")
+    assert refreshed[-1].sha256 == hashlib.sha256(b"g").hexdigest()
+
+    # A file modified in place: the directory is unchanged
+    changed = roots["Phosphates"] / "a_R_532.txt"
+    changed.write_text("changed")
+    os.utime(roots["Phosphates"], (since - 10, since - 10))
+    refreshed = refresh_manifest(refreshed, roots, since)
+    assert hashed[1:] == ["a_R_532.txt"]
+    assert refreshed[0].sha256 == hashlib.sha256(b"changed").hexdigest()
+
+    # New groups are walked
+    roots["Vanadates"] = curies / "Phosphates" / "Spectra"
+    refreshed = refresh_manifest(manifest, roots, since)
+    assert [entry.group for entry in refreshed].count("Vanadates") == 3
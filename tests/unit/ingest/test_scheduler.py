@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+
+"""Tests for the ingest scheduler."""
+
+import threading
+import time
+
+import pytest
+
+from ssm_client.ingest import IngestScheduler
+
+
+def _drain(scheduler):
+    tasks = []
+    while True:
+        task = scheduler.next()
+        if task is None:
+            return tasks
+        tasks.append(task)
+
+
+def test_round_robin_across_groups():
+    """Test groups are interleaved instead of processed one after another"""
+    scheduler = IngestScheduler()
+    for i in range(6):
+        scheduler.submit(i, group="Phosphates")
+    for i in range(2):
+        scheduler.submit(i, group="Carbonates")
+    assert len(scheduler) == 8
+
+    groups = [task.group for task in _drain(scheduler)]
+    assert groups[:4] == ["Phosphates", "Carbonates"] * 2
+    assert groups[4:] == 4 * ["Phosphates"]
+    assert len(scheduler) == 0
+    assert scheduler.next() is None
+
+
+def test_group_priorities():
+    """Test weighted fairness between groups"""
+    scheduler = IngestScheduler(group_priorities={"Phosphates": 3})
+    for i in range(9):
+        scheduler.submit(i, group="Phosphates")
+        scheduler.submit(i, group="Carbonates")
+
+    groups = [task.group for task in _drain(scheduler)][:8]
+    assert groups.count("Phosphates") == 6
+    assert groups.count("Carbonates") == 2
+
+
+def test_collection_fairness():
+    """Test fairness between collections before groups"""
+    scheduler = IngestScheduler()
+    for group in ["a", "b", "c"]:
+        for i in range(2):
+            scheduler.submit(i, group=group, collection="big")
+    for i in range(2):
+        scheduler.submit(i, group="d", collection="small")
+
+    collections = [task.collection for task in _drain(scheduler)]
+    assert collections[:4] == ["big", "small"] * 2
+
+
+def test_reactivated_group_is_not_favored():
+    """Test an idle group does not get a burst when it becomes active"""
+    scheduler = IngestScheduler()
+    scheduler.submit(0, group="a")
+    scheduler.next()
+    for i in range(4):
+        scheduler.submit(i, group="b")
+    for _ in range(3):
+        scheduler.next()
+    scheduler.submit(0, group="a")
+    scheduler.submit(1, group="a")
+    groups = [task.group for task in _drain(scheduler)]
+    assert groups == ["a", "b", "a"]
+
+
+def test_run_uses_all_workers():
+    """Test idle workers pick up tasks from any group"""
+    scheduler = IngestScheduler()
+    for i in range(12):
+        scheduler.submit(i, group="big")
+    scheduler.submit(0, group="small")
+
+    threads = set()
+
+    def _work(task):
+        threads.add(threading.get_ident())
+        time.sleep(0.01)
+        return task.item
+
+    results = scheduler.run(_work, workers=4)
+    assert len(results) == 13
+    assert sorted(r for t, r in results if t.group == "big") == list(range(12))
+    assert len(threads) == 4
+
+
+def test_run_raises():
+    """Test the first worker exception is re-raised"""
+    scheduler = IngestScheduler()
+    for i in range(10):
+        scheduler.submit(i, group="a")
+
+    def _work(task):
+        if task.item == 3:
+            raise ValueError("bad file")
+
+    with pytest.raises(ValueError):
+        scheduler.run(_work, workers=2)
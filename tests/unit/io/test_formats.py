@@ -1,7 +1,7 @@
 """Tests for io.formats"""
 
 import pytest
-from ssm_client import io
+from ssm_client import Spectrum, io
 
 
 def test_get_ioformat_scidata_jsonld():
@@ -17,3 +17,13 @@ def test_get_ioformat_jcamp():
 def test_get_ioformat_raise_exception():
     with pytest.raises(io.formats.UnknownFileTypeError):
         io.formats._get_ioformat("cat")
+
+
+def test_read_as_spectrum(raman_soddyite_rruff):
+    spectrum = io.read(
+        raman_soddyite_rruff, ioformat="rruff", as_spectrum=True
+    )
+    assert isinstance(spectrum, Spectrum)
+    assert spectrum.uid == "rruff:R060361"
+    assert spectrum.x_units == "1/cm"
+    assert len(spectrum) > 0
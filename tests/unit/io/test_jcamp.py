@@ -1,3 +1,4 @@
+import copy
 import pytest
 from typing import List
 
@@ -306,3 +307,29 @@ def test_write_raman(tmp_path, raman_tannic_acid_jcamp):
         result_list = [x.strip() for x in result_element.split(",")]
         target_list = [x.strip() for x in target_element.split(",")]
         assert result_list == target_list
+
+
+def test_write_does_not_modify_input(tmp_path, raman_tannic_acid_jcamp):
+    scidata_dict = jcamp.read_jcamp(raman_tannic_acid_jcamp.resolve())
+    scidata_dict["@graph"].pop("toc", None)
+    original = copy.deepcopy(scidata_dict)
+
+    jcamp.write_jcamp(tmp_path / "first.jdx", scidata_dict)
+    jcamp.write_jcamp(tmp_path / "second.jdx", scidata_dict)
+
+    assert scidata_dict == original
+    first = (tmp_path / "first.jdx").read_text()
+    assert first == (tmp_path / "second.jdx").read_text()
+
+
+def test_to_scidata_object_shares_data(raman_tannic_acid_jcamp):
+    scidata_dict = jcamp.read_jcamp(raman_tannic_acid_jcamp.resolve())
+    scidata = jcamp.to_scidata_object(scidata_dict)
+
+    graph = scidata.meta["@graph"]
+    assert scidata.meta is not scidata_dict
+    assert graph["toc"] is not scidata_dict["@graph"].get("toc")
+    dataseries = graph["scidata"]["dataset"]["dataseries"]
+    original = scidata_dict["@graph"]["scidata"]["dataset"]["dataseries"]
+    assert dataseries[0] is not original[0]
+    assert dataseries[0]["parameter"] is original[0]["parameter"]
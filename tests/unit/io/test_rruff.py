@@ -1,3 +1,5 @@
+import copy
+
 from ssm_client.io import rruff
 
 
@@ -75,3 +77,16 @@ def test_write_rruff(tmp_path, raman_soddyite_rruff):
         result_list = [x.strip() for x in result_element.split(",")]
         target_list = [x.strip() for x in target_element.split(",")]
         assert result_list == target_list
+
+
+def test_write_rruff_does_not_modify_input(tmp_path, raman_soddyite_rruff):
+    scidata_dict = rruff.read_rruff(raman_soddyite_rruff.absolute())
+    scidata_dict["@graph"].pop("toc", None)
+    original = copy.deepcopy(scidata_dict)
+
+    rruff.write_rruff(tmp_path / "first.rruff", scidata_dict)
+    rruff.write_rruff(tmp_path / "second.rruff", scidata_dict)
+
+    assert scidata_dict == original
+    first = (tmp_path / "first.rruff").read_text()
+    assert first == (tmp_path / "second.rruff").read_text()
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+
+def gaussian_spectrum(x, centers, widths=8.0, heights=1.0):
+    """
+    Sum of Gaussian bands evaluated on `x`
+    """
+    centers = np.atleast_1d(centers)
+    widths = np.broadcast_to(widths, centers.shape)
+    heights = np.broadcast_to(heights, centers.shape)
+    y = np.zeros_like(x, dtype=np.float64)
+    for center, width, height in zip(centers, widths, heights):
+        y += height * np.exp(-0.5 * ((x - center) / width) ** 2)
+    return y
+
+
+@pytest.fixture
+def synthetic_spectra():
+    """
+    Reference spectra with 3 random bands each on their own random,
+    descending RRUFF-like x-axis. Returns a list of (key, x, y) tuples.
+    """
+    rng = np.random.default_rng(42)
+    spectra = []
+    for i in range(50):
+        start = rng.uniform(90.0, 150.0)
+        step = rng.uniform(0.8, 1.2)
+        x = np.arange(start, 1400.0, step)[::-1]
+        centers = rng.uniform(200.0, 1300.0, size=3)
+        heights = rng.uniform(0.3, 1.0, size=3)
+        y = gaussian_spectrum(x, centers, heights=heights)
+        y *= rng.uniform(1.0, 100.0)
+        spectra.append((f"ref-{i}", x, y))
+    return spectra
@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+
+"""Tests for the IVF approximate nearest-neighbour index."""
+
+import numpy as np
+import pytest
+
+from ssm_client import SSMRester
+from ssm_client.match import IVFIndex, SpectralLibrary
+from ssm_client.match.ann import IndexMismatchException, kmeans
+
+
+@pytest.fixture
+def library(synthetic_spectra):
+    library = SpectralLibrary(grid=np.arange(100.0, 1400.0, 2.0))
+    for key, x, y in synthetic_spectra:
+        library.add((x, y), key=key)
+    return library
+
+
+def test_kmeans():
+    """Test k-means separates well separated blobs"""
+    rng = np.random.default_rng(0)
+    centers = np.array([[0.0, 0.0], [10.0, 10.0], [-10.0, 10.0]])
+    vectors = np.concatenate([c + rng.normal(size=(20, 2)) for c in centers])
+    centroids, assignment = kmeans(vectors, 3, seed=1)
+    assert centroids.shape == (3, 2)
+    for blob in range(3):
+        assert len(set(assignment[blob * 20:(blob + 1) * 20])) == 1
+    assert len(set(assignment)) == 3
+
+
+@pytest.mark.parametrize("metric", ["cosine", "pearson", "euclidean"])
+def test_full_probe_matches_exhaustive(library, synthetic_spectra, metric):
+    """Test probing every list gives the exhaustive result"""
+    index = IVFIndex(library, n_lists=5, metric=metric).build()
+    assert index.offsets[-1] == len(library)
+    _, x, y = synthetic_spectra[11]
+    exact = library.search((x, y), k=5, metric=metric)
+    approximate = index.search((x, y), k=5, n_probe=5)
+    assert [m.key for m in approximate] == [m.key for m in exact]
+    np.testing.assert_allclose(
+        [m.score for m in approximate], [m.score for m in exact], rtol=1e-5
+    )
+
+
+def test_partial_probe_finds_self(library, synthetic_spectra):
+    """Test a reference is found visiting a single list"""
+    index = IVFIndex(library, n_lists=7)
+    for key, x, y in synthetic_spectra[:10]:
+        assert index.search((x, y), k=1, n_probe=1)[0].key == key
+
+
+def test_update_after_add(library, synthetic_spectra):
+    """Test entries added after the build are searchable"""
+    index = IVFIndex(library, n_lists=5).build()
+    centroids = index.centroids
+    assert not index.stale
+    _, x, y = synthetic_spectra[0]
+    library.add((x[::-1], y[::-1] ** 2), key="new")
+    assert index.stale
+    matches = index.search((x[::-1], y[::-1] ** 2), k=1, n_probe=1)
+    assert matches[0].key == "new"
+    assert not index.stale
+    assert index.order.size == len(library)
+    assert index.offsets[-1] == len(library)
+    # Joined the list of its nearest centroid without reclustering
+    assert index.centroids is centroids
+
+    # The library grew by more than half: recluster
+    for i, (_, x, y) in enumerate(synthetic_spectra[:30]):
+        library.add((x, 1.5 * y), key=f"copy {i}")
+    index.update()
+    assert index.centroids is not centroids
+    assert index.n_clustered == len(library)
+    assert index.order.size == len(library)
+
+
+def test_default_n_lists(library, synthetic_spectra):
+    """Test the default number of lists follows the library at build"""
+    index = IVFIndex(library)
+    assert index.n_lists is None
+    index.build()
+    assert index.n_lists == 7
+    for i, (_, x, y) in enumerate(synthetic_spectra):
+        library.add((x, 1.5 * y), key=f"copy {i}")
+    assert index.build().n_lists == 10
+
+
+def test_save_load(library, synthetic_spectra, tmp_path):
+    """Test persisting the index to disk"""
+    index = IVFIndex(library, n_lists=5, metric="pearson").build()
+    filename = tmp_path / "index.npz"
+    index.save(filename)
+
+    loaded = IVFIndex.load(filename, library)
+    assert loaded.metric == "pearson"
+    assert loaded.n_lists == 5
+    np.testing.assert_array_equal(loaded.order, index.order)
+    _, x, y = synthetic_spectra[4]
+    assert loaded.search((x, y), k=3) == index.search((x, y), k=3)
+
+    small = SpectralLibrary(grid=library.grid)
+    small.add((x, y))
+    with pytest.raises(IndexMismatchException):
+        IVFIndex.load(filename, small)
+
+
+def test_library_from_dataset_service(mock_server, metazeunerite_jsonld):
+    """Test building a library from datasets fetched over HTTP"""
+    rester = SSMRester(hostname=mock_server.base_url)
+    collection = rester.collection.create("foo")
+    rester.initialize_dataset_for_collection(collection)
+    dataset = rester.dataset.create(metazeunerite_jsonld)
+    rester.dataset.create({"@graph": {"title": "no spectrum"}})
+
+    with pytest.warns(UserWarning):
+        library = SpectralLibrary.from_dataset_service(rester.dataset)
+    assert library.keys == [dataset.uuid]
+    assert library.metadata[0]["title"] == "Metazeunerite"
+
+
+def test_library_from_dataset_service_chunks(
+    mock_server, metazeunerite_jsonld, monkeypatch
+):
+    """Test datasets are fetched lazily and added a chunk at a time"""
+    rester = SSMRester(hostname=mock_server.base_url)
+    collection = rester.collection.create("chunks")
+    rester.initialize_dataset_for_collection(collection)
+    for i in range(5):
+        graph = dict(metazeunerite_jsonld["@graph"], title=f"dataset {i}")
+        rester.dataset.create(dict(metazeunerite_jsonld, **{"@graph": graph}))
+    uuids = rester.dataset.get_datasets()
+
+    batches = []
+    add_many = SpectralLibrary.add_many
+
+    def _add_many(self, spectra, keys=None, metadata=None):
+        batches.append(len(spectra))
+        return add_many(self, spectra, keys, metadata)
+
+    monkeypatch.setattr(SpectralLibrary, "add_many", _add_many)
+    library = SpectralLibrary.from_dataset_service(
+        rester.dataset, workers=2, chunk_size=2
+    )
+    assert batches == [2, 2, 1]
+    assert library.keys == uuids
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+
+"""Tests for facet bitmap indexes and filtered search."""
+
+import numpy as np
+import pytest
+
+from ssm_client.match import FacetIndex, SpectralLibrary
+from ssm_client.match.facets import And, AnyOf, Bitmap, Contains, Or, Term
+from ssm_client.metadata import facets_from_scidata
+
+_SYSTEMS = ["tetragonal", "monoclinic", "orthorhombic", "triclinic"]
+_FORMULAS = ["(UO2)3(PO4)2", "Cu(UO2)2(AsO4)2", "UO2(SO4)"]
+
+
+@pytest.fixture
+def library(synthetic_spectra):
+    library = SpectralLibrary(grid=np.arange(100.0, 1400.0, 1.0))
+    for i, (key, x, y) in enumerate(synthetic_spectra):
+        facets = {
+            "crystal system": [_SYSTEMS[i % 4]],
+            "formula": [_FORMULAS[i % 3]],
+            "atoms": ["U", "PO4" if i % 3 == 0 else "H2O"],
+        }
+        library.add((x, y), key=key, metadata={"facets": facets})
+    # An entry without facets
+    library.add((x, y), key="bare", metadata={"title": "bare"})
+    return library
+
+
+@pytest.fixture
+def index(library):
+    return FacetIndex.from_library(library)
+
+
+def test_facets_from_scidata(metazeunerite_jsonld):
+    facets = facets_from_scidata(metazeunerite_jsonld)
+    assert facets["crystal system"] == ["tetragonal"]
+    assert facets["structure type"] == ["sheet"]
+    assert facets["atoms"] == ["U", "H2O", "AsO4", "Cu"]
+    assert "multiplicity" not in facets
+
+    library = SpectralLibrary()
+    library.add(metazeunerite_jsonld)
+    assert library.metadata[0]["facets"] == facets
+    assert FacetIndex.from_library(library).values("crystal system") == [
+        "tetragonal"
+    ]
+
+
+@pytest.mark.parametrize("size", [10, 1000])
+def test_bitmap(size):
+    rng = np.random.default_rng(0)
+    masks = [rng.random(size) < p for p in [0.005, 0.1, 0.9]]
+    bitmaps = [Bitmap.from_mask(mask) for mask in masks]
+    for mask, bitmap in zip(masks, bitmaps):
+        assert len(bitmap) == mask.sum()
+        np.testing.assert_array_equal(bitmap.to_mask(), mask)
+        np.testing.assert_array_equal((~bitmap).to_mask(), ~mask)
+        assert bitmap == Bitmap.from_rows(np.flatnonzero(mask), size)
+    if size == 1000:
+        assert bitmaps[0].rows is not None and bitmaps[2].bits is not None
+    for a, mask_a in zip(bitmaps, masks):
+        for b, mask_b in zip(bitmaps, masks):
+            np.testing.assert_array_equal((a & b).to_mask(), mask_a & mask_b)
+            np.testing.assert_array_equal((a | b).to_mask(), mask_a | mask_b)
+
+
+def test_predicates(index):
+    assert len(index) == 51
+    assert index.values("crystal system") == sorted(_SYSTEMS)
+
+    tetragonal = index.rows(Term("crystal system", "Tetragonal"))
+    np.testing.assert_array_equal(tetragonal, np.arange(0, 50, 4))
+
+    uranyl_phosphates = Contains("formula", "po4") & Term("atoms", "U")
+    np.testing.assert_array_equal(
+        index.rows(uranyl_phosphates), np.arange(0, 50, 3)
+    )
+    systems = AnyOf("crystal system", ["tetragonal", "triclinic"])
+    rows = index.rows(uranyl_phosphates & systems)
+    np.testing.assert_array_equal(rows, [0, 3, 12, 15, 24, 27, 36, 39, 48])
+    rows = index.rows(~Term("atoms", "U") | Term("formula", "missing"))
+    np.testing.assert_array_equal(rows, [50])
+    assert index.rows(Term("structure type", "sheet")).size == 0
+
+    # Empty combinations select every entry (And) or none (Or)
+    np.testing.assert_array_equal(index.rows(And()), np.arange(51))
+    assert index.rows(Or()).size == 0
+
+
+@pytest.mark.parametrize("metric", ["cosine", "euclidean"])
+def test_filtered_search(library, index, synthetic_spectra, metric):
+    """Test filtered searches only return, and match, selected entries"""
+    _, x, y = synthetic_spectra[8]
+    for predicate in [
+        Term("crystal system", "tetragonal"),
+        ~Term("crystal system", "monoclinic"),
+        Term("crystal system", "cubic"),
+    ]:
+        rows = index.rows(predicate)
+        matches = index.search(library, (x, y), predicate, k=5, metric=metric)
+        assert len(matches) == min(5, rows.size)
+        assert {m.index for m in matches} <= set(rows)
+        expected = library.search((x, y), k=5, metric=metric, rows=rows)
+        assert [m.key for m in matches] == [m.key for m in expected]
+
+    matches = index.search(library, (x, y), Term("atoms", "U"), k=1)
+    assert matches[0].key == "ref-8"
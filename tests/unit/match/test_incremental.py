@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+
+"""Tests for incremental spectral library updates."""
+
+import numpy as np
+import pytest
+
+from ssm_client import SSMRester
+from ssm_client.match import (
+    IncrementalLibrary,
+    SpectralLibrary,
+    open_snapshot,
+    write_snapshot,
+)
+
+
+@pytest.fixture
+def base(synthetic_spectra):
+    library = SpectralLibrary(grid=np.arange(100.0, 1400.0, 1.0))
+    for key, x, y in synthetic_spectra[:40]:
+        library.add((x, y), key=key, metadata={"title": key})
+    return library
+
+
+def _rebuilt(incremental):
+    """
+    Library built from scratch with the live entries of `incremental`
+    """
+    library = SpectralLibrary(grid=incremental.base.grid)
+    matrix = [incremental.base.matrix, incremental.segment.matrix]
+    matrix = np.concatenate(matrix)
+    keys = list(incremental.base.keys) + incremental._segment_keys
+    dead = np.concatenate([incremental._dead, incremental._segment_dead])
+    live = np.flatnonzero(~dead)
+    library._matrix = matrix[live]
+    library.keys = [keys[i] for i in live]
+    library.metadata = [{"title": key} for key in library.keys]
+    return library
+
+
+def _keys(matches):
+    return [match.key for match in matches]
+
+
+def test_upsert_delete(base, synthetic_spectra):
+    """Test changes are searchable and match a rebuilt library"""
+    incremental = IncrementalLibrary(base)
+    assert len(incremental) == 40
+
+    for key, x, y in synthetic_spectra[40:]:
+        incremental.upsert((x, y), key=key, metadata={"title": key})
+    _, x, y = synthetic_spectra[0]
+    incremental.upsert((x, y), key="ref-5", metadata={"title": "ref-5"})
+    incremental.delete("ref-3")
+    incremental.delete("ref-45")
+    with pytest.raises(KeyError):
+        incremental.delete("ref-3")
+
+    assert len(incremental) == 48
+    assert "ref-3" not in incremental and "ref-45" not in incremental
+    assert "ref-5" in incremental and "ref-49" in incremental
+    assert incremental.changes == 11 + 2
+    assert len(base) == 40
+
+    rebuilt = _rebuilt(incremental)
+    for i in [0, 3, 5, 45, 47]:
+        _, x, y = synthetic_spectra[i]
+        for metric in ["cosine", "pearson", "euclidean"]:
+            matches = incremental.search((x, y), k=5, metric=metric)
+            expected = rebuilt.search((x, y), k=5, metric=metric)
+            assert _keys(matches) == _keys(expected)
+            np.testing.assert_allclose(
+                [m.score for m in matches], [m.score for m in expected],
+                rtol=1e-5,
+            )
+
+    _, x, y = synthetic_spectra[0]
+    matches = incremental.search((x, y), k=2)
+    assert {"ref-0", "ref-5"} == set(_keys(matches))
+    assert "ref-3" not in _keys(incremental.search((x, y), k=100))
+    assert len(incremental.search((x, y), k=100)) == 48
+
+
+def test_compact(base, synthetic_spectra, tmp_path):
+    """Test compaction into a snapshot keeps the live entries"""
+    filename = tmp_path / "library.ssmlib"
+    write_snapshot(filename, base)
+    incremental = IncrementalLibrary(open_snapshot(filename))
+    assert incremental.filename == str(filename)
+
+    for key, x, y in synthetic_spectra[40:]:
+        incremental.upsert((x, y), key=key, metadata={"title": key})
+    incremental.delete("ref-0")
+    _, x, y = synthetic_spectra[10]
+    before = incremental.search((x, y), k=5)
+
+    compacted = incremental.compact()
+    assert incremental.base is compacted
+    assert isinstance(compacted.matrix, np.memmap)
+    assert len(compacted) == 49 and len(incremental.segment) == 0
+    assert incremental.changes == 0
+    assert "ref-0" not in compacted
+    assert compacted.metadata[-1] == {"title": "ref-49"}
+    assert _keys(incremental.search((x, y), k=5)) == _keys(before)
+
+    background = incremental.compact(background=True)
+    assert background.result() is incremental.base
+    incremental.close()
+
+
+def test_changes_during_compaction(base, synthetic_spectra):
+    """Test changes made while compacting carry over to the new base"""
+    incremental = IncrementalLibrary(base)
+    for key, x, y in synthetic_spectra[40:45]:
+        incremental.upsert((x, y), key=key, metadata={"title": key})
+    incremental.delete("ref-1")
+
+    n_segment = len(incremental.segment)
+    dead = incremental._dead.copy()
+    segment_dead = np.asarray(incremental._segment_dead)
+    for key, x, y in synthetic_spectra[45:]:
+        incremental.upsert((x, y), key=key, metadata={"title": key})
+    incremental.delete("ref-2")
+    incremental.delete("ref-40")
+    _, x, y = synthetic_spectra[0]
+    incremental.upsert((x, y), key="ref-41", metadata={"title": "ref-41"})
+
+    # Swap in a compaction of the state captured above
+    compacted = SpectralLibrary(grid=base.grid)
+    live = [key for i, key in enumerate(base.keys) if not dead[i]]
+    live += [
+        incremental._segment_keys[i]
+        for i in np.flatnonzero(~segment_dead)
+    ]
+    for key in live:
+        i = int(key.split("-")[1])
+        _, x, y = synthetic_spectra[i]
+        compacted.add((x, y), key=key, metadata={"title": key})
+    with incremental._lock:
+        incremental._swap(compacted, dead, n_segment, segment_dead)
+
+    assert len(incremental) == 50 - 3
+    for key in ["ref-1", "ref-2", "ref-40"]:
+        assert key not in incremental
+    assert incremental._locate("ref-41")[0]
+    assert incremental._locate("ref-49")[0]
+    assert not incremental._locate("ref-42")[0]
+
+    _, x, y = synthetic_spectra[0]
+    matches = incremental.search((x, y), k=2)
+    assert set(_keys(matches)) == {"ref-0", "ref-41"}
+
+
+def test_auto_compact(base, synthetic_spectra):
+    """Test compaction starts once the changes exceed the ratio"""
+    incremental = IncrementalLibrary(base, compact_ratio=0.1)
+    for key, x, y in synthetic_spectra[40:45]:
+        incremental.upsert((x, y), key=key, metadata={"title": key})
+    incremental.close()
+    assert incremental.changes < 5
+    assert len(incremental) == 45
+
+
+def test_watch(mock_server, metazeunerite_jsonld):
+    """Test the library follows changes made through a DatasetService"""
+    ssm_rester = SSMRester(hostname=mock_server.base_url)
+    collection = ssm_rester.collection.create("foo")
+    ssm_rester.initialize_dataset_for_collection(collection)
+    incremental = IncrementalLibrary().watch(ssm_rester.dataset)
+
+    dataset = ssm_rester.dataset.create(metazeunerite_jsonld)
+    assert dataset.uuid in incremental
+    ssm_rester.dataset.replace_dataset_for_uuid(
+        dataset.uuid, metazeunerite_jsonld
+    )
+    assert len(incremental) == 1
+
+    matches = incremental.search(dataset, k=1)
+    assert matches[0].key == dataset.uuid
+    assert matches[0].score == pytest.approx(1.0)
+
+    ssm_rester.dataset.delete_by_uuid(dataset.uuid)
+    assert dataset.uuid not in incremental
+    assert len(incremental) == 0
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+
+"""Tests for the local spectral matching library."""
+
+import numpy as np
+import pytest
+
+from ssm_client import io
+from ssm_client.containers import DatasetContainer
+from ssm_client.match import (
+    MissingSpectrumException,
+    SpectralLibrary,
+    UnsupportedMetricException,
+)
+from ssm_client.match.library import (
+    chunk_sizes,
+    top_k,
+    top_k_rows,
+    xy_from_scidata,
+)
+
+
+@pytest.fixture
+def library(synthetic_spectra):
+    library = SpectralLibrary(grid=np.arange(100.0, 1400.0, 1.0))
+    for key, x, y in synthetic_spectra:
+        library.add((x, y), key=key)
+    return library
+
+
+def _noisy(x, y, seed=0):
+    rng = np.random.default_rng(seed)
+    return x, 0.5 * y + rng.normal(0.0, 0.01 * y.max(), size=y.size)
+
+
+@pytest.mark.parametrize("metric", ["cosine", "pearson", "euclidean"])
+def test_search_finds_reference(library, synthetic_spectra, metric):
+    """Test a noisy, rescaled copy of a reference is its own top hit"""
+    key, x, y = synthetic_spectra[7]
+    matches = library.search(_noisy(x, y), k=5, metric=metric)
+    assert len(matches) == 5
+    assert matches[0].key == key
+    assert matches[0].index == 7
+    scores = [match.score for match in matches]
+    if metric == "euclidean":
+        assert scores == sorted(scores)
+    else:
+        assert scores == sorted(scores, reverse=True)
+        assert scores[0] > 0.95
+
+
+def test_scores_against_numpy(library, synthetic_spectra):
+    """Test vectorized cosine scores match a direct computation"""
+    _, x, y = synthetic_spectra[3]
+    scores = library.scores((x, y), metric="cosine")
+    query = library.prepare_query((x, y)).astype(np.float64)
+    matrix = library.matrix.astype(np.float64)
+    target = matrix @ query
+    target /= np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+    np.testing.assert_allclose(scores, target, rtol=1e-4, atol=1e-6)
+
+
+def test_library_from_scidata(raman_soddyite_rruff, metazeunerite_jsonld):
+    """Test building the library from SciData dicts and DatasetContainers"""
+    soddyite = io.read(raman_soddyite_rruff.absolute(), ioformat="rruff")
+    container = DatasetContainer(uuid="X" * 64, dataset=metazeunerite_jsonld)
+
+    library = SpectralLibrary()
+    library.add(soddyite)
+    library.add(container)
+    assert len(library) == 2
+    assert library.keys == ["rruff:R060361", "X" * 64]
+    assert library.metadata[1]["title"] == "Metazeunerite"
+    assert "X" * 64 in library
+    assert library.matrix.shape == (2, library.grid.size)
+    assert library.matrix.dtype == np.float32
+
+    matches = library.search(soddyite, k=2)
+    assert matches[0].key == "rruff:R060361"
+    assert matches[0].score == pytest.approx(1.0, abs=1e-5)
+
+
+def test_library_duplicate_key(library, synthetic_spectra):
+    _, x, y = synthetic_spectra[0]
+    with pytest.raises(KeyError):
+        library.add((x, y), key="ref-0")
+
+
+def test_unsupported_metric(library, synthetic_spectra):
+    _, x, y = synthetic_spectra[0]
+    with pytest.raises(UnsupportedMetricException):
+        library.search((x, y), metric="manhattan")
+
+
+def test_missing_spectrum():
+    with pytest.raises(MissingSpectrumException):
+        xy_from_scidata({"@graph": {"scidata": {}}})
+
+
+def test_top_k():
+    scores = np.array([0.1, 0.9, 0.5, 0.7])
+    np.testing.assert_array_equal(top_k(scores, 2, "cosine"), [1, 3])
+    np.testing.assert_array_equal(top_k(scores, 2, "euclidean"), [0, 2])
+    np.testing.assert_array_equal(top_k(scores, 10, "cosine"), [1, 3, 2, 0])
+
+
+def test_top_k_rows():
+    scores = np.array([[0.1, 0.9, 0.5, 0.7], [0.8, 0.2, 0.6, 0.4]])
+    np.testing.assert_array_equal(
+        top_k_rows(scores, 2, "cosine"), [[1, 3], [0, 2]]
+    )
+    np.testing.assert_array_equal(
+        top_k_rows(scores, 2, "euclidean"), [[0, 2], [1, 3]]
+    )
+    assert top_k_rows(scores, 10, "cosine").shape == (2, 4)
+
+
+def test_chunk_sizes():
+    assert chunk_sizes(1000, 4, memory_budget=2**20) == (262, 1000)
+    assert chunk_sizes(10**6, 4, memory_budget=2**20) == (64, 4096)
+    assert chunk_sizes(10, 4, memory_budget=2**30) == (1024, 10)
+
+
+@pytest.mark.parametrize("metric", ["cosine", "pearson", "euclidean"])
+@pytest.mark.parametrize("memory_budget", [2**20, 4 * 64 * 7])
+def test_search_batch(library, synthetic_spectra, metric, memory_budget):
+    """Test batch search matches one search per query"""
+    queries = [_noisy(x, y, seed=i) for i, (_, x, y) in
+               enumerate(synthetic_spectra * 3)]
+    results = library.search_batch(
+        iter(queries), k=4, metric=metric, memory_budget=memory_budget
+    )
+    assert len(results) == len(queries)
+    for query, matches in zip(queries, results):
+        expected = library.search(query, k=4, metric=metric)
+        assert [m.key for m in matches] == [m.key for m in expected]
+        np.testing.assert_allclose(
+            [m.score for m in matches], [m.score for m in expected],
+            rtol=1e-5, atol=1e-4,
+        )
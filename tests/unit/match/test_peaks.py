@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+
+"""Tests for peak picking and the inverted peak index."""
+
+import numpy as np
+import pytest
+
+from ssm_client import io
+from ssm_client.match import PeakIndex, SpectralLibrary
+from ssm_client.match.library import xy_from_scidata
+from ssm_client.match.peaks import find_peaks
+
+from .conftest import gaussian_spectrum
+
+
+@pytest.fixture
+def library(synthetic_spectra):
+    library = SpectralLibrary(grid=np.arange(100.0, 1400.0, 1.0))
+    for key, x, y in synthetic_spectra:
+        library.add((x, y), key=key)
+    return library
+
+
+def test_find_peaks_batch():
+    """Test picking peaks of a batch of spectra at once"""
+    x = np.arange(100.0, 1400.0, 1.0)
+    y = np.stack(
+        [
+            gaussian_spectrum(x, [300.0, 700.0, 1100.0], heights=[1, 0.5, 2]),
+            gaussian_spectrum(x, [500.0], heights=3.0),
+            np.zeros_like(x),
+        ]
+    )
+    y[:2] += 1e-3 * np.sin(x)
+    peaks = find_peaks(y, x, prominence=0.1)
+    np.testing.assert_allclose(peaks[0], [1100.0, 300.0, 700.0], atol=1.0)
+    np.testing.assert_allclose(peaks[1], [500.0], atol=1.0)
+    assert peaks[2].size == 0
+
+    peaks = find_peaks(y, x[::-1] * 1.0, prominence=0.1, max_peaks=2)
+    assert peaks[0].size == 2
+
+
+def test_find_peaks_rruff(raman_soddyite_rruff):
+    """Test peak picking on a RRUFF data array"""
+    scidata = io.read(raman_soddyite_rruff.absolute(), ioformat="rruff")
+    x, y = xy_from_scidata(scidata)
+    peaks = find_peaks(y, x, prominence=0.2, max_peaks=5)[0]
+    assert 1 <= peaks.size <= 5
+    assert x.min() <= peaks.min() and peaks.max() <= x.max()
+
+
+def test_candidates():
+    """Test pulling rows sharing peaks within the tolerance"""
+    index = PeakIndex(tolerance=5.0)
+    index.add(0, [300.0, 700.0])
+    index.add(1, [304.0, 900.0])
+    index.add(2, [1200.0])
+    assert len(index) == 3
+
+    np.testing.assert_array_equal(index.candidates([302.0]), [0, 1])
+    np.testing.assert_array_equal(index.candidates([296.0]), [0])
+    np.testing.assert_array_equal(
+        index.candidates([301.0, 702.0], min_shared=2), [0]
+    )
+    assert index.candidates([500.0]).size == 0
+
+
+def test_search_prefilters(library, synthetic_spectra):
+    """Test prefiltered search finds references and skips the rest"""
+    index = PeakIndex.from_library(library, tolerance=4.0, prominence=0.1)
+    key, x, y = synthetic_spectra[5]
+    matches = index.search(library, (x, y), k=3, min_shared=2)
+    assert matches[0].key == key
+    assert matches[0].score == pytest.approx(1.0, abs=1e-4)
+
+    query = library.prepare_query((x, y))
+    positions = find_peaks(query, library.grid, prominence=0.1)[0]
+    rows = index.candidates(positions, min_shared=2)
+    assert rows.size < len(library) / 5
+    assert matches == library.search((x, y), k=3, rows=rows)
+
+    # The query is resampled once, for both peak picking and scoring
+    calls = []
+    to_grid = library.to_grid
+
+    def _to_grid(xs, ys, use_cache=False):
+        calls.append(len(xs))
+        return to_grid(xs, ys, use_cache)
+
+    library.to_grid = _to_grid
+    index.search(library, (x, y), k=3, min_shared=2)
+    assert calls == [1]
+
+
+def test_search_no_candidates(library):
+    index = PeakIndex.from_library(library, tolerance=1.0)
+    x = np.arange(100.0, 1400.0, 1.0)
+    y = gaussian_spectrum(x, [150.0])
+    assert index.search(library, (x, y), min_shared=3) == []
+
+
+def test_search_rows(library, synthetic_spectra):
+    """Test library search restricted to rows or a mask"""
+    key, x, y = synthetic_spectra[5]
+    matches = library.search((x, y), k=2, rows=[1, 5, 9])
+    assert matches[0].key == key
+    assert {m.index for m in matches} <= {1, 5, 9}
+
+    mask = np.zeros(len(library), dtype=bool)
+    mask[[2, 3]] = True
+    matches = library.search((x, y), k=5, rows=mask)
+    assert sorted(m.index for m in matches) == [2, 3]
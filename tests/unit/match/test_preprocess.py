@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+
+"""Tests for the batch preprocessing pipeline."""
+
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from ssm_client.match import SpectralLibrary, open_snapshot, write_snapshot
+from ssm_client.match.preprocess import (
+    Baseline,
+    Crop,
+    Normalize,
+    Pipeline,
+    SavitzkyGolay,
+    StageCache,
+    UnknownStageException,
+    batch_signature,
+)
+
+from .conftest import gaussian_spectrum
+
+
+@pytest.fixture
+def grid():
+    return np.arange(100.0, 1400.0, 1.0)
+
+
+@pytest.fixture
+def batch(grid):
+    rng = np.random.default_rng(1)
+    rows = []
+    for _ in range(20):
+        centers = rng.uniform(300.0, 1200.0, size=3)
+        baseline = rng.uniform(0.1, 0.5) + 1e-4 * (grid - 100.0)
+        rows.append(gaussian_spectrum(grid, centers) + baseline)
+    return np.array(rows)
+
+
+def test_crop(batch, grid):
+    matrix, cropped = Crop(200.0, 300.0)(batch, grid)
+    assert cropped[0] == 200.0 and cropped[-1] == 300.0
+    assert matrix.shape == (20, 101)
+    np.testing.assert_array_equal(matrix, batch[:, 100:201])
+
+
+def test_savitzky_golay(grid):
+    """Test a cubic is preserved and differentiated exactly"""
+    x = (grid - 700.0) / 100.0
+    y = x**3 - 2.0 * x
+    smoothed, _ = SavitzkyGolay(11, 3)(y[None, :], grid)
+    np.testing.assert_allclose(smoothed[0, 5:-5], y[5:-5], atol=1e-9)
+
+    derivative, _ = SavitzkyGolay(11, 3, deriv=1)(y[None, :], grid)
+    expected = (3.0 * x**2 - 2.0) / 100.0
+    np.testing.assert_allclose(derivative[0, 5:-5], expected[5:-5],
+                               atol=1e-9)
+
+    with pytest.raises(ValueError):
+        SavitzkyGolay(10, 3)
+
+
+def test_baseline(batch, grid):
+    """Test the linear baseline under the bands is removed"""
+    corrected, _ = Baseline(order=1)(batch, grid)
+    band_free = (grid > 110.0) & (grid < 250.0)
+    assert np.abs(batch[:, band_free]).min() > 0.1
+    assert np.abs(corrected[:, band_free]).max() < 0.03
+    assert corrected.min() > -0.01
+
+
+def test_pipeline_cache(batch, grid):
+    """Test a changed late stage reuses the cached earlier stages"""
+    pipeline = Pipeline([Crop(150.0, 1350.0), Baseline(), Normalize("max")])
+    matrix, out_grid = pipeline.run(batch, grid)
+    assert matrix.shape == (20, out_grid.size)
+    assert out_grid[0] == 150.0
+    np.testing.assert_allclose(matrix.max(axis=1), 1.0)
+    assert pipeline.cache.misses == 3
+
+    # Same input: served from the last stage
+    again, _ = pipeline.run(batch, grid)
+    np.testing.assert_array_equal(again, matrix)
+    assert pipeline.cache.hits == 1
+    assert again is matrix
+    with pytest.raises(ValueError):
+        again[:] = 0.0
+
+    l2 = pipeline.replace(2, Normalize("l2"))
+    assert l2.cache is pipeline.cache
+    misses = pipeline.cache.misses
+    hits = pipeline.cache.hits
+    result, _ = l2.run(batch, grid)
+    assert pipeline.cache.misses == misses + 1
+    assert pipeline.cache.hits == hits + 1
+
+    fresh = Pipeline(l2.stages).run(batch, grid)[0]
+    np.testing.assert_allclose(result, fresh)
+    np.testing.assert_allclose(np.linalg.norm(result, axis=1), 1.0)
+
+
+def test_stage_cache_size(batch, grid):
+    # Bytes per grid point of a cached output: batch column plus grid
+    point_bytes = (batch.shape[0] + 1) * 8
+    cache = StageCache(max_bytes=2200 * point_bytes)
+    stages = [Crop(200.0), Crop(300.0), Crop(400.0)]
+    Pipeline(stages, cache).run(batch, grid)
+    assert len(cache) == 2
+    assert cache.nbytes == (1100 + 1000) * point_bytes
+    assert cache.get((batch_signature(batch, grid), stages[0].key())) is None
+
+    # Outputs larger than the cache are not kept
+    small = StageCache(max_bytes=point_bytes)
+    Pipeline(stages, small).run(batch, grid)
+    assert len(small) == 0 and small.nbytes == 0
+
+
+def test_run_without_cache(batch, grid):
+    pipeline = Pipeline([Crop(200.0), Normalize("max")])
+    matrix, _ = pipeline.run(batch, grid, use_cache=False)
+    assert len(pipeline.cache) == 0
+    matrix[:] = 0.0
+    cached, _ = pipeline.run(batch, grid)
+    np.testing.assert_allclose(cached.max(axis=1), 1.0)
+
+
+class Counted:
+    """Stage mixin counting how often each stage class runs on spectra"""
+
+    calls = Counter()
+
+    def __call__(self, matrix, grid):
+        if len(matrix):
+            Counted.calls[type(self).__name__] += 1
+        return super().__call__(matrix, grid)
+
+
+class CountedCrop(Counted, Crop):
+    pass
+
+
+class CountedBaseline(Counted, Baseline):
+    pass
+
+
+class CountedNormalize(Counted, Normalize):
+    pass
+
+
+def test_library_rebuild_reuses_stages(synthetic_spectra, grid):
+    """Test rebuilding a library with only the last stage changed reuses
+    the cached outputs of the earlier stages"""
+    Counted.calls.clear()
+    spectra = [(x, y) for _, x, y in synthetic_spectra]
+    pipeline = Pipeline(
+        [CountedCrop(200.0), CountedBaseline(2), CountedNormalize("max")]
+    )
+    library = SpectralLibrary(grid=grid, preprocess=pipeline)
+    library.add_many(spectra)
+    rebuilt = SpectralLibrary(
+        grid=grid, preprocess=pipeline.replace(2, CountedNormalize("l2"))
+    )
+    rebuilt.add_many(spectra)
+    assert Counted.calls == {
+        "CountedCrop": 1, "CountedBaseline": 1, "CountedNormalize": 2
+    }
+    np.testing.assert_allclose(rebuilt.matrix, library.matrix, atol=1e-12)
+
+    # Queries are not cached
+    library.search(spectra[0], k=1)
+    library.search(spectra[0], k=1)
+    assert Counted.calls["CountedCrop"] == 3
+
+
+def test_config():
+    pipeline = Pipeline([Crop(stop=1000.0), SavitzkyGolay(7, 2)])
+    config = pipeline.config()
+    assert config[0] == ["Crop", {"start": None, "stop": 1000.0}]
+    assert Pipeline.from_config(config).stages == pipeline.stages
+    with pytest.raises(UnknownStageException):
+        Pipeline.from_config([["Foo", {}]])
+
+
+def test_library_preprocess(synthetic_spectra, grid, tmp_path):
+    """Test references and queries go through the library pipeline"""
+    pipeline = Pipeline([Crop(200.0, 1300.0), SavitzkyGolay(7, 2)])
+    library = SpectralLibrary(grid=grid, preprocess=pipeline)
+    assert library.grid[0] == 200.0 and library.grid[-1] == 1300.0
+    for key, x, y in synthetic_spectra:
+        library.add((x, y + 0.2 * y.max()), key=key)
+    assert library.matrix.shape == (50, 1101)
+
+    key, x, y = synthetic_spectra[11]
+    assert library.search((x, y), k=1)[0].key == key
+
+    filename = tmp_path / "library.ssmlib"
+    write_snapshot(filename, library)
+    snapshot = open_snapshot(filename)
+    assert snapshot.preprocess.stages == pipeline.stages
+    np.testing.assert_array_equal(snapshot.grid, library.grid)
+    np.testing.assert_array_equal(snapshot.resampler.grid, grid)
+    assert snapshot.search((x, y), k=3) == library.search((x, y), k=3)
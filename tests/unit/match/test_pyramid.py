@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+
+"""Tests for coarse-to-fine pyramid matching."""
+
+import numpy as np
+import pytest
+
+from ssm_client.match import PyramidIndex, SpectralLibrary
+from ssm_client.match.pyramid import pool
+
+
+@pytest.fixture
+def library(synthetic_spectra):
+    library = SpectralLibrary(grid=np.arange(100.0, 1400.0, 1.0))
+    for key, x, y in synthetic_spectra:
+        library.add((x, y), key=key)
+    return library
+
+
+def _noisy(x, y, seed):
+    rng = np.random.default_rng(seed)
+    return x, 0.5 * y + rng.normal(0.0, 0.05 * y.max(), size=y.size)
+
+
+def test_pool():
+    matrix = np.arange(10.0).reshape(1, 10)
+    np.testing.assert_allclose(pool(matrix, 4), [[1.5, 5.5, 4.25]])
+    np.testing.assert_array_equal(pool(matrix, 1), matrix)
+
+
+def test_build(library):
+    index = PyramidIndex(library, levels=2, factor=4).build()
+    shapes = [prepared.shape for _, prepared, _ in index.pyramid]
+    assert shapes == [(50, 82), (50, 325)]
+    assert index.nbytes < library.matrix.nbytes / 3
+
+
+@pytest.mark.parametrize("metric", ["cosine", "pearson", "euclidean"])
+def test_top1_accuracy(library, synthetic_spectra, metric):
+    """Test pyramid top hits agree with exhaustive search"""
+    index = PyramidIndex(library, metric=metric, levels=2, factor=4)
+    for i, (_, x, y) in enumerate(synthetic_spectra):
+        query = _noisy(x, y, seed=i)
+        matches = index.search(query, k=1, min_candidates=5)
+        expected = library.search(query, k=1, metric=metric)
+        assert matches[0].key == expected[0].key
+        assert matches[0].score == pytest.approx(expected[0].score, 1e-5)
+
+
+def test_euclidean_lower_bound(library, synthetic_spectra):
+    """Test coarse euclidean distances never exceed the exact ones"""
+    index = PyramidIndex(library, metric="euclidean").build()
+    query = library.prepare_query(_noisy(*synthetic_spectra[0][1:], 0))
+    exact = np.linalg.norm(library.matrix - query, axis=1)
+    for factor, prepared, _ in index.pyramid:
+        coarse_query = index._coarse(query, factor)
+        coarse = np.linalg.norm(prepared - coarse_query, axis=1)
+        assert np.all(coarse <= exact + 1e-4)
+
+
+def test_keep_all(library, synthetic_spectra):
+    """Test keeping every candidate gives the exhaustive results"""
+    index = PyramidIndex(library, keep=1.0)
+    query = _noisy(*synthetic_spectra[3][1:], 3)
+    matches = index.search(query, k=10)
+    expected = library.search(query, k=10)
+    assert [m.key for m in matches] == [m.key for m in expected]
+
+
+@pytest.mark.parametrize("metric", ["cosine", "euclidean"])
+def test_update_after_add(library, synthetic_spectra, metric):
+    """Test entries added after the build are searchable"""
+    index = PyramidIndex(library, metric=metric).build()
+    _, x, y = synthetic_spectra[0]
+    library.add((x[::-1], y[::-1] ** 2), key="new")
+    assert index.stale
+    assert index.search((x[::-1], y[::-1] ** 2), k=1)[0].key == "new"
+    assert not index.stale
+
+    rebuilt = PyramidIndex(library, metric=metric).build()
+    for (_, prepared, norms), (_, expected, expected_norms) in zip(
+        index.pyramid, rebuilt.pyramid
+    ):
+        np.testing.assert_allclose(prepared, expected)
+        if expected_norms is not None:
+            np.testing.assert_allclose(norms, expected_norms)
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+
+"""Tests for reduced-precision library storage with exact rerank."""
+
+import numpy as np
+import pytest
+
+from ssm_client.match import (
+    QuantizedIndex,
+    SpectralLibrary,
+    open_snapshot,
+    write_snapshot,
+)
+from ssm_client.match.ann import IndexMismatchException
+from ssm_client.match.quantize import (
+    UnsupportedPrecisionException,
+    dequantize,
+    quantize,
+)
+
+
+@pytest.fixture
+def library(synthetic_spectra):
+    library = SpectralLibrary(grid=np.arange(100.0, 1400.0, 1.0))
+    for key, x, y in synthetic_spectra:
+        library.add((x, y), key=key)
+    return library
+
+
+def _queries(synthetic_spectra):
+    rng = np.random.default_rng(0)
+    return [
+        (x, 0.5 * y + rng.normal(0.0, 0.05 * y.max(), size=y.size))
+        for _, x, y in synthetic_spectra[::2]
+    ]
+
+
+@pytest.mark.parametrize("precision", ["int8", "float16"])
+def test_quantize(precision):
+    rng = np.random.default_rng(0)
+    matrix = rng.normal(size=(20, 300)).astype(np.float32)
+    matrix[3] = 0.0
+    codes, scales = quantize(matrix, precision)
+    assert codes.dtype == np.dtype(precision)
+    assert scales.dtype == np.float32
+    error = np.abs(dequantize(codes, scales) - matrix).max(axis=1)
+    bound = np.abs(matrix).max(axis=1) * (0.5 / 127 + 1e-6)
+    assert np.all(error <= bound)
+    np.testing.assert_array_equal(dequantize(codes, scales)[3], 0.0)
+
+    with pytest.raises(UnsupportedPrecisionException):
+        quantize(matrix, "int4")
+
+
+@pytest.mark.parametrize("precision", ["int8", "float16"])
+@pytest.mark.parametrize("metric", ["cosine", "pearson", "euclidean"])
+def test_search(library, synthetic_spectra, metric, precision):
+    """Test reranked results match an exact search"""
+    index = QuantizedIndex(library, metric=metric, precision=precision)
+    index.build(block_size=7)
+    assert index.codes.shape == library.matrix.shape
+    assert index.nbytes < library.matrix.nbytes / (
+        3 if precision == "int8" else 1.9
+    )
+
+    queries = _queries(synthetic_spectra)
+    expected = library.search_batch(queries, k=5, metric=metric)
+    results = index.search_batch(queries, k=5, memory_budget=4 * 1300 * 9)
+    for matches, reference in zip(results, expected):
+        assert [m.key for m in matches] == [m.key for m in reference]
+        np.testing.assert_allclose(
+            [m.score for m in matches], [m.score for m in reference],
+            rtol=1e-5, atol=1e-4,
+        )
+    assert index.search(queries[0], k=1)[0].key == "ref-0"
+
+
+def test_rebuild_after_add(library, synthetic_spectra):
+    """Test entries added after the build are coded before a search"""
+    index = QuantizedIndex(library).build()
+    _, x, y = synthetic_spectra[0]
+    library.add((x[::-1], y[::-1] ** 2), key="new")
+    assert index.stale
+    assert index.search((x[::-1], y[::-1] ** 2), k=1)[0].key == "new"
+    assert not index.stale
+    assert len(index.codes) == len(library)
+
+
+def test_rerank_from_snapshot(library, synthetic_spectra, tmp_path):
+    """Test candidates are reranked against the memory-mapped snapshot"""
+    filename = tmp_path / "library.ssmlib"
+    write_snapshot(filename, library, prepared_metrics=["cosine"])
+    snapshot = open_snapshot(filename)
+
+    index = QuantizedIndex(snapshot).build()
+    index.save(tmp_path / "index.npz")
+    loaded = QuantizedIndex.load(tmp_path / "index.npz", snapshot)
+    np.testing.assert_array_equal(loaded.codes, index.codes)
+    assert loaded.precision == "int8"
+
+    queries = _queries(synthetic_spectra)
+    expected = library.search_batch(queries, k=3)
+    for matches, reference in zip(loaded.search_batch(queries, k=3),
+                                  expected):
+        assert [m.key for m in matches] == [m.key for m in reference]
+        np.testing.assert_allclose(
+            [m.score for m in matches], [m.score for m in reference],
+            rtol=1e-5,
+        )
+
+    with pytest.raises(IndexMismatchException):
+        QuantizedIndex.load(tmp_path / "index.npz", SpectralLibrary())
+
+
+def test_resident_memory(library, synthetic_spectra, tmp_path):
+    """Test only the codes are resident for a snapshot library"""
+    in_memory = QuantizedIndex(library).build()
+    resident = library.matrix.nbytes + in_memory.nbytes
+    assert in_memory.resident_nbytes >= resident
+
+    filename = tmp_path / "library.ssmlib"
+    write_snapshot(filename, library)
+    index = QuantizedIndex.from_snapshot(filename)
+    assert isinstance(index.library.matrix, np.memmap)
+    assert index.resident_nbytes == index.nbytes
+    assert index.nbytes < library.matrix.nbytes / 3
+
+    queries = _queries(synthetic_spectra)
+    expected = library.search_batch(queries, k=3)
+    for matches, reference in zip(index.search_batch(queries, k=3), expected):
+        assert [m.key for m in matches] == [m.key for m in reference]
+    # Reranking reads candidate rows without loading the library
+    assert index.resident_nbytes == index.nbytes
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+
+"""Tests for cached batch resampling onto a common grid."""
+
+import numpy as np
+import pytest
+
+from ssm_client.match.resample import (
+    Resampler,
+    UnsupportedInterpolationException,
+    axis_signature,
+)
+
+
+@pytest.fixture
+def grid():
+    return np.arange(100.0, 1300.0, 2.0)
+
+
+def test_linear_matches_numpy(grid, synthetic_spectra):
+    """Test linear resampling of descending axes matches np.interp"""
+    resampler = Resampler(grid)
+    xs = [x for _, x, _ in synthetic_spectra]
+    ys = [y for _, _, y in synthetic_spectra]
+    result = resampler.resample_batch(xs, ys)
+    assert result.shape == (len(xs), grid.size)
+    for x, y, row in zip(xs, ys, result):
+        target = np.interp(grid, x[::-1], y[::-1], left=0.0, right=0.0)
+        np.testing.assert_allclose(row, target, atol=1e-10)
+
+
+def test_out_of_range_is_zero():
+    """Test grid values outside the source axis are zero"""
+    resampler = Resampler(np.array([0.0, 1.5, 2.5, 10.0]))
+    row = resampler.resample(np.array([1.0, 2.0, 3.0]), np.ones(3))
+    np.testing.assert_array_equal(row, [0.0, 1.0, 1.0, 0.0])
+
+
+@pytest.mark.parametrize("method", ["linear", "cubic"])
+def test_single_point_axis(method):
+    """Test a 1-point axis gives its value at its own x, as np.interp"""
+    grid = np.array([0.0, 1.5, 2.5])
+    resampler = Resampler(grid, method=method)
+    row = resampler.resample(np.array([1.5]), np.array([4.0]))
+    target = np.interp(grid, [1.5], [4.0], left=0.0, right=0.0)
+    np.testing.assert_array_equal(row, target)
+
+
+@pytest.mark.parametrize("method", ["linear", "cubic"])
+def test_empty_axis(method):
+    """Test an empty axis resamples to zeros"""
+    resampler = Resampler(np.array([0.0, 1.5, 2.5]), method=method)
+    rows = resampler.resample_batch(
+        [np.empty(0), np.array([0.0, 2.5])], [np.empty(0), np.ones(2)]
+    )
+    np.testing.assert_array_equal(rows, [[0.0, 0.0, 0.0], [1.0, 1.0, 1.0]])
+
+
+def test_cubic_is_exact_for_cubics():
+    """Test cubic interpolation reproduces a cubic on an uneven axis"""
+    x = np.sort(np.random.default_rng(0).uniform(0.0, 10.0, size=40))
+    grid = np.linspace(x[2], x[-3], 101)
+    resampler = Resampler(grid, method="cubic")
+    row = resampler.resample(x, x**3 - 2.0 * x)
+    np.testing.assert_allclose(row, grid**3 - 2.0 * grid, atol=1e-8)
+
+
+def test_tables_are_cached(grid, synthetic_spectra):
+    """Test spectra sharing an axis compute their tables only once"""
+    _, x, y = synthetic_spectra[0]
+    resampler = Resampler(grid)
+    resampler.resample_batch([x, x, x], [y, 2 * y, 3 * y])
+    assert resampler.misses == 1
+    resampler.resample(x.copy(), y)
+    assert resampler.misses == 1
+    assert resampler.hits == 1
+    assert axis_signature(x) == axis_signature(x.copy())
+    assert axis_signature(x) != axis_signature(x[1:])
+
+
+def test_cache_size_is_bounded(grid, synthetic_spectra):
+    resampler = Resampler(grid, max_cache_size=2)
+    for _, x, y in synthetic_spectra[:5]:
+        resampler.resample(x, y)
+    assert len(resampler._cache) == 2
+
+
+def test_unsupported_method(grid):
+    with pytest.raises(UnsupportedInterpolationException):
+        Resampler(grid, method="spline")
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+
+"""Tests for multi-process sharded spectral search."""
+
+import numpy as np
+import pytest
+
+from ssm_client.match import (
+    ShardedSearch,
+    SpectralLibrary,
+    open_snapshot,
+    write_snapshot,
+)
+
+
+@pytest.fixture
+def library(synthetic_spectra):
+    library = SpectralLibrary(grid=np.arange(100.0, 1400.0, 1.0))
+    for key, x, y in synthetic_spectra:
+        library.add((x, y), key=key, metadata={"title": key})
+    return library
+
+
+def _queries(synthetic_spectra):
+    rng = np.random.default_rng(0)
+    return [
+        (x, 0.5 * y + rng.normal(0.0, 0.05 * y.max(), size=y.size))
+        for _, x, y in synthetic_spectra[::3]
+    ]
+
+
+def _assert_same(results, expected):
+    assert len(results) == len(expected)
+    for matches, reference in zip(results, expected):
+        assert [m.key for m in matches] == [m.key for m in reference]
+        assert [m.index for m in matches] == [m.index for m in reference]
+        np.testing.assert_allclose(
+            [m.score for m in matches], [m.score for m in reference],
+            rtol=1e-5, atol=1e-4,
+        )
+
+
+@pytest.mark.parametrize("metric", ["cosine", "euclidean"])
+def test_shared_memory(library, synthetic_spectra, metric):
+    """Test sharded search over shared memory matches a local search"""
+    queries = _queries(synthetic_spectra)
+    expected = library.search_batch(queries, k=5, metric=metric)
+    with ShardedSearch(library, metric=metric, processes=2, n_shards=3) as s:
+        assert s._block is not None
+        assert [stop - start for start, stop in s.shards] == [16, 17, 17]
+        _assert_same(s.search_batch(queries, k=5), expected)
+        match = s.search(queries[0], k=1)[0]
+        assert match.key == "ref-0"
+        assert match.metadata == {"title": "ref-0"}
+    assert s._block is None
+
+
+def test_snapshot(library, synthetic_spectra, tmp_path):
+    """Test workers memory-map a snapshot storing the prepared matrix"""
+    filename = tmp_path / "library.ssmlib"
+    write_snapshot(filename, library, prepared_metrics=["pearson"])
+    snapshot = open_snapshot(filename)
+
+    queries = _queries(synthetic_spectra)
+    expected = library.search_batch(queries, k=3, metric="pearson")
+    with ShardedSearch(snapshot, metric="pearson", processes=2) as s:
+        assert s._block is None
+        _assert_same(s.search_batch(queries, k=3), expected)
+
+    # Without a stored prepared matrix the library goes to shared memory
+    with ShardedSearch(snapshot, metric="cosine", processes=1) as s:
+        assert s._block is not None
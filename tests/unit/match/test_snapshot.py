@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+
+"""Tests for memory-mapped spectral library snapshots."""
+
+import numpy as np
+import pytest
+
+from ssm_client.match import SpectralLibrary, open_snapshot, write_snapshot
+from ssm_client.match.snapshot import InvalidSnapshotException, read_header
+
+
+@pytest.fixture
+def library(synthetic_spectra):
+    library = SpectralLibrary(grid=np.arange(100.0, 1400.0, 1.0))
+    for i, (key, x, y) in enumerate(synthetic_spectra):
+        library.add((x, y), key=key, metadata={"title": f"mineral {i}"})
+    return library
+
+
+def test_round_trip(library, synthetic_spectra, tmp_path):
+    """Test a snapshot reproduces the library and its search results"""
+    filename = tmp_path / "library.ssmlib"
+    write_snapshot(filename, library, prepared_metrics=["cosine", "euclidean"])
+
+    header = read_header(filename)
+    assert header["dtype"] == "<f4"
+    for section in header["sections"].values():
+        assert section["offset"] % 4096 == 0
+
+    snapshot = open_snapshot(filename)
+    assert snapshot.filename == str(filename)
+    assert isinstance(snapshot.matrix, np.memmap)
+    np.testing.assert_array_equal(snapshot.matrix, library.matrix)
+    np.testing.assert_array_equal(snapshot.grid, library.grid)
+    assert snapshot.keys == library.keys
+    assert len(snapshot.metadata) == len(library)
+    assert snapshot.metadata[3] == {"title": "mineral 3"}
+    assert snapshot.metadata[-1] == {"title": "mineral 49"}
+    assert snapshot.index_of("ref-7") == 7
+
+    _, x, y = synthetic_spectra[7]
+    for metric in ["cosine", "pearson", "euclidean"]:
+        expected = library.search((x, y), k=4, metric=metric)
+        assert snapshot.search((x, y), k=4, metric=metric) == expected
+
+    prepared, _ = snapshot._prepared_matrix("cosine")
+    assert isinstance(prepared, np.memmap)
+
+
+def test_append_after_open(library, synthetic_spectra, tmp_path):
+    """Test a snapshot library can still grow in memory"""
+    filename = tmp_path / "library.ssmlib"
+    write_snapshot(filename, library)
+    snapshot = open_snapshot(filename)
+
+    _, x, y = synthetic_spectra[0]
+    index = snapshot.add((x, 2 * y), key="new", metadata={"title": "new"})
+    assert index == len(library)
+    assert snapshot.metadata[index] == {"title": "new"}
+    assert snapshot.matrix.shape[0] == len(library) + 1
+
+
+def test_empty_library(tmp_path):
+    filename = tmp_path / "empty.ssmlib"
+    write_snapshot(filename, SpectralLibrary())
+    snapshot = open_snapshot(filename)
+    assert len(snapshot) == 0
+    assert snapshot.matrix.shape == (0, snapshot.grid.size)
+
+
+def test_invalid_snapshot(tmp_path):
+    filename = tmp_path / "bad.ssmlib"
+    filename.write_bytes(b"not a snapshot at all")
+    with pytest.raises(InvalidSnapshotException):
+        open_snapshot(filename)
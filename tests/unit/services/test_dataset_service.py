@@ -2,12 +2,19 @@
 
 """Tests for DatasetService package."""
 
+import copy
+
+import numpy as np
 import pytest
 import requests
 
+from ssm_client import SSMRester, Spectrum
 from ssm_client.containers import CollectionContainer
 from ssm_client.services import DatasetService
-from ssm_client.services.dataset_service import MismatchedCollectionException
+from ssm_client.services.dataset_service import (
+    MismatchedCollectionException,
+    UnsupportedDatasetFormatException,
+)
 
 
 @pytest.fixture
@@ -196,3 +203,157 @@ def test_delete(
     requests_mock.get(dataset_service._endpoint(dataset.uuid), status_code=404)
     with pytest.raises(requests.HTTPError):
         dataset_service.get_by_uuid(dataset.uuid)
+
+
+def test_get_datasets(dataset_uuid, dataset_service, requests_mock):
+    """Test listing the datasets of a collection"""
+    requests_mock.get(dataset_service._endpoint(), json=[dataset_uuid])
+    assert dataset_service.get_datasets() == [dataset_uuid]
+    assert requests_mock.last_request.qs == {}
+
+    dataset_service.get_datasets(page_number=2, page_size=10)
+    assert requests_mock.last_request.qs == {
+        "pagenumber": ["2"],
+        "pagesize": ["10"],
+    }
+
+
+def test_listeners(
+    dataset_input, dataset_output, dataset_uuid, dataset_service, requests_mock
+):  # noqa: F811, E501
+    """Test listeners are notified of changes made through the service"""
+    json = {"uuid": dataset_uuid, "dataset": dataset_output}
+    events = []
+
+    def _listener(event, uuid, dataset):
+        events.append((event, uuid, dataset))
+
+    dataset_service.add_listener(_listener)
+    requests_mock.post(dataset_service._endpoint(), json=json)
+    requests_mock.put(dataset_service._endpoint(dataset_uuid), json=json)
+    requests_mock.patch(dataset_service._endpoint(dataset_uuid), json=json)
+    requests_mock.delete(dataset_service._endpoint(dataset_uuid))
+
+    created = dataset_service.create(dataset_input)
+    dataset_service.replace_dataset_for_uuid(dataset_uuid, dataset_input)
+    dataset_service.update_dataset_for_uuid(dataset_uuid, dataset_input)
+    dataset_service.delete_by_uuid(dataset_uuid)
+    assert [e[0] for e in events] == ["create", "replace", "update", "delete"]
+    assert {e[1] for e in events} == {dataset_uuid}
+    assert events[0][2] == created
+    assert events[3][2] is None
+
+    # Failed requests and removed listeners are not notified
+    dataset_service.remove_listener(_listener)
+    dataset_service.delete_by_uuid(dataset_uuid)
+    assert len(events) == 4
+
+
+def test_read_as_spectrum(
+    metazeunerite_jsonld, dataset_uuid, dataset_service, requests_mock
+):
+    """Test read dataset as a Spectrum"""
+    json = {"uuid": dataset_uuid, "dataset": metazeunerite_jsonld}
+    requests_mock.get(dataset_service._endpoint(dataset_uuid), json=json)
+    spectrum = dataset_service.get_by_uuid(dataset_uuid, as_spectrum=True)
+    assert isinstance(spectrum, Spectrum)
+    assert spectrum.metadata["uuid"] == dataset_uuid
+    assert spectrum.uid == "rruff:R050524"
+
+    # SSM JSON has no dataseries: rejected before any request is sent
+    n_requests = len(requests_mock.request_history)
+    with pytest.raises(UnsupportedDatasetFormatException):
+        dataset_service.get_by_uuid(
+            dataset_uuid, format="json", as_spectrum=True
+        )
+    assert len(requests_mock.request_history) == n_requests
+
+
+def test_update_dataset_for_uuid_with_base(
+    mock_server, metazeunerite_jsonld, requests_mock
+):
+    """Test updating a dataset with a minimal patch from its base"""
+    requests_mock.real_http = True
+    rester = SSMRester(hostname=mock_server.base_url)
+    collection = rester.collection.create("patch")
+    rester.initialize_dataset_for_collection(collection)
+    dataset = rester.dataset.create(metazeunerite_jsonld)
+
+    new = copy.deepcopy(dataset.dataset)
+    new["@graph"]["title"] = "Metazeunerite (corrected)"
+    del new["@graph"]["publisher"]
+
+    history = requests_mock.request_history
+    updated = rester.dataset.update_dataset_for_uuid(
+        dataset.uuid, new, base=dataset.dataset
+    )
+    assert history[-1].json() == {
+        "@graph": {"title": "Metazeunerite (corrected)", "publisher": None}
+    }
+    assert updated.dataset == new
+    assert rester.dataset.get_by_uuid(dataset.uuid).dataset == new
+
+    # Nothing is sent when nothing changed, listeners still hear of it
+    events = []
+    rester.dataset.add_listener(lambda *event: events.append(event))
+    n_requests = len(history)
+    unchanged = rester.dataset.update_dataset_for_uuid(
+        dataset.uuid, new, base=copy.deepcopy(new)
+    )
+    assert len(history) == n_requests
+    assert unchanged.dataset == new
+    assert events == [("update", dataset.uuid, unchanged)]
+
+
+def test_update_dataset_for_uuid_with_arrays(
+    mock_server, metazeunerite_jsonld, requests_mock
+):
+    """Test patching data arrays held as NumPy arrays"""
+    requests_mock.real_http = True
+    rester = SSMRester(hostname=mock_server.base_url)
+    collection = rester.collection.create("patch arrays")
+    rester.initialize_dataset_for_collection(collection)
+    dataset = rester.dataset.create(metazeunerite_jsonld)
+
+    new = copy.deepcopy(dataset.dataset)
+    dataseries = new["@graph"]["scidata"]["dataset"]["dataseries"]
+    parameter = dataseries[0]["parameter"][1]
+    y = 2.0 * np.asarray(parameter["dataarray"], dtype=np.float64)
+    parameter["dataarray"] = y
+
+    rester.dataset.update_dataset_for_uuid(
+        dataset.uuid, new, base=dataset.dataset
+    )
+    request = requests_mock.request_history[-1]
+    assert request.headers["Content-Type"] == "application/json"
+    assert list(request.json()["@graph"]) == ["scidata"]
+
+    stored = rester.dataset.get_by_uuid(dataset.uuid).dataset
+    dataseries = stored["@graph"]["scidata"]["dataset"]["dataseries"]
+    assert dataseries[0]["parameter"][1]["dataarray"] == y.tolist()
+
+
+def test_iter_datasets(mock_server, metazeunerite_jsonld):
+    """Test fetching datasets in order with bounded lookahead"""
+    rester = SSMRester(hostname=mock_server.base_url)
+    collection = rester.collection.create("iter")
+    rester.initialize_dataset_for_collection(collection)
+    uuids = [rester.dataset.create(metazeunerite_jsonld).uuid for _ in "abcde"]
+
+    datasets = rester.dataset.iter_datasets(max_workers=2, lookahead=2)
+    assert [dataset.uuid for dataset in datasets] == uuids
+
+    datasets = rester.dataset.iter_datasets(uuids[::-1], max_workers=3)
+    assert [dataset.uuid for dataset in datasets] == uuids[::-1]
+
+
+def test_create_many(mock_server, metazeunerite_jsonld):
+    """Test creating datasets concurrently from a stream"""
+    rester = SSMRester(hostname=mock_server.base_url)
+    collection = rester.collection.create("many")
+    rester.initialize_dataset_for_collection(collection)
+
+    datasets = (metazeunerite_jsonld for _ in range(5))
+    uuids = rester.dataset.create_many(datasets, max_workers=2, lookahead=3)
+    assert len(uuids) == 5
+    assert sorted(uuids) == sorted(rester.dataset.get_datasets())
@@ -0,0 +1,22 @@
+"""Tests for store.directory"""
+
+from ssm_client.store import DirectoryStore
+
+
+def test_directory_store(tmp_path, metazeunerite_jsonld):
+    store = DirectoryStore(tmp_path / "mirror")
+    assert len(store) == 0
+    assert store.get("ABC") is None
+
+    store.put("ABC", metazeunerite_jsonld)
+    store.put("DEF", {"title": "def"})
+    assert "ABC" in store
+    assert list(store.uuids()) == ["ABC", "DEF"]
+    assert store.get("ABC") == metazeunerite_jsonld
+    assert not list((tmp_path / "mirror").glob("*.partial"))
+
+    store.put("DEF", {"title": "new"})
+    assert store.get("DEF") == {"title": "new"}
+    store.delete("DEF")
+    store.delete("DEF")
+    assert list(store.uuids()) == ["ABC"]
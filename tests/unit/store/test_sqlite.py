@@ -0,0 +1,156 @@
+"""Tests for store.sqlite"""
+
+import copy
+import json
+import zlib
+
+import numpy as np
+import pytest
+
+from ssm_client import SSMRester, Spectrum
+from ssm_client.containers import DatasetContainer
+from ssm_client.store import SQLiteStore, UnindexedFieldException
+from ssm_client.sync import SyncEngine
+
+
+@pytest.fixture
+def store(metazeunerite_jsonld):
+    store = SQLiteStore()
+    store.ingest([DatasetContainer(uuid="A", dataset=metazeunerite_jsonld)])
+    yield store
+    store.close()
+
+
+def test_get_put_delete(tmp_path, metazeunerite_jsonld):
+    with SQLiteStore(tmp_path / "store.db") as store:
+        assert len(store) == 0
+        assert store.get("A") is None
+        store.put("A", metazeunerite_jsonld)
+        store.put("B", {"@graph": {"title": "no spectrum"}})
+        assert "A" in store
+        assert list(store.uuids()) == ["A", "B"]
+        assert store.get_spectrum("B") is None
+
+    # Persisted across connections
+    with SQLiteStore(tmp_path / "store.db") as store:
+        assert store.get("A") == metazeunerite_jsonld
+        store.delete("A")
+        assert list(store.uuids()) == ["B"]
+        assert store.find(formula="Cu(UO2)2(AsO4)2 · 8H2O") == []
+        assert store.get_spectrum("A") is None
+
+
+def _stored_parameters(store, uuid):
+    sql = "SELECT document FROM datasets WHERE uuid = ?"
+    (document,) = store._query(sql, [uuid])[0]
+    document = json.loads(zlib.decompress(document))
+    dataseries = document["@graph"]["scidata"]["dataset"]["dataseries"]
+    return dataseries[0]["parameter"]
+
+
+def test_arrays_kept_as_blobs(metazeunerite_jsonld):
+    """Test the x/y arrays are only stored as blobs when they restore
+    exactly"""
+    inexact = copy.deepcopy(metazeunerite_jsonld)
+    dataseries = inexact["@graph"]["scidata"]["dataset"]["dataseries"]
+    dataseries[0]["parameter"][0]["dataarray"][0] = "87.219060"
+
+    with SQLiteStore() as store:
+        store.put("A", metazeunerite_jsonld)
+        store.put("B", inexact)
+        parameters = _stored_parameters(store, "A")
+        assert [p.get("dataarray") for p in parameters] == [None, None]
+        assert store.get("A") == metazeunerite_jsonld
+
+        x, y = [p.get("dataarray") for p in _stored_parameters(store, "B")]
+        assert x[0] == "87.219060" and y is None
+        assert store.get("B") == inexact
+
+
+def test_ingest_without_uid():
+    with SQLiteStore() as store:
+        with pytest.warns(UserWarning):
+            store.ingest([{"@graph": {"title": "no uid"}}])
+        assert len(store) == 0
+
+
+def test_ndarray_round_trip(metazeunerite_jsonld):
+    spectrum = Spectrum.from_scidata(metazeunerite_jsonld)
+    document = spectrum.to_scidata()
+    assert isinstance(document["@graph"]["scidata"], dict)
+    with SQLiteStore() as store:
+        store.put("A", document)
+        stored = store.get("A")
+        assert store.metadata("A")["digest"] == DatasetContainer(
+            dataset=document
+        ).digest
+    restored = Spectrum.from_scidata(stored)
+    np.testing.assert_array_equal(restored.x, spectrum.x)
+    np.testing.assert_array_equal(restored.y, spectrum.y)
+
+
+def test_lookup(store):
+    assert store.lookup("uid", "rruff:R050524") == ["A"]
+    assert store.lookup("title", "METAZEUNERITE") == ["A"]
+    assert store.lookup("technique", "raman spectroscopy") == ["A"]
+    assert store.lookup("crystal system", "Tetragonal") == ["A"]
+    assert store.lookup("title", "soddyite") == []
+    with pytest.raises(UnindexedFieldException):
+        store.lookup("atoms", "U")
+
+    metadata = store.metadata("A")
+    assert metadata["crystal system"] == "tetragonal"
+    assert metadata["technique"] == "Raman Spectroscopy"
+    assert len(metadata["digest"]) == 64
+    assert store.metadata("B") is None
+
+
+def test_facets(store, metazeunerite_jsonld):
+    facets = store.facets("A")
+    assert facets["atoms"] == ["U", "H2O", "AsO4", "Cu"]
+    assert facets["technique"] == ["Raman Spectroscopy"]
+
+    assert store.find(atoms="h2o", **{"crystal system": "TETRAGONAL"}) == [
+        "A"
+    ]
+    assert store.find(atoms="h2o", technique="xrd") == []
+    assert store.find() == ["A"]
+
+    expected = {"AsO4": 1, "Cu": 1, "H2O": 1, "U": 1}
+    assert store.facet_counts("atoms") == expected
+    store.ingest([{"@graph": {"uid": "test:1"}}])
+    assert store.facet_counts("atoms") == expected
+    store.put("C", metazeunerite_jsonld)
+    expected = {value: 2 for value in expected}
+    assert store.facet_counts("atoms") == expected
+
+
+def test_get_spectrum(store, metazeunerite_jsonld):
+    spectrum = store.get_spectrum("A")
+    expected = Spectrum.from_scidata(metazeunerite_jsonld)
+    np.testing.assert_array_equal(spectrum.x, expected.x)
+    np.testing.assert_array_equal(spectrum.y, expected.y)
+    assert spectrum.x_units == "1/cm"
+    assert spectrum.metadata["uuid"] == "A"
+
+
+def test_ingest_files(raman_soddyite_rruff):
+    with SQLiteStore() as store:
+        store.ingest_files([raman_soddyite_rruff], ioformat="rruff")
+        assert store.lookup("uid", "rruff:R060361") == ["rruff:R060361"]
+
+
+def test_sync_into_store(mock_server, metazeunerite_jsonld):
+    rester = SSMRester(hostname=mock_server.base_url)
+    collection = rester.collection.create("sqlite")
+    rester.initialize_dataset_for_collection(collection)
+    uuid = rester.dataset.create(metazeunerite_jsonld).uuid
+
+    with SQLiteStore() as store:
+        store.ingest_service(rester.dataset)
+        assert list(store.uuids()) == [uuid]
+        store.delete(uuid)
+
+        result = SyncEngine(rester.dataset, store).sync()
+        assert result.created == [uuid]
+        assert store.get(uuid) == metazeunerite_jsonld
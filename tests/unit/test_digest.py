@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+
+"""Tests for content digests."""
+
+import json
+
+import numpy as np
+import pytest
+
+from ssm_client.digest import canonical_json, content_digest, json_default
+
+
+def test_canonical_json():
+    assert canonical_json({"b": 1, "a": [1.5, "µ"]}) == (
+        '{"a":[1.5,"µ"],"b":1}'.encode("utf-8")
+    )
+    assert canonical_json({"a": np.float32(0.5), "b": np.int64(3)}) == (
+        b'{"a":0.5,"b":3}'
+    )
+    with pytest.raises(TypeError):
+        canonical_json({"a": object()})
+
+
+def test_content_digest():
+    """Test digests ignore key order but not values, dtypes or shapes"""
+    a = {"x": [1, 2], "meta": {"u": "cm-1", "t": 1}}
+    b = {"meta": {"t": 1, "u": "cm-1"}, "x": [1, 2]}
+    assert content_digest(a) == content_digest(b)
+    assert content_digest(a) != content_digest({"x": [1, 3]})
+
+    x = np.arange(6.0)
+    assert content_digest({"x": x}) == content_digest({"x": x.copy()})
+    assert content_digest({"x": x}) != content_digest({"x": x[::-1]})
+    assert content_digest({"x": x}) != content_digest({"x": x.reshape(2, 3)})
+    assert content_digest({"x": x}) != content_digest(
+        {"x": x.astype(np.float32)}
+    )
+
+
+def test_json_default():
+    document = {"x": np.arange(3), "n": np.float32(0.5)}
+    encoded = json.dumps(document, default=json_default)
+    assert json.loads(encoded) == {"x": [0, 1, 2], "n": 0.5}
+    with pytest.raises(TypeError):
+        json.dumps({"s": {1}}, default=json_default)
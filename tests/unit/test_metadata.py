@@ -0,0 +1,15 @@
+"""Tests for metadata"""
+
+from ssm_client.metadata import facets_from_scidata, technique_from_scidata
+
+
+def test_facets_from_scidata(metazeunerite_jsonld):
+    facets = facets_from_scidata(metazeunerite_jsonld)
+    assert facets["crystal system"] == ["tetragonal"]
+    assert facets["atoms"] == ["U", "H2O", "AsO4", "Cu"]
+    assert facets_from_scidata({}) == {}
+
+
+def test_technique_from_scidata(metazeunerite_jsonld):
+    assert technique_from_scidata(metazeunerite_jsonld) == "Raman Spectroscopy"
+    assert technique_from_scidata({}) is None
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+
+"""Tests for the in-process mock SSM Catalog API server."""
+
+import time
+
+import pytest
+import requests
+
+from ssm_client import SSMRester
+
+
+@pytest.fixture
+def ssm_rester(mock_server):
+    return SSMRester(hostname=mock_server.base_url)
+
+
+def test_collection_round_trip(ssm_rester):
+    """Test creating, reading and deleting a collection over HTTP"""
+    collection = ssm_rester.collection.create("Foo")
+    assert collection.title == "foo"
+    assert ssm_rester.collection.get_collections() == ["foo"]
+    assert ssm_rester.collection.get_by_title("foo") == collection
+
+    ssm_rester.collection.delete_by_title("foo")
+    with pytest.raises(requests.HTTPError):
+        ssm_rester.collection.get_by_title("foo")
+
+
+def test_create_collection_without_title(mock_server):
+    """Test a POST without a body or title is a bad request"""
+    url = f"{mock_server.base_url}/collections"
+    assert requests.post(url).status_code == 400
+    assert requests.post(url, json={}).status_code == 400
+    assert requests.post(url, json=["foo"]).status_code == 400
+    assert requests.post(url, data="{").status_code == 400
+    assert requests.get(url).json() == []
+
+
+def test_dataset_round_trip(ssm_rester, metazeunerite_jsonld):
+    """Test the dataset routes used by DatasetService"""
+    collection = ssm_rester.collection.create("foo")
+    ssm_rester.initialize_dataset_for_collection(collection)
+
+    dataset = ssm_rester.dataset.create(metazeunerite_jsonld)
+    assert len(dataset.uuid) == 64
+    assert ssm_rester.dataset.get_by_uuid(dataset.uuid) == dataset
+
+    updated = ssm_rester.dataset.update_dataset_for_uuid(
+        dataset.uuid, {"@graph": {"title": "bar"}}
+    )
+    assert updated.dataset["@graph"]["title"] == "bar"
+    assert updated.dataset["@graph"]["uid"] == "rruff:R050524"
+
+    ssm_rester.dataset.delete_by_uuid(dataset.uuid)
+    with pytest.raises(requests.HTTPError):
+        ssm_rester.dataset.get_by_uuid(dataset.uuid)
+
+
+def test_error_injection(mock_server, ssm_rester):
+    """Test deterministic and random error injection"""
+    mock_server.fail_next(2, status=500)
+    for _ in range(2):
+        with pytest.raises(requests.HTTPError):
+            ssm_rester.collection.get_collections()
+    assert ssm_rester.collection.get_collections() == []
+
+    mock_server.error_rate = 1.0
+    with pytest.raises(requests.HTTPError):
+        ssm_rester.collection.get_collections()
+    assert mock_server.error_count == 3
+    assert mock_server.request_count == 4
+
+
+def test_latency(mock_server_factory):
+    """Test configurable latency"""
+    server = mock_server_factory(latency=0.05)
+    rester = SSMRester(hostname=server.base_url)
+    start = time.perf_counter()
+    rester.collection.get_collections()
+    assert time.perf_counter() - start >= 0.05
+
+
+def test_throughput_limit(mock_server_factory):
+    """Test configurable throughput limit"""
+    server = mock_server_factory(max_requests_per_second=20)
+    rester = SSMRester(hostname=server.base_url)
+    start = time.perf_counter()
+    for _ in range(30):
+        rester.collection.get_collections()
+    assert time.perf_counter() - start >= 0.4
+
+
+def test_path_prefix(mock_server_factory):
+    """Test mounting the API under a path prefix"""
+    server = mock_server_factory(path_prefix="catalog/api")
+    assert server.base_url.endswith("/catalog/api")
+    rester = SSMRester(hostname=server.base_url)
+    rester.collection.create("foo")
+    assert rester.collection.get_collections() == ["foo"]
+
+
+def test_dataset_listing(ssm_rester):
+    """Test listing and paging through the datasets of a collection"""
+    collection = ssm_rester.collection.create("foo")
+    ssm_rester.initialize_dataset_for_collection(collection)
+    uuids = [ssm_rester.dataset.create({"i": i}).uuid for i in range(5)]
+
+    assert ssm_rester.dataset.get_datasets() == uuids
+    pages = [
+        ssm_rester.dataset.get_datasets(page_number=n, page_size=2)
+        for n in range(3)
+    ]
+    assert pages == [uuids[0:2], uuids[2:4], uuids[4:]]
+
+
+def test_etag(ssm_rester, metazeunerite_jsonld):
+    """Test conditional GETs with If-None-Match"""
+    collection = ssm_rester.collection.create("foo")
+    ssm_rester.initialize_dataset_for_collection(collection)
+    dataset = ssm_rester.dataset.create(metazeunerite_jsonld)
+
+    url = ssm_rester.dataset._endpoint(dataset.uuid)
+    response = requests.get(url)
+    etag = response.headers["ETag"]
+    response = requests.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    ssm_rester.dataset.update_dataset_for_uuid(
+        dataset.uuid, {"@graph": {"title": "bar"}}
+    )
+    response = requests.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
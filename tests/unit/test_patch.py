@@ -0,0 +1,71 @@
+"""Tests for patch"""
+
+import copy
+import json
+
+import numpy as np
+
+from ssm_client.patch import _equal, apply_merge_patch, merge_patch
+
+
+def test_equal():
+    array = np.arange(5.0)
+    assert _equal(array, array.copy())
+    assert not _equal(array, array.astype(np.float32))
+    assert not _equal(array, array.tolist())
+    assert _equal([{"a": array}], [{"a": array.copy()}])
+    assert not _equal([{"a": array}], [{"a": array + 1}])
+    assert not _equal({"a": 1}, {"a": 1, "b": 2})
+    assert not _equal("1", 1)
+
+
+def test_merge_patch_unchanged(metazeunerite_jsonld):
+    assert merge_patch(metazeunerite_jsonld, metazeunerite_jsonld) == {}
+    same = copy.deepcopy(metazeunerite_jsonld)
+    assert merge_patch(metazeunerite_jsonld, same) == {}
+
+
+def test_merge_patch_minimal(metazeunerite_jsonld):
+    new = copy.deepcopy(metazeunerite_jsonld)
+    new["@graph"]["title"] = "Metazeunerite (corrected)"
+    del new["@graph"]["publisher"]
+    new["@graph"]["keywords"] = ["raman"]
+
+    patch = merge_patch(metazeunerite_jsonld, new)
+    assert patch == {
+        "@graph": {
+            "title": "Metazeunerite (corrected)",
+            "publisher": None,
+            "keywords": ["raman"],
+        }
+    }
+    # The data arrays are never part of the patch
+    document = len(json.dumps(metazeunerite_jsonld))
+    assert len(json.dumps(patch)) < document / 100
+    assert apply_merge_patch(metazeunerite_jsonld, patch) == new
+
+
+def test_merge_patch_arrays():
+    x = np.arange(1000.0)
+    old = {"series": {"x": x, "y": x * 2}, "title": "old"}
+    new = {"series": {"x": x, "y": x * 2}, "title": "new"}
+    assert merge_patch(old, new) == {"title": "new"}
+    new["series"]["y"] = x * 3
+    patch = merge_patch(old, new)
+    assert list(patch) == ["series", "title"]
+    assert list(patch["series"]) == ["y"]
+
+
+def test_merge_patch_lists_replaced():
+    old = {"facets": [{"formula": "A"}, {"formula": "B"}]}
+    new = {"facets": [{"formula": "A"}, {"formula": "C"}]}
+    assert merge_patch(old, new) == new
+
+
+def test_apply_merge_patch_copies_path():
+    document = {"a": {"b": 1, "c": {"d": 2}}, "e": [1, 2]}
+    patched = apply_merge_patch(document, {"a": {"b": None, "f": {"g": 3}}})
+    assert patched == {"a": {"c": {"d": 2}, "f": {"g": 3}}, "e": [1, 2]}
+    assert document == {"a": {"b": 1, "c": {"d": 2}}, "e": [1, 2]}
+    assert patched["a"]["c"] is document["a"]["c"]
+    assert patched["e"] is document["e"]
@@ -0,0 +1,84 @@
+"""Tests for spectrum"""
+
+import copy
+import json
+
+import numpy as np
+import pytest
+
+from ssm_client.containers import DatasetContainer
+from ssm_client.match.library import xy_from_scidata
+from ssm_client.spectrum import MissingSpectrumException, Spectrum
+
+
+def test_from_scidata(metazeunerite_jsonld):
+    spectrum = Spectrum.from_scidata(metazeunerite_jsonld)
+    x, y = xy_from_scidata(metazeunerite_jsonld)
+    np.testing.assert_array_equal(spectrum.x, x)
+    np.testing.assert_array_equal(spectrum.y, y)
+    assert spectrum.x.dtype == np.float64
+    assert spectrum.uid == "rruff:R050524"
+    assert spectrum.title == metazeunerite_jsonld["@graph"]["title"]
+    assert spectrum.scidata is metazeunerite_jsonld
+
+
+def test_from_scidata_missing():
+    with pytest.raises(MissingSpectrumException):
+        Spectrum.from_scidata({"@graph": {"title": "empty"}})
+
+
+def test_from_dataset(metazeunerite_jsonld):
+    dataset = DatasetContainer(uuid="abc", dataset=metazeunerite_jsonld)
+    spectrum = Spectrum.from_dataset(dataset)
+    assert spectrum.metadata["uuid"] == "abc"
+
+
+def test_shape_mismatch():
+    with pytest.raises(ValueError):
+        Spectrum([1.0, 2.0], [1.0])
+
+
+def test_round_trip_shares_buffers(metazeunerite_jsonld):
+    original = copy.deepcopy(metazeunerite_jsonld)
+    spectrum = Spectrum.from_scidata(metazeunerite_jsonld)
+    scidata_dict = spectrum.to_scidata()
+
+    # The source document is left untouched and shared off the data path
+    assert metazeunerite_jsonld == original
+    graph = scidata_dict["@graph"]
+    assert graph is not metazeunerite_jsonld["@graph"]
+    assert graph["sources"] is metazeunerite_jsonld["@graph"]["sources"]
+
+    again = Spectrum.from_scidata(scidata_dict)
+    assert np.shares_memory(again.x, spectrum.x)
+    assert np.shares_memory(again.y, spectrum.y)
+    assert again.x_units == spectrum.x_units
+
+
+def test_to_scidata_without_source():
+    x = np.linspace(100.0, 200.0, 11)
+    y = np.arange(11, dtype=np.float64)
+    spectrum = Spectrum(
+        x,
+        y,
+        x_units="1/cm",
+        x_quantity="Wave Numbers",
+        metadata={"title": "line", "uid": "test:1", "uuid": "abc"},
+    )
+    scidata_dict = spectrum.to_scidata()
+    assert scidata_dict["@graph"]["title"] == "line"
+    assert "uuid" not in scidata_dict["@graph"]
+
+    again = Spectrum.from_scidata(scidata_dict)
+    assert again.x is x
+    assert again.y is y
+    assert again.x_units == "1/cm"
+    assert again.x_quantity == "Wave Numbers"
+
+
+def test_to_scidata_as_lists(metazeunerite_jsonld):
+    spectrum = Spectrum.from_scidata(metazeunerite_jsonld)
+    scidata_dict = spectrum.to_scidata(as_lists=True)
+    again = Spectrum.from_scidata(json.loads(json.dumps(scidata_dict)))
+    np.testing.assert_array_equal(again.x, spectrum.x)
+    np.testing.assert_array_equal(again.y, spectrum.y)
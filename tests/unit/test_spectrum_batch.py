@@ -0,0 +1,142 @@
+"""Tests for spectrum_batch"""
+
+import numpy as np
+import pytest
+
+from ssm_client import SSMRester, Spectrum, SpectrumBatch
+from ssm_client.spectrum_batch import _as_spectrum
+
+
+@pytest.fixture
+def batch():
+    spectra = [
+        Spectrum(
+            np.arange(n, dtype=np.float64),
+            np.arange(n, dtype=np.float64) + i,
+            x_units="1/cm",
+            metadata={"title": f"spectrum {i}", "uid": f"test:{i}"},
+        )
+        for i, n in enumerate([3, 0, 5, 2])
+    ]
+    return SpectrumBatch.from_spectra(spectra)
+
+
+def test_from_spectra(batch):
+    assert len(batch) == 4
+    np.testing.assert_array_equal(batch.lengths, [3, 0, 5, 2])
+    np.testing.assert_array_equal(batch.offsets, [0, 3, 3, 8, 10])
+    assert batch.x.size == 10
+    assert list(batch.column("uid")) == [f"test:{i}" for i in range(4)]
+    assert batch.column("uuid")[0] is None
+    assert batch.nbytes == 2 * 10 * 8 + 5 * 8
+
+
+def test_from_spectra_empty():
+    batch = SpectrumBatch.from_spectra([])
+    assert len(batch) == 0
+    assert list(batch) == []
+
+
+def test_from_spectra_inputs(metazeunerite_jsonld):
+    batch = SpectrumBatch.from_spectra(
+        [metazeunerite_jsonld, ([1.0, 2.0], [3.0, 4.0])]
+    )
+    assert batch.column("uid")[0] == "rruff:R050524"
+    assert batch.column("x_units")[0] == "1/cm"
+    np.testing.assert_array_equal(batch[1].y, [3.0, 4.0])
+
+
+def test_mismatched_lengths():
+    with pytest.raises(ValueError):
+        SpectrumBatch(np.zeros(3), np.zeros(3), [0, 2])
+    with pytest.raises(ValueError):
+        SpectrumBatch(np.zeros(3), np.zeros(3), [0, 3], {"title": []})
+
+
+def test_getitem_int(batch):
+    spectrum = batch[2]
+    assert spectrum.title == "spectrum 2"
+    assert spectrum.x_units == "1/cm"
+    np.testing.assert_array_equal(spectrum.y, np.arange(5) + 2)
+    assert np.shares_memory(spectrum.y, batch.y)
+    assert batch[-1].title == "spectrum 3"
+    with pytest.raises(IndexError):
+        batch[4]
+
+
+def test_getitem_slice(batch):
+    sliced = batch[1:3]
+    assert len(sliced) == 2
+    np.testing.assert_array_equal(sliced.offsets, [0, 0, 5])
+    assert np.shares_memory(sliced.y, batch.y)
+    assert list(sliced.column("title")) == ["spectrum 1", "spectrum 2"]
+    assert len(batch[3:1]) == 0
+
+
+def test_take_and_filter(batch):
+    taken = batch.take([3, 0])
+    np.testing.assert_array_equal(taken.lengths, [2, 3])
+    np.testing.assert_array_equal(taken.y, [3.0, 4.0, 0.0, 1.0, 2.0])
+    assert list(taken.column("title")) == ["spectrum 3", "spectrum 0"]
+
+    filtered = batch.filter(batch.lengths > 2)
+    assert list(filtered.column("uid")) == ["test:0", "test:2"]
+    assert list(batch[::2].column("uid")) == ["test:0", "test:2"]
+
+
+def test_reduce(batch):
+    np.testing.assert_array_equal(
+        batch.reduce(np.maximum), [2.0, 0.0, 6.0, 4.0]
+    )
+    np.testing.assert_array_equal(
+        batch.reduce(np.add, fill=-1.0), [3.0, -1.0, 20.0, 7.0]
+    )
+
+
+def test_apply_and_normalize(batch):
+    logged = batch.apply(np.log1p)
+    np.testing.assert_allclose(logged.y, np.log1p(batch.y))
+    assert logged.x is batch.x
+
+    normalized = batch.normalize("max")
+    expected = [1.0, 0.0, 1.0, 1.0]
+    np.testing.assert_allclose(normalized.reduce(np.maximum), expected)
+    normalized = batch.normalize("l2")
+    norms = np.sqrt(normalized.reduce(np.add, normalized.y**2))
+    np.testing.assert_allclose(norms, expected)
+    with pytest.raises(ValueError):
+        batch.normalize("cat")
+
+
+def test_crop(batch):
+    cropped = batch.crop(1.0, 3.0)
+    np.testing.assert_array_equal(cropped.lengths, [2, 0, 3, 1])
+    np.testing.assert_array_equal(cropped[2].x, [1.0, 2.0, 3.0])
+
+
+def test_with_column(batch):
+    labeled = batch.with_column("label", "abcd")
+    assert list(labeled.column("label")) == list("abcd")
+    assert "label" not in batch.columns
+    assert labeled.y is batch.y
+
+
+def test_from_files(raman_soddyite_rruff):
+    batch = SpectrumBatch.from_files(
+        [raman_soddyite_rruff, raman_soddyite_rruff], ioformat="rruff"
+    )
+    assert len(batch) == 2
+    assert list(batch.column("uid")) == ["rruff:R060361"] * 2
+    np.testing.assert_array_equal(batch[0].y, batch[1].y)
+
+
+def test_from_datasets(mock_server, metazeunerite_jsonld):
+    rester = SSMRester(hostname=mock_server.base_url)
+    collection = rester.collection.create("batch")
+    rester.initialize_dataset_for_collection(collection)
+    uuid = rester.dataset.create(metazeunerite_jsonld).uuid
+
+    batch = SpectrumBatch.from_datasets(rester.dataset)
+    assert list(batch.column("uuid")) == [uuid]
+    expected = _as_spectrum(metazeunerite_jsonld)
+    np.testing.assert_array_equal(batch[0].y, expected.y)
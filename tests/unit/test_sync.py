@@ -0,0 +1,136 @@
+"""Tests for sync"""
+
+import json
+
+import pytest
+import requests
+
+from ssm_client import SSMRester
+from ssm_client.store import DirectoryStore
+from ssm_client.sync import SyncEngine
+
+
+@pytest.fixture
+def ssm_rester(mock_server, metazeunerite_jsonld):
+    rester = SSMRester(hostname=mock_server.base_url)
+    collection = rester.collection.create("mirror")
+    rester.initialize_dataset_for_collection(collection)
+    for i in range(3):
+        dataset = dict(metazeunerite_jsonld)
+        dataset["@graph"] = dict(dataset["@graph"], title=f"dataset {i}")
+        rester.dataset.create(dataset)
+    return rester
+
+
+def _check_mirror(rester, store):
+    uuids = rester.dataset.get_datasets()
+    assert sorted(store.uuids()) == sorted(uuids)
+    for uuid in uuids:
+        assert store.get(uuid) == rester.dataset.get_by_uuid(uuid).dataset
+
+
+def test_sync(tmp_path, ssm_rester, mock_server):
+    store = DirectoryStore(tmp_path / "mirror")
+    checkpoint = tmp_path / "sync.json"
+    engine = SyncEngine(ssm_rester.dataset, store, checkpoint, max_workers=2)
+
+    result = engine.sync()
+    assert len(result.created) == 3
+    assert not result.updated and not result.deleted
+    _check_mirror(ssm_rester, store)
+    assert len(json.loads(checkpoint.read_text())["entries"]) == 3
+
+    # Unchanged datasets are answered with 304s
+    result = engine.sync()
+    assert len(result.unchanged) == 3
+    assert not result.created and not result.updated
+
+    uuids = ssm_rester.dataset.get_datasets()
+    ssm_rester.dataset.update_dataset_for_uuid(
+        uuids[0], {"@graph": {"title": "changed"}}
+    )
+    ssm_rester.dataset.delete_by_uuid(uuids[1])
+    created = ssm_rester.dataset.create(store.get(uuids[2]))
+
+    # A new engine picks up where the checkpoint left off
+    engine = SyncEngine(ssm_rester.dataset, store, checkpoint)
+    result = engine.sync()
+    assert result.created == [created.uuid]
+    assert result.updated == [uuids[0]]
+    assert result.deleted == [uuids[1]]
+    assert result.unchanged == [uuids[2]]
+    _check_mirror(ssm_rester, store)
+
+
+def test_sync_without_etags(tmp_path, ssm_rester):
+    service = ssm_rester.dataset
+    get = service.get_by_uuid_if_modified
+
+    def _without_etag(uuid, etag=None):
+        return get(uuid)[0], None
+
+    service.get_by_uuid_if_modified = _without_etag
+    store = DirectoryStore(tmp_path / "mirror")
+    engine = SyncEngine(service, store)
+    assert len(engine.sync().created) == 3
+
+    # Full datasets come back, but unchanged ones are not rewritten
+    uuid = service.get_datasets()[0]
+    store.delete(uuid)
+    result = engine.sync()
+    assert result.updated == [uuid]
+    assert len(result.unchanged) == 2
+    _check_mirror(ssm_rester, store)
+
+
+def test_sync_resume(tmp_path, ssm_rester):
+    service = ssm_rester.dataset
+    get = service.get_by_uuid_if_modified
+    calls = []
+
+    def _interrupted(uuid, etag=None):
+        calls.append(uuid)
+        if len(calls) == 3:
+            raise requests.HTTPError("interrupted")
+        return get(uuid, etag)
+
+    service.get_by_uuid_if_modified = _interrupted
+    store = DirectoryStore(tmp_path / "mirror")
+    checkpoint = tmp_path / "sync.json"
+    engine = SyncEngine(service, store, checkpoint, max_workers=1)
+    with pytest.raises(requests.HTTPError):
+        engine.sync()
+    assert len(json.loads(checkpoint.read_text())["entries"]) == 2
+
+    service.get_by_uuid_if_modified = get
+    result = SyncEngine(service, store, checkpoint).sync()
+    assert len(result.created) == 1
+    assert len(result.unchanged) == 2
+    _check_mirror(ssm_rester, store)
+
+
+def test_sync_deletes_only_mirrored(tmp_path, ssm_rester):
+    store = DirectoryStore(tmp_path / "mirror")
+    store.put("foreign", {"@graph": {"title": "not from the collection"}})
+    engine = SyncEngine(ssm_rester.dataset, store)
+    engine.sync()
+    assert "foreign" in store
+    assert not engine.sync().deleted
+    assert "foreign" in store
+
+
+def test_sync_deleted_during_fetch(tmp_path, ssm_rester):
+    service = ssm_rester.dataset
+    store = DirectoryStore(tmp_path / "mirror")
+    engine = SyncEngine(service, store)
+    engine.sync()
+
+    # The listing is read before the dataset is deleted
+    listing = service.get_datasets()
+    service.get_datasets = lambda: listing
+    service.delete_by_uuid(listing[0])
+    result = engine.sync()
+    assert result.deleted == [listing[0]]
+    assert sorted(result.unchanged) == sorted(listing[1:])
+    assert listing[0] not in store
+    assert listing[0] not in engine.entries